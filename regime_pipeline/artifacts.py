@@ -0,0 +1,54 @@
+"""Content hashes for caching pipeline artifacts.
+
+Cache keys combine a hash of the effective configuration with fingerprints
+of the input data, so a cached artifact is reused only when both the
+settings and the data it was computed from are unchanged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import pickle
+from typing import Any, Mapping
+
+import numpy as np
+import pandas as pd
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def config_hash(config: Mapping[str, Any]) -> str:
+    """Stable SHA-256 of a configuration mapping (key order does not matter)."""
+    return hashlib.sha256(_canonical(config).encode("utf-8")).hexdigest()
+
+
+def frame_fingerprint(frame: pd.DataFrame | pd.Series) -> str:
+    """SHA-256 over a frame's values, index and column labels."""
+    digest = hashlib.sha256()
+    if isinstance(frame, pd.Series):
+        frame = frame.to_frame()
+    digest.update(_canonical([str(c) for c in frame.columns]).encode("utf-8"))
+    digest.update(_canonical([str(dtype) for dtype in frame.dtypes]).encode("utf-8"))
+    digest.update(np.ascontiguousarray(pd.util.hash_pandas_object(frame, index=True).to_numpy()).tobytes())
+    return digest.hexdigest()
+
+
+def value_fingerprint(value: Any) -> str:
+    """Content hash of an arbitrary (picklable) value; frames use `frame_fingerprint`."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return frame_fingerprint(value)
+    if isinstance(value, Mapping):
+        parts = {str(key): value_fingerprint(item) for key, item in value.items()}
+        return hashlib.sha256(_canonical(parts).encode("utf-8")).hexdigest()
+    if isinstance(value, np.ndarray):
+        return hashlib.sha256(str(value.dtype).encode() + str(value.shape).encode() + value.tobytes()).hexdigest()
+    return hashlib.sha256(pickle.dumps(value, protocol=4)).hexdigest()
+
+
+def cache_key(*parts: str | int, length: int = 24) -> str:
+    """Combine hashes and version tags into one short key."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return digest[:length]
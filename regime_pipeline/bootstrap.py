@@ -0,0 +1,191 @@
+"""Block-bootstrap Monte Carlo for strategy performance statistics.
+
+Resampled paths are generated as integer index arrays (stationary bootstrap
+with geometric block lengths, or circular fixed-length blocks) and every
+statistic is evaluated for a chunk of paths at once with array operations;
+chunks of paths, and of strategies when a single path over every strategy
+is too large, are sized to stay under a memory budget. Multi-strategy
+inputs reuse the same indices for every column, so cross-strategy
+correlation is kept.
+
+Typical use::
+
+    samples = bootstrap_stats(result.returns, n_paths=10_000, block=20, seed=0)
+    confidence_intervals(samples, level=0.95)
+
+Statistics are the return-based metrics of `regime_pipeline.performance`
+(everything but turnover), with the same definitions as `perf_stats`.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from . import performance
+
+STATS = performance.RETURN_METRICS
+METHODS = ("stationary", "block")
+
+# paths are generated in fixed blocks with their own seeds, so results do not
+# depend on the chunk size chosen for the memory budget
+_SEED_BLOCK = 256
+
+
+def stationary_indices(
+    n_obs: int,
+    n_paths: int,
+    mean_block: float,
+    *,
+    length: Optional[int] = None,
+    rng: np.random.Generator | int | None = None,
+) -> np.ndarray:
+    """Politis-Romano stationary bootstrap indices.
+
+    Each step starts a new block with probability ``1 / mean_block`` at a
+    uniformly drawn position, otherwise continues the current block
+    (wrapping around the end of the sample).
+
+    Returns:
+        ``(n_paths, length)`` array of row positions in ``[0, n_obs)``.
+    """
+    length = n_obs if length is None else int(length)
+    rng = np.random.default_rng(rng)
+    new_block = rng.random((n_paths, length), dtype=np.float32) < 1.0 / max(float(mean_block), 1.0)
+    new_block[:, 0] = True
+    flat = np.flatnonzero(new_block)
+    # each block is stored as its start position minus the step it begins
+    # at, so a step's index is its block's offset plus the step itself
+    offsets = rng.integers(0, n_obs, size=len(flat)) - flat % length
+    block_id = np.cumsum(new_block, axis=None).reshape(n_paths, length) - 1
+    return (offsets[block_id] + np.arange(length)) % n_obs
+
+
+def block_indices(
+    n_obs: int,
+    n_paths: int,
+    block: int,
+    *,
+    length: Optional[int] = None,
+    rng: np.random.Generator | int | None = None,
+) -> np.ndarray:
+    """Circular block bootstrap indices with fixed block length.
+
+    Returns:
+        ``(n_paths, length)`` array of row positions in ``[0, n_obs)``.
+    """
+    length = n_obs if length is None else int(length)
+    block = max(int(block), 1)
+    rng = np.random.default_rng(rng)
+    starts = rng.integers(0, n_obs, size=(n_paths, -(-length // block)))
+    idx = (starts[:, :, None] + np.arange(block)) % n_obs
+    return idx.reshape(n_paths, -1)[:, :length]
+
+
+def _indices(method: str, n_obs: int, start: int, stop: int, block: float, length: int, seed: int) -> np.ndarray:
+    sampler = stationary_indices if method == "stationary" else block_indices
+    parts = []
+    for number in range(start // _SEED_BLOCK, -(-stop // _SEED_BLOCK)):
+        first = number * _SEED_BLOCK
+        rng = np.random.default_rng([seed, number])
+        paths = sampler(n_obs, _SEED_BLOCK, block, length=length, rng=rng)
+        parts.append(paths[max(start - first, 0) : stop - first])
+    return np.concatenate(parts)
+
+
+def _path_stats(values: np.ndarray, logs: np.ndarray, idx: np.ndarray, freq: int) -> np.ndarray:
+    """Stats for every (path, strategy): ``(paths, strategies, len(STATS))``."""
+    n_paths, length = idx.shape
+    n_strategies = values.shape[1]
+    # one contiguous row per (path, strategy) for the shared row kernel
+    rows = np.ascontiguousarray(values[idx].transpose(0, 2, 1)).reshape(-1, length)
+    row_logs = np.ascontiguousarray(logs[idx].transpose(0, 2, 1)).reshape(-1, length)
+    return performance.row_stats(rows, freq, logs=row_logs).reshape(n_paths, n_strategies, len(STATS))
+
+
+def bootstrap_stats(
+    returns: pd.Series | pd.DataFrame,
+    n_paths: int = 10_000,
+    *,
+    method: str = "stationary",
+    block: float = 20,
+    length: Optional[int] = None,
+    seed: Optional[int] = None,
+    freq: int = 252,
+    max_bytes: int = 256 * 2**20,
+) -> pd.DataFrame:
+    """Bootstrap distribution of performance statistics.
+
+    Args:
+        returns: Daily returns, e.g. ``portfolio_returns(...)`` or the
+            ``strat_ret`` column of the regime backtest; a frame holds one
+            strategy per column. Missing values count as flat days.
+        n_paths: Number of resampled paths.
+        method: ``"stationary"`` (geometric block lengths with mean `block`)
+            or ``"block"`` (circular blocks of exactly `block` days).
+        block: Mean or fixed block length in observations.
+        length: Length of each path (default: the sample length).
+        seed: Seed for reproducible paths.
+        freq: Periods per year used for annualisation.
+        max_bytes: Approximate memory budget for one chunk of (path,
+            strategy) pairs, not counting one seed block of path indices.
+
+    Returns:
+        One row per path with the `STATS` columns; for frame inputs the index
+        is ``(strategy, path)``.
+
+    Raises:
+        ValueError: For an unknown method, an empty sample, or returns of
+            -100% or below, which have no log return.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown bootstrap method {method!r}; expected one of {METHODS}")
+    frame = returns.to_frame() if isinstance(returns, pd.Series) else returns
+    values = np.ascontiguousarray(frame.fillna(0.0).to_numpy(dtype=float))
+    n_obs, n_strategies = values.shape
+    if n_obs == 0:
+        raise ValueError("Cannot bootstrap an empty return series")
+    length = n_obs if length is None else int(length)
+    if (values <= -1.0).any():
+        raise ValueError("Returns must be above -100% to compound them")
+    seed = int(np.random.SeedSequence().entropy % 2**63) if seed is None else int(seed)
+    logs = np.log1p(values)
+
+    # gathered returns and logs plus the row kernel's temporaries, per (path, strategy)
+    per_row = 8 * length * 8
+    rows = max(1, max_bytes // per_row)
+    strategy_step = min(n_strategies, rows)
+    path_step = max(1, rows // strategy_step)
+    # indices are drawn in whole seed blocks and evaluated in sub-chunks
+    group = max(_SEED_BLOCK, path_step // _SEED_BLOCK * _SEED_BLOCK)
+    out = np.empty((n_paths, n_strategies, len(STATS)))
+    for start in range(0, n_paths, group):
+        stop = min(start + group, n_paths)
+        idx = _indices(method, n_obs, start, stop, block, length, seed)
+        for lo in range(start, stop, path_step):
+            hi = min(lo + path_step, stop)
+            for first in range(0, n_strategies, strategy_step):
+                cols = slice(first, first + strategy_step)
+                out[lo:hi, cols] = _path_stats(values[:, cols], logs[:, cols], idx[lo - start : hi - start], freq)
+
+    if isinstance(returns, pd.Series):
+        return pd.DataFrame(out[:, 0], index=pd.RangeIndex(n_paths, name="path"), columns=list(STATS))
+    index = pd.MultiIndex.from_product([frame.columns, range(n_paths)], names=["strategy", "path"])
+    return pd.DataFrame(out.transpose(1, 0, 2).reshape(-1, len(STATS)), index=index, columns=list(STATS))
+
+
+def confidence_intervals(samples: pd.DataFrame, level: float = 0.95) -> pd.DataFrame:
+    """Percentile intervals from `bootstrap_stats` output.
+
+    Returns:
+        Frame with lower, median and upper columns, indexed by statistic
+        (or by ``(strategy, statistic)`` for multi-strategy samples).
+    """
+    tail = (1.0 - level) / 2
+    quantiles = {"lower": tail, "median": 0.5, "upper": 1.0 - tail}
+    if isinstance(samples.index, pd.MultiIndex):
+        grouped = samples.groupby(level=0, sort=False)
+        return pd.DataFrame({name: grouped.quantile(q).stack() for name, q in quantiles.items()})
+    return pd.DataFrame({name: samples.quantile(q) for name, q in quantiles.items()})
@@ -0,0 +1,226 @@
+"""Minimal stage DAG with content-addressed memoization.
+
+Each `Node` declares the upstream nodes it consumes and the parameters that
+affect its output. A node's cache key hashes its name, version and
+parameters together with the keys of its inputs, so changing a parameter
+invalidates that node and everything downstream of it, and nothing else.
+Source nodes marked ``cache=False`` (e.g. price loading, whose output can
+change without any parameter changing) always run; their output is
+fingerprinted by content instead, so downstream nodes still hit when the
+data is unchanged.
+
+Outputs are pickled under ``<cache_dir>/<node>/<key>.pkl``. On a hit the
+value is loaded only if a node that actually runs needs it. Nodes whose
+inputs are ready run concurrently on a thread pool.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from . import artifacts
+
+
+@dataclass(frozen=True)
+class Node:
+    """One pipeline step.
+
+    Attributes:
+        name: Unique node name.
+        func: Callable receiving the input values positionally (in `inputs`
+            order) followed by `params` as keyword arguments.
+        inputs: Names of upstream nodes.
+        params: Settings that change the output; part of the cache key.
+        cache: Persist the output. Uncached nodes always run and are keyed by
+            the content of their output.
+        version: Bump to invalidate cached outputs after changing `func`.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    params: Mapping[str, Any] = field(default_factory=dict)
+    cache: bool = True
+    version: int | str = 1
+
+
+@dataclass
+class NodeRun:
+    """Outcome of one node in the last `DAG.run`."""
+
+    name: str
+    key: str
+    status: str  # "computed", "cached" or "skipped"
+    seconds: float
+
+
+class _Slot:
+    """Resolved node: its key plus a lazily loaded value."""
+
+    def __init__(self, key: str, loader: Callable[[], Any]) -> None:
+        self.key = key
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value: Any = None
+
+    @classmethod
+    def ready(cls, key: str, value: Any) -> "_Slot":
+        slot = cls(key, lambda: value)
+        slot._value, slot._loaded = value, True
+        return slot
+
+    def value(self) -> Any:
+        with self._lock:
+            if not self._loaded:
+                self._value, self._loaded = self._loader(), True
+            return self._value
+
+
+class DAG:
+    """Executor for a set of `Node`s.
+
+    Args:
+        nodes: Pipeline steps; names must be unique and inputs must refer to
+            other nodes in the set.
+        cache_dir: Directory for cached outputs; None disables persistence.
+        max_workers: Threads used to run independent nodes concurrently.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[Node],
+        cache_dir: str | Path | None = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self.nodes: Dict[str, Node] = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Duplicate node name: {node.name!r}")
+            self.nodes[node.name] = node
+        for node in self.nodes.values():
+            missing = [name for name in node.inputs if name not in self.nodes]
+            if missing:
+                raise ValueError(f"Node {node.name!r} depends on unknown nodes: {missing}")
+        self.order = self._toposort()
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 2)
+        self.last_run: Dict[str, NodeRun] = {}
+
+    def _toposort(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + (name,))}")
+            state[name] = 1
+            for upstream in self.nodes[name].inputs:
+                visit(upstream, path + (name,))
+            state[name] = 2
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, ())
+        return order
+
+    def _upstream(self, targets: Sequence[str]) -> List[str]:
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.nodes[name].inputs)
+        return [name for name in self.order if name in needed]
+
+    # ------------------------------------------------------------------ cache
+    def _path(self, node: Node, key: str) -> Optional[Path]:
+        return self.cache_dir / node.name / f"{key}.pkl" if self.cache_dir else None
+
+    @staticmethod
+    def _load(path: Path) -> Any:
+        with path.open("rb") as handle:
+            return pickle.load(handle)
+
+    @staticmethod
+    def _store(path: Path, value: Any) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with tmp.open("wb") as handle:
+            pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    # ------------------------------------------------------------------ execution
+    def _resolve(self, node: Node, upstream: List[_Slot]) -> _Slot:
+        started = time.perf_counter()
+        if not node.cache:
+            value = node.func(*(slot.value() for slot in upstream), **node.params)
+            key = artifacts.value_fingerprint(value)
+            self.last_run[node.name] = NodeRun(node.name, key, "computed", time.perf_counter() - started)
+            return _Slot.ready(key, value)
+
+        key = artifacts.cache_key(
+            node.name,
+            node.version,
+            artifacts.config_hash(dict(node.params)),
+            *(slot.key for slot in upstream),
+        )
+        path = self._path(node, key)
+        if path is not None and path.exists():
+            self.last_run[node.name] = NodeRun(node.name, key, "cached", time.perf_counter() - started)
+            return _Slot(key, lambda: self._load(path))
+
+        value = node.func(*(slot.value() for slot in upstream), **node.params)
+        if path is not None:
+            self._store(path, value)
+        self.last_run[node.name] = NodeRun(node.name, key, "computed", time.perf_counter() - started)
+        return _Slot.ready(key, value)
+
+    def run(self, targets: Sequence[str] | None = None) -> Dict[str, Any]:
+        """Evaluate `targets` (default: every sink node) and their upstream nodes.
+
+        Returns:
+            Mapping of each target name to its value. Per-node outcomes are
+            recorded in `last_run`.
+        """
+        if targets is None:
+            consumed = {name for node in self.nodes.values() for name in node.inputs}
+            targets = [name for name in self.order if name not in consumed]
+        names = self._upstream(targets)
+        self.last_run = {}
+
+        futures: Dict[str, Future] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+
+            def task(node: Node) -> _Slot:
+                upstream = [futures[name].result() for name in node.inputs]
+                return self._resolve(node, upstream)
+
+            # submitted in topological order, so every upstream future exists
+            # before its consumers wait on it
+            for name in names:
+                futures[name] = pool.submit(task, self.nodes[name])
+            slots = {name: futures[name].result() for name in names}
+
+        for name in self.nodes:
+            if name not in self.last_run:
+                self.last_run[name] = NodeRun(name, "", "skipped", 0.0)
+        return {name: slots[name].value() for name in targets}
+
+    def summary(self) -> pd.DataFrame:
+        """The last run's per-node status, key and wall time, in execution order."""
+        rows = [self.last_run[name] for name in self.order if name in self.last_run]
+        return pd.DataFrame([vars(row) for row in rows]).set_index("name")
@@ -0,0 +1,108 @@
+"""Size-bounded on-disk memo with least-recently-used eviction.
+
+Each entry is one pickle file named by its key. Reads refresh the file's
+modification time, so modification times order entries by last use. When
+the directory grows past `max_bytes`, the least recently used entries are
+deleted first. Writes are atomic (temporary file plus rename), so readers
+in other processes never see a partial entry.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+class DiskCache:
+    """Directory of pickled values keyed by content hashes.
+
+    Args:
+        root: Cache directory (created on first write).
+        max_bytes: Total size above which least recently used entries are
+            evicted.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.pkl"
+
+    def _entries(self) -> list[os.DirEntry]:
+        if not self.root.is_dir():
+            return []
+        return [entry for entry in os.scandir(self.root) if entry.name.endswith(".pkl")]
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the stored entries."""
+        if self._size is None:
+            self._size = sum(entry.stat().st_size for entry in self._entries())
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Stored value for `key` (marking it as recently used), or `default`."""
+        path = self._path(key)
+        try:
+            with path.open("rb") as handle:
+                value = pickle.load(handle)
+        except FileNotFoundError:
+            return default
+        except (EOFError, pickle.UnpicklingError):
+            path.unlink(missing_ok=True)
+            self._size = None
+            return default
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # evicted by another process in the meantime
+            pass
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store `value` under `key`, evicting old entries if over budget."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = self.root / f".{key}.{uuid.uuid4().hex}.tmp"
+        with tmp.open("wb") as handle:
+            pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        previous = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+        if self._size is not None:
+            self._size += path.stat().st_size - previous
+        if self.size_bytes > self.max_bytes:
+            self.prune()
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """Delete least recently used entries until the cache fits `max_bytes`.
+
+        Returns:
+            Number of entries removed.
+        """
+        budget = self.max_bytes if max_bytes is None else int(max_bytes)
+        entries = sorted(((e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in self._entries()), reverse=True)
+        total, removed, full = 0, 0, False
+        for _, size, path in entries:
+            full = full or total + size > budget
+            if not full:
+                total += size
+                continue
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        self._size = total
+        return removed
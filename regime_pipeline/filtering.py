@@ -0,0 +1,192 @@
+"""Online forward filtering of Gaussian regime models.
+
+A :class:`RegimeFilter` holds the fitted parameters of a switching model
+together with the last filtered state probabilities, so that new observations
+can be absorbed with one Hamilton/forward step each instead of refitting.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class RegimeFilter:
+    """Persistable forward-filter state for a Gaussian regime model.
+
+    Attributes:
+        transmat: Row-stochastic transition matrix, ``transmat[i, j] = P(s_t=j | s_{t-1}=i)``.
+        means: State means with shape (k, d).
+        covariances: State covariance matrices with shape (k, d, d).
+        probabilities: Filtered probabilities after the last absorbed observation,
+            or None before any observation has been processed.
+        initial: Prior over the first state, used only while `probabilities` is None.
+            Defaults to the stationary distribution of `transmat`.
+        state_names: Labels for the states (column names of returned frames).
+        bull_state: Index of the risk-on state, if known.
+        last_date: Timestamp of the last absorbed observation.
+        refit_every: Number of updates after which a full refit is due (None disables).
+        steps_since_fit: Observations absorbed since the parameters were estimated.
+    """
+
+    transmat: np.ndarray
+    means: np.ndarray
+    covariances: np.ndarray
+    probabilities: Optional[np.ndarray] = None
+    initial: Optional[np.ndarray] = None
+    state_names: List[str] = field(default_factory=list)
+    bull_state: Optional[int] = None
+    last_date: Optional[pd.Timestamp] = None
+    refit_every: Optional[int] = None
+    steps_since_fit: int = 0
+
+    def __post_init__(self) -> None:
+        self.transmat = np.asarray(self.transmat, dtype=float)
+        k = self.transmat.shape[0]
+        self.means = np.asarray(self.means, dtype=float).reshape(k, -1)
+        d = self.means.shape[1]
+        self.covariances = np.asarray(self.covariances, dtype=float).reshape(k, d, d)
+        if self.probabilities is not None:
+            self.probabilities = np.asarray(self.probabilities, dtype=float)
+        if self.initial is not None:
+            self.initial = np.asarray(self.initial, dtype=float)
+        if not self.state_names:
+            self.state_names = [f"Regime_{i}" for i in range(k)]
+        if self.last_date is not None:
+            self.last_date = pd.Timestamp(self.last_date)
+
+        # emission constants, computed once so each step is a few k x k operations
+        chol = np.linalg.cholesky(self.covariances)
+        self._chol_inv = np.linalg.inv(chol)
+        self._log_norm = -0.5 * d * np.log(2 * np.pi) - np.log(np.diagonal(chol, axis1=1, axis2=2)).sum(axis=1)
+
+    @property
+    def k_regimes(self) -> int:
+        return self.transmat.shape[0]
+
+    @property
+    def due_for_refit(self) -> bool:
+        """Whether the configured refit schedule calls for re-estimating parameters."""
+        return self.refit_every is not None and self.steps_since_fit >= self.refit_every
+
+    def stationary(self) -> np.ndarray:
+        """Ergodic distribution of the transition matrix."""
+        k = self.k_regimes
+        a = np.vstack([self.transmat.T - np.eye(k), np.ones(k)])
+        b = np.zeros(k + 1)
+        b[-1] = 1.0
+        return np.linalg.lstsq(a, b, rcond=None)[0]
+
+    def predict(self) -> np.ndarray:
+        """One-step-ahead state probabilities given the observations absorbed so far."""
+        if self.probabilities is None:
+            return self.initial if self.initial is not None else self.stationary()
+        return self.probabilities @ self.transmat
+
+    def log_likelihoods(self, observations: np.ndarray) -> np.ndarray:
+        """Per-state Gaussian log densities for an (n, d) observation array."""
+        centered = observations[:, None, :] - self.means[None, :, :]
+        z = np.einsum("kij,nkj->nki", self._chol_inv, centered)
+        return self._log_norm[None, :] - 0.5 * (z**2).sum(axis=2)
+
+    def update(self, observations: pd.Series | pd.DataFrame | np.ndarray) -> pd.DataFrame:
+        """Absorb new observations with one forward step each.
+
+        Observations dated at or before `last_date` are skipped, so a daily job
+        can pass a trailing slice without double counting.
+
+        Args:
+            observations: New returns (Series for univariate models, DataFrame or
+                2-D array for multivariate ones).
+
+        Returns:
+            DataFrame of filtered probabilities for each absorbed observation.
+        """
+        index = getattr(observations, "index", None)
+        values = np.asarray(observations, dtype=float)
+        values = values.reshape(len(values), -1)
+        if index is not None and self.last_date is not None:
+            keep = np.asarray(index > self.last_date)
+            values, index = values[keep], index[keep]
+
+        out = np.empty((len(values), self.k_regimes))
+        if len(values):
+            loglik = self.log_likelihoods(values)
+            shift = loglik.max(axis=1, keepdims=True)
+            lik = np.exp(loglik - shift)
+            probs = self.probabilities
+            for t in range(len(values)):
+                prior = self.predict() if probs is None else probs @ self.transmat
+                joint = prior * lik[t]
+                probs = joint / joint.sum()
+                out[t] = probs
+            self.probabilities = probs
+            self.steps_since_fit += len(values)
+            if index is not None and len(index):
+                self.last_date = pd.Timestamp(index[-1])
+
+        return pd.DataFrame(out, index=index, columns=self.state_names)
+
+    def bull_probability(self) -> float:
+        """Current filtered probability of the bull (risk-on) state."""
+        if self.bull_state is None or self.probabilities is None:
+            raise ValueError("Bull state or filtered probabilities are not available.")
+        return float(self.probabilities[self.bull_state])
+
+    def to_dict(self) -> dict:
+        return {
+            "transmat": self.transmat.tolist(),
+            "means": self.means.tolist(),
+            "covariances": self.covariances.tolist(),
+            "probabilities": None if self.probabilities is None else self.probabilities.tolist(),
+            "initial": None if self.initial is None else self.initial.tolist(),
+            "state_names": list(self.state_names),
+            "bull_state": self.bull_state,
+            "last_date": None if self.last_date is None else self.last_date.isoformat(),
+            "refit_every": self.refit_every,
+            "steps_since_fit": self.steps_since_fit,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "RegimeFilter":
+        return cls(**payload)
+
+    def save(self, path: str | Path) -> Path:
+        """Persist the filter state as JSON."""
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(self.to_dict()), encoding="utf-8")
+        return out
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RegimeFilter":
+        """Load a filter state saved with :meth:`save`."""
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def update_or_refit(
+    state: RegimeFilter,
+    observations: pd.Series | pd.DataFrame | np.ndarray,
+    refit: Callable[[], RegimeFilter],
+) -> RegimeFilter:
+    """Advance `state` with new observations, refitting when the schedule is due.
+
+    Args:
+        state: Current filter state.
+        observations: Newly available observations.
+        refit: Callable producing a freshly estimated filter state over the full
+            history (including `observations`). Only invoked when a refit is due.
+
+    Returns:
+        The updated (or freshly refitted) filter state.
+    """
+    state.update(observations)
+    if state.due_for_refit:
+        return refit()
+    return state
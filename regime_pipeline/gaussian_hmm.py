@@ -0,0 +1,388 @@
+"""Batched NumPy kernel for full-covariance Gaussian HMMs.
+
+Reproduces ``hmmlearn.hmm.GaussianHMM(covariance_type="full")`` with its
+default priors: the same random initialisation for a given seed (Dirichlet
+start and transition probabilities, k-means means, pooled covariance), the
+same EM updates and stopping rule, and Viterbi decoding. Every kernel
+carries a batch axis, so the rolling windows of a walk-forward are fitted
+in one pass over time instead of one estimator per window.
+
+Arrays are time-major: observations are (T, B, d) for B sequences of d
+features, and per-state quantities are (T, B, k).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from ._lazy import lazy_import
+
+cluster = lazy_import("sklearn.cluster")
+
+_TINY = 1e-300
+# batches up to this size run the time recursions as log-depth scans
+_SCAN_MAX_BATCH = 16
+
+Params = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+@dataclass
+class HMMResult:
+    """Array-level output of `em_fit`, one entry per sequence of the batch."""
+
+    startprob: np.ndarray
+    transmat: np.ndarray
+    means: np.ndarray
+    covars: np.ndarray
+    logprob: np.ndarray
+    n_iter: np.ndarray
+    converged: np.ndarray
+    failed: np.ndarray
+
+    def params(self, b: int) -> Params:
+        """(startprob, transmat, means, covars) of sequence `b`."""
+        return self.startprob[b], self.transmat[b], self.means[b], self.covars[b]
+
+
+def strided_windows(values: np.ndarray, ends: Sequence[int], length: int) -> np.ndarray:
+    """Windows ``values[end - length : end]`` stacked as a (length, B, d) array.
+
+    The windows are taken from a strided view of `values`, so the feature
+    matrix is read once per batch rather than copied per window.
+    """
+    values = np.asarray(values, dtype=float)
+    view = np.lib.stride_tricks.sliding_window_view(values, length, axis=0)
+    return view[np.asarray(ends, dtype=int) - length].transpose(2, 0, 1)
+
+
+def _cholesky(covars: np.ndarray) -> np.ndarray:
+    """Batched Cholesky factors; matrices that are not positive definite get a
+    small ridge as in hmmlearn, and NaN factors if that fails too."""
+    try:
+        return np.linalg.cholesky(covars)
+    except np.linalg.LinAlgError:
+        d = covars.shape[-1]
+        flat = covars.reshape(-1, d, d)
+        chol = np.full_like(flat, np.nan)
+        for i, cv in enumerate(flat):
+            for ridge in (0.0, 1e-7):
+                try:
+                    chol[i] = np.linalg.cholesky(cv + ridge * np.eye(d))
+                    break
+                except np.linalg.LinAlgError:
+                    continue
+        return chol.reshape(covars.shape)
+
+
+def log_emissions(x: np.ndarray, means: np.ndarray, covars: np.ndarray) -> np.ndarray:
+    """Gaussian log densities of (T, B, d) observations under (B, k, d) means and
+    (B, k, d, d) covariances -> (T, B, k)."""
+    d = x.shape[-1]
+    chol = _cholesky(covars)
+    # failed factors are inverted as identities; their NaN log-determinant
+    # still makes the densities NaN
+    broken = ~np.isfinite(chol).all(axis=(2, 3))
+    chol_inv = np.linalg.inv(np.where(broken[:, :, None, None], np.eye(d), chol))
+    resid = x[:, :, None, :] - means[None]
+    # d is tiny, so the triangular solve is unrolled into d * d array operations
+    maha = np.zeros(resid.shape[:3])
+    for i in range(d):
+        z = resid[..., 0] * chol_inv[None, :, :, i, 0]
+        for j in range(1, i + 1):
+            z += resid[..., j] * chol_inv[None, :, :, i, j]
+        maha += z**2
+    log_det = 2.0 * np.log(np.diagonal(chol, axis1=2, axis2=3)).sum(axis=2)
+    return -0.5 * (maha + d * np.log(2 * np.pi) + log_det[None])
+
+
+def _prefix_products(mats: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Inclusive prefix products ``M_0 M_1 ... M_t`` of (k, k, T, B) matrices.
+
+    Hillis-Steele scan: log2(T) rounds, each multiplying every product by
+    the one `shift` steps earlier. Products are rescaled to a unit maximum
+    every round and the scales returned as (T, B) logs.
+    """
+    k, _, n_steps = mats.shape[:3]
+    prod = mats.copy()
+    logs = np.zeros(mats.shape[2:])
+    shift = 1
+    while shift < n_steps:
+        new = np.empty((k, k, n_steps - shift) + mats.shape[3:])
+        for i in range(k):
+            for j in range(k):
+                acc = prod[i, 0, :-shift] * prod[0, j, shift:]
+                for m in range(1, k):
+                    acc += prod[i, m, :-shift] * prod[m, j, shift:]
+                new[i, j] = acc
+        scale = np.maximum(new.max(axis=(0, 1)), _TINY)
+        logs[shift:] = logs[:-shift] + logs[shift:] + np.log(scale)
+        prod[:, :, shift:] = new / scale
+        shift *= 2
+    return prod, logs
+
+
+def _prefix_maxplus(mats: np.ndarray) -> np.ndarray:
+    """Inclusive prefix products of (k, k, T, B) matrices in the max-plus semiring."""
+    k, _, n_steps = mats.shape[:3]
+    prod = mats.copy()
+    shift = 1
+    while shift < n_steps:
+        new = np.empty((k, k, n_steps - shift) + mats.shape[3:])
+        for i in range(k):
+            for j in range(k):
+                acc = prod[i, 0, :-shift] + prod[0, j, shift:]
+                for m in range(1, k):
+                    np.maximum(acc, prod[i, m, :-shift] + prod[m, j, shift:], out=acc)
+                new[i, j] = acc
+        prod[:, :, shift:] = new
+        shift *= 2
+    return prod
+
+
+def _forward_backward_loop(lik: np.ndarray, startprob: np.ndarray, transmat: np.ndarray):
+    n_obs = lik.shape[0]
+    alpha = np.empty_like(lik)
+    norms = np.empty(lik.shape[:2])
+    joint = startprob * lik[0]
+    for t in range(n_obs):
+        if t:
+            joint = np.matmul(alpha[t - 1][:, None, :], transmat)[:, 0, :]
+            joint *= lik[t]
+        norms[t] = np.maximum(joint.sum(axis=1), _TINY)
+        np.divide(joint, norms[t][:, None], out=alpha[t])
+
+    # beta is scaled by the same factors, so ahead[t] = lik[t] beta[t] / c[t]
+    ahead = lik / norms[:, :, None]
+    beta = np.ones_like(lik)
+    for t in range(n_obs - 1, 0, -1):
+        ahead[t] *= beta[t]
+        beta[t - 1] = np.matmul(transmat, ahead[t][:, :, None])[:, :, 0]
+    xi_sum = transmat * np.matmul(alpha[:-1].transpose(1, 2, 0), ahead[1:].transpose(1, 0, 2))
+    return alpha * beta, xi_sum, np.log(norms).sum(axis=0)
+
+
+def _forward_backward_scan(lik: np.ndarray, startprob: np.ndarray, transmat: np.ndarray):
+    # alpha_t and beta_t are prefix and suffix products of M_t = A diag(lik_t)
+    trans = transmat.transpose(1, 2, 0)
+    lik_k = lik.transpose(2, 0, 1)
+    mats = trans[:, :, None, :] * lik_k[None, :, 1:, :]
+    first = (startprob * lik[0]).T
+
+    prefix, logs = _prefix_products(mats)
+    forward = np.empty_like(lik_k)
+    forward[:, 0] = first
+    forward[:, 1:] = (first[:, None, None, :] * prefix).sum(axis=0)
+    total = forward.sum(axis=0)
+    alpha = forward / total
+
+    suffix, _ = _prefix_products(mats[:, :, ::-1].transpose(1, 0, 2, 3))
+    beta = np.ones_like(lik_k)
+    beta[:, :-1] = suffix[:, :, ::-1].sum(axis=0)
+    beta[:, :-1] /= beta[:, :-1].sum(axis=0)
+
+    xi = alpha[:, None, :-1] * trans[:, :, None, :] * (lik_k[:, 1:] * beta[:, 1:])[None]
+    xi /= np.maximum(xi.sum(axis=(0, 1)), _TINY)
+    logprob = np.log(total[-1]) + logs[-1]
+    return (alpha * beta).transpose(1, 2, 0), xi.sum(axis=2).transpose(2, 0, 1), logprob
+
+
+def forward_backward(
+    logframe: np.ndarray,
+    startprob: np.ndarray,
+    transmat: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Scaled forward-backward pass.
+
+    Large batches run the recursions as a loop over time steps, each step one
+    array operation across the batch. Small batches, where that loop would
+    be pure interpreter overhead, use log-depth prefix-product scans instead.
+
+    Args:
+        logframe: State log densities, shape (T, B, k).
+        startprob: Initial state distributions, shape (B, k).
+        transmat: Row-stochastic transition matrices, shape (B, k, k).
+
+    Returns:
+        Tuple of state posteriors (T, B, k), expected transition counts
+        (B, k, k) and log-likelihoods (B,).
+    """
+    shift = logframe.max(axis=2, keepdims=True)
+    lik = np.exp(logframe - shift)
+    kernel = _forward_backward_scan if logframe.shape[1] <= _SCAN_MAX_BATCH else _forward_backward_loop
+    posteriors, xi_sum, logprob = kernel(lik, startprob, transmat)
+    posteriors /= np.maximum(posteriors.sum(axis=2, keepdims=True), _TINY)
+    return posteriors, xi_sum, logprob + shift[:, :, 0].sum(axis=0)
+
+
+def viterbi(logframe: np.ndarray, startprob: np.ndarray, transmat: np.ndarray) -> np.ndarray:
+    """Most likely state paths (T, B) for (T, B, k) log densities."""
+    n_obs, n_batch, k = logframe.shape
+    with np.errstate(divide="ignore"):
+        log_start, log_trans = np.log(startprob), np.log(transmat)
+    rows = np.arange(n_batch)
+
+    if n_batch > _SCAN_MAX_BATCH:
+        delta = log_start + logframe[0]
+        backptr = np.empty(logframe.shape, dtype=np.intp)
+        for t in range(1, n_obs):
+            scores = delta[:, :, None] + log_trans
+            backptr[t] = scores.argmax(axis=1)
+            delta = np.take_along_axis(scores, backptr[t][:, None, :], axis=1)[:, 0, :] + logframe[t]
+        path = np.empty((n_obs, n_batch), dtype=np.intp)
+        path[-1] = delta.argmax(axis=1)
+        for t in range(n_obs - 1, 0, -1):
+            path[t - 1] = backptr[t][rows, path[t]]
+        return path
+
+    # best path scores from a max-plus scan, then the back-pointer chain is
+    # composed by pointer doubling instead of walked step by step
+    first = (log_start + logframe[0]).T
+    trans = log_trans.transpose(1, 2, 0)
+    mats = trans[:, :, None, :] + logframe.transpose(2, 0, 1)[None, :, 1:, :]
+    delta = np.empty((n_obs, n_batch, k))
+    delta[0] = first.T
+    delta[1:] = (first[:, None, None, :] + _prefix_maxplus(mats)).max(axis=0).transpose(1, 2, 0)
+    backptr = (delta[:-1, :, :, None] + log_trans[None]).argmax(axis=2)
+    chain = np.concatenate([backptr, np.broadcast_to(np.arange(k), (1, n_batch, k))])
+    shift = 1
+    while shift < n_obs:
+        chain[:-shift] = np.take_along_axis(chain[:-shift], chain[shift:], axis=2)
+        shift *= 2
+    return np.take_along_axis(chain, np.broadcast_to(delta[-1].argmax(axis=1)[None, :, None], (n_obs, n_batch, 1)), axis=2)[:, :, 0]
+
+
+def init_params(
+    x: np.ndarray,
+    n_states: int,
+    seeds: Sequence[Optional[int]],
+    min_covar: float = 1e-3,
+) -> Params:
+    """hmmlearn's random initialisation for each sequence of a (T, B, d) batch.
+
+    Start and transition probabilities are Dirichlet draws from
+    ``RandomState(seed)``, means are the centres of a 10-restart k-means with
+    the same seed, and every state starts from the pooled covariance.
+    """
+    n_obs, n_batch, d = x.shape
+    alpha = np.full(n_states, 1.0 / n_states)
+    startprob = np.empty((n_batch, n_states))
+    transmat = np.empty((n_batch, n_states, n_states))
+    means = np.empty((n_batch, n_states, d))
+    covars = np.empty((n_batch, n_states, d, d))
+    for b, seed in enumerate(seeds):
+        values = np.ascontiguousarray(x[:, b])
+        rng = np.random.RandomState(seed)
+        startprob[b] = rng.dirichlet(alpha)
+        transmat[b] = rng.dirichlet(alpha, size=n_states)
+        means[b] = cluster.KMeans(n_clusters=n_states, random_state=seed, n_init=10).fit(values).cluster_centers_
+        covars[b] = np.cov(values.T).reshape(d, d) + min_covar * np.eye(d)
+    return startprob, transmat, means, covars
+
+
+def _normalize(a: np.ndarray) -> np.ndarray:
+    total = a.sum(axis=-1, keepdims=True)
+    return a / np.where(total == 0, 1.0, total)
+
+
+def em_fit(
+    x: np.ndarray,
+    n_states: int = 2,
+    *,
+    n_iter: int = 10,
+    tol: float = 1e-2,
+    start: Optional[Params] = None,
+    seeds: Optional[Sequence[Optional[int]]] = None,
+    min_covar: float = 1e-3,
+    covars_prior: float = 1e-2,
+) -> HMMResult:
+    """Fit full-covariance Gaussian HMMs to every sequence of a batch by EM.
+
+    Each iteration runs one forward-backward pass over the sequences that are
+    still improving. A sequence stops, as in hmmlearn, once its
+    log-likelihood gain falls below `tol` or after `n_iter` iterations, and
+    either way it is reported as converged (hmmlearn's
+    ``ConvergenceMonitor.converged``). Sequences whose likelihood becomes
+    non-finite are marked as failed instead.
+
+    Args:
+        x: Observations with shape (T, d) or (T, B, d).
+        n_states: Number of hidden states.
+        n_iter: Maximum number of EM iterations.
+        tol: Log-likelihood gain below which EM stops.
+        start: Optional (startprob (B, k), transmat (B, k, k), means (B, k, d),
+            covars (B, k, d, d)) starting values; otherwise `init_params`.
+        seeds: Per-sequence seeds for the random initialisation.
+        min_covar: Ridge added to the pooled covariance at initialisation.
+        covars_prior: hmmlearn's default covariance prior.
+
+    Returns:
+        HMMResult with the fitted parameters and diagnostics.
+    """
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 2:
+        x = x[:, None, :]
+    n_obs, n_batch, d = x.shape
+    outer = (x[:, :, :, None] * x[:, :, None, :]).reshape(n_obs, n_batch, d * d).transpose(1, 0, 2)
+    if start is None:
+        seeds = list(seeds) if seeds is not None else [None] * n_batch
+        start = init_params(x, n_states, seeds, min_covar)
+    startprob, transmat, means, covars = (np.array(p, dtype=float, copy=True) for p in start)
+
+    logprob = np.full(n_batch, np.nan)
+    iterations = np.zeros(n_batch, dtype=int)
+    converged = np.zeros(n_batch, dtype=bool)
+    failed = np.zeros(n_batch, dtype=bool)
+    active = np.ones(n_batch, dtype=bool)
+    for _ in range(n_iter):
+        idx = np.flatnonzero(active)
+        if not idx.size:
+            break
+        xa = x if idx.size == n_batch else x[:, idx]
+        post, xi_sum, new_logprob = forward_backward(
+            log_emissions(xa, means[idx], covars[idx]), startprob[idx], transmat[idx]
+        )
+
+        # M-step with hmmlearn's defaults (flat Dirichlet priors, no mean prior)
+        weight = post.sum(axis=0)
+        post_b = post.transpose(1, 2, 0)
+        obs = post_b @ xa.transpose(1, 0, 2)
+        obs_outer = (post_b @ outer[idx]).reshape(obs.shape + (d,))
+        new_means = obs / weight[:, :, None]
+        cross = obs[:, :, :, None] * new_means[:, :, None, :]
+        centred = obs_outer - cross - cross.transpose(0, 1, 3, 2)
+        centred += new_means[:, :, :, None] * new_means[:, :, None, :] * weight[:, :, None, None]
+        startprob[idx] = _normalize(np.where(startprob[idx] == 0, 0.0, post[0]))
+        transmat[idx] = _normalize(np.where(transmat[idx] == 0, 0.0, xi_sum))
+        means[idx] = new_means
+        covars[idx] = (covars_prior + centred) / weight[:, :, None, None]
+
+        bad = ~np.isfinite(new_logprob)
+        done = (iterations[idx] > 0) & (new_logprob - logprob[idx] < tol)
+        iterations[idx] += 1
+        logprob[idx] = new_logprob
+        failed[idx[bad]] = True
+        converged[idx[done & ~bad]] = True
+        active[idx[done | bad]] = False
+    converged |= (iterations == n_iter) & ~failed
+
+    return HMMResult(
+        startprob=startprob,
+        transmat=transmat,
+        means=means,
+        covars=covars,
+        logprob=logprob,
+        n_iter=iterations,
+        converged=converged,
+        failed=failed,
+    )
+
+
+def decode(x: np.ndarray, result: HMMResult) -> np.ndarray:
+    """Viterbi state paths (T, B) of a (T, B, d) batch under fitted parameters."""
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 2:
+        x = x[:, None, :]
+    return viterbi(log_emissions(x, result.means, result.covars), result.startprob, result.transmat)
@@ -0,0 +1,323 @@
+"""Shared price-data layer for both pipeline stages.
+
+`MarketData` sits between the stages and a pluggable `PriceProvider`:
+
+* an in-memory panel holds every (ticker, date range) already loaded in this
+  process, so overlapping requests from either stage are served from memory;
+* an optional on-disk `PriceStore` persists fetched bars across runs;
+* only the ranges missing from memory (and then from disk) reach the provider,
+  with tickers that share a gap fetched in one request.
+
+Each fetch also re-requests a few stored bars next to the gap. The store
+compares them with what it holds, replaces revised bars and, when the
+provider has restated the adjusted history (after a split or dividend),
+rescales the older bars so returns across the seam stay correct.
+
+Use `shared()` to obtain the process-wide instance for a cache directory, so
+that Part 1 and Part 2 read from the same already-loaded panel.
+"""
+
+from __future__ import annotations
+
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ._lazy import lazy_import
+from .store import Interval, PriceStore, add_interval, missing_intervals
+
+yf = lazy_import("yfinance")
+
+DEFAULT_CACHE_DIR = Path("data") / "prices"
+# stored bars refetched on each side of a gap to detect restated history
+OVERLAP_BARS = 5
+
+Coverage = Callable[[str], List[Interval]]
+
+
+class PriceProvider:
+    """Source of adjusted close prices.
+
+    Subclasses implement `fetch`, returning a wide DataFrame of prices for
+    ``start <= date < end`` with one column per requested ticker.
+    """
+
+    name = "base"
+
+    @property
+    def cache_key(self) -> str:
+        """Identity used to share `MarketData` instances between callers."""
+        return self.name
+
+    def fetch(self, tickers: Sequence[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class YFinanceProvider(PriceProvider):
+    """Adjusted closes from Yahoo Finance via `yfinance.download`."""
+
+    name = "yfinance"
+
+    def fetch(self, tickers: Sequence[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        data = yf.download(
+            tickers=list(tickers),
+            start=start,
+            end=end,
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+        )
+        if data.empty:
+            return pd.DataFrame(columns=list(tickers), dtype=float)
+        if isinstance(data.columns, pd.MultiIndex):
+            prices = data["Adj Close"]
+        else:
+            prices = data["Adj Close"].to_frame(name=tickers[0]) if "Adj Close" in data else data
+        return prices.sort_index()
+
+
+class LocalFileProvider(PriceProvider):
+    """Prices from a wide CSV or Parquet file (date index, one column per ticker)."""
+
+    name = "local"
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._frame: Optional[pd.DataFrame] = None
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.name}:{self.path.expanduser().resolve()}"
+
+    def _load(self) -> pd.DataFrame:
+        if self._frame is None:
+            if self.path.suffix == ".parquet":
+                frame = pd.read_parquet(self.path)
+            else:
+                frame = pd.read_csv(self.path, index_col=0, parse_dates=True)
+            frame.index = pd.DatetimeIndex(frame.index)
+            self._frame = frame.sort_index()
+        return self._frame
+
+    def fetch(self, tickers: Sequence[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        frame = self._load()
+        window = frame.loc[(frame.index >= start) & (frame.index < end)]
+        return window.reindex(columns=list(tickers))
+
+
+class SyntheticProvider(PriceProvider):
+    """Deterministic geometric random walks on business days, for tests and dry runs.
+
+    Each ticker's path depends only on the seed and the ticker name, so any
+    sub-range fetched later agrees with earlier fetches.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        seed: int = 0,
+        drift: float = 0.0003,
+        vol: float = 0.01,
+        origin: str = "1990-01-01",
+    ) -> None:
+        self.seed = seed
+        self.drift = drift
+        self.vol = vol
+        self.origin = pd.Timestamp(origin)
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.name}:{self.seed}:{self.drift}:{self.vol}:{self.origin.date()}"
+
+    def fetch(self, tickers: Sequence[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        dates = pd.bdate_range(self.origin, end - pd.Timedelta(days=1))
+        columns = {}
+        for ticker in tickers:
+            rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode("utf-8"))])
+            steps = rng.normal(self.drift, self.vol, len(dates))
+            columns[ticker] = 100.0 * np.exp(np.cumsum(steps))
+        frame = pd.DataFrame(columns, index=dates)
+        return frame.loc[frame.index >= start]
+
+
+def provider_from_config(spec: str | dict | None) -> PriceProvider:
+    """Build a provider from a config entry.
+
+    Accepts None (yfinance), a provider name, or a mapping with a `name` key
+    plus constructor arguments, e.g. ``{"name": "local", "path": "prices.csv"}``.
+    """
+    if spec is None:
+        return YFinanceProvider()
+    if isinstance(spec, str):
+        spec = {"name": spec}
+    options = dict(spec)
+    name = options.pop("name")
+    providers = {cls.name: cls for cls in (YFinanceProvider, LocalFileProvider, SyntheticProvider)}
+    if name not in providers:
+        raise ValueError(f"Unknown price provider: {name!r}")
+    return providers[name](**options)
+
+
+def coverage_gaps(
+    coverage: Coverage,
+    tickers: Sequence[str],
+    start: str | pd.Timestamp,
+    end: pd.Timestamp,
+) -> Dict[Tuple[pd.Timestamp, pd.Timestamp], List[str]]:
+    """Group the missing ``[start, end)`` ranges of each ticker.
+
+    Args:
+        coverage: Callable returning the sorted disjoint ``[start, end)``
+            ranges already available for a ticker.
+        tickers: Requested tickers.
+        start: Requested start date (inclusive).
+        end: Requested end date (exclusive).
+
+    Returns:
+        Mapping of each missing date range to the tickers that need it, so
+        tickers sharing a gap are fetched in one request.
+    """
+    start = pd.Timestamp(start)
+    gaps: Dict[Tuple[pd.Timestamp, pd.Timestamp], List[str]] = {}
+    for ticker in tickers:
+        for gap in missing_intervals(coverage(ticker), start, end):
+            gaps.setdefault(gap, []).append(ticker)
+    return gaps
+
+
+def resolve_end(end: str | pd.Timestamp | None) -> pd.Timestamp:
+    """Exclusive end date; open-ended requests run through the current day."""
+    return pd.Timestamp(end) if end else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+
+
+def settled_end(end: pd.Timestamp) -> pd.Timestamp:
+    """Exclusive end of the bars that can no longer change.
+
+    The current day's bar may still be an intraday snapshot, so it is never
+    recorded as covered and the next load fetches it again.
+    """
+    return min(end, pd.Timestamp.today().normalize())
+
+
+class MarketData:
+    """In-memory price panel backed by an optional store and a provider.
+
+    Args:
+        provider: Price source; defaults to Yahoo Finance.
+        cache_path: Optional `PriceStore` directory for persistence across runs.
+    """
+
+    def __init__(self, provider: PriceProvider | None = None, cache_path: str | Path | None = None) -> None:
+        self.provider = provider or YFinanceProvider()
+        self.store = PriceStore(cache_path) if cache_path else None
+        self._panel = pd.DataFrame(dtype=float)
+        self._covered: Dict[str, List[Interval]] = {}
+        self._lock = threading.RLock()
+
+    def _memory_coverage(self, ticker: str) -> List[Interval]:
+        return self._covered.get(ticker, [])
+
+    def _with_overlap(
+        self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp
+    ) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """Widen a gap by `OVERLAP_BARS` stored bars of each covered range it borders."""
+        fetch_start, fetch_end = start, end
+        for ticker in tickers:
+            dates = self.store.records(ticker)["date"]
+            for lo, hi in self.store.coverage(ticker):
+                if hi == start:
+                    first = int(np.searchsorted(dates, lo.value, side="left"))
+                    before = int(np.searchsorted(dates, start.value, side="left"))
+                    if before > first:
+                        fetch_start = min(fetch_start, pd.Timestamp(int(dates[max(before - OVERLAP_BARS, first)])))
+                if lo == end:
+                    after = int(np.searchsorted(dates, end.value, side="left"))
+                    stop = int(np.searchsorted(dates, hi.value, side="left"))
+                    if stop > after:
+                        last = pd.Timestamp(int(dates[min(after + OVERLAP_BARS, stop) - 1]))
+                        fetch_end = max(fetch_end, last + pd.Timedelta(days=1))
+        return fetch_start, fetch_end
+
+    def _load_range(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        if self.store is None:
+            fetched = self.provider.fetch(tickers, start, end)
+            return fetched[(fetched.index >= start) & (fetched.index < end)].reindex(columns=tickers)
+
+        for (gap_start, gap_end), gap_tickers in coverage_gaps(self.store.coverage, tickers, start, end).items():
+            fetch_start, fetch_end = self._with_overlap(gap_tickers, gap_start, gap_end)
+            fetched = self.provider.fetch(gap_tickers, fetch_start, fetch_end)
+            fetched = fetched[(fetched.index >= fetch_start) & (fetched.index < fetch_end)]
+            rebased = self.store.write(fetched.reindex(columns=gap_tickers))
+            for ticker, factor in rebased.items():
+                if ticker in self._panel:
+                    self._panel[ticker] *= factor
+            self.store.mark_covered(gap_tickers, gap_start, max(gap_start, settled_end(gap_end)))
+        return self.store.read(tickers, start=start, end=end - pd.Timedelta(nanoseconds=1))
+
+    def prices(
+        self,
+        tickers: Iterable[str],
+        start: str | pd.Timestamp,
+        end: str | pd.Timestamp | None = None,
+    ) -> pd.DataFrame:
+        """Adjusted close prices for ``start <= date < end``, forward-filled.
+
+        Args:
+            tickers: Ticker symbols.
+            start: Start date (inclusive).
+            end: End date (exclusive). Defaults to the current day inclusive.
+
+        Returns:
+            DataFrame of prices indexed by date with one column per ticker.
+        """
+        tickers_list = list(dict.fromkeys(tickers))
+        start = pd.Timestamp(start)
+        end = resolve_end(end)
+        with self._lock:
+            for (gap_start, gap_end), gap_tickers in coverage_gaps(
+                self._memory_coverage, tickers_list, start, end
+            ).items():
+                chunk = self._load_range(gap_tickers, gap_start, gap_end)
+                self._panel = chunk.combine_first(self._panel) if not self._panel.empty else chunk
+                for ticker in gap_tickers:
+                    self._covered[ticker] = add_interval(self._memory_coverage(ticker), gap_start, gap_end)
+            panel = self._panel.reindex(columns=tickers_list)
+
+        window = panel.loc[(panel.index >= start) & (panel.index < end)].dropna(how="all")
+        if window.empty:
+            raise ValueError(f"No data returned for tickers: {tickers_list}")
+        return window.ffill()
+
+    def clear(self) -> None:
+        """Drop the in-memory panel (the on-disk store is kept)."""
+        with self._lock:
+            self._panel = pd.DataFrame(dtype=float)
+            self._covered.clear()
+
+
+_INSTANCES: Dict[Tuple[Optional[str], str], MarketData] = {}
+_INSTANCES_LOCK = threading.Lock()
+
+
+def shared(
+    cache_path: str | Path | None = DEFAULT_CACHE_DIR,
+    provider: PriceProvider | str | dict | None = None,
+) -> MarketData:
+    """Process-wide `MarketData` for a cache directory and provider.
+
+    Both stages call this with the same arguments by default, so the second
+    stage reuses the panel already loaded by the first.
+    """
+    if not isinstance(provider, PriceProvider):
+        provider = provider_from_config(provider)
+    key_path = str(Path(cache_path).expanduser().resolve()) if cache_path else None
+    key = (key_path, provider.cache_key)
+    with _INSTANCES_LOCK:
+        if key not in _INSTANCES:
+            _INSTANCES[key] = MarketData(provider=provider, cache_path=cache_path)
+        return _INSTANCES[key]
@@ -0,0 +1,127 @@
+"""Performance statistics for many strategies at once.
+
+Both stages report through `strategy_stats`, so every metric has a single
+definition:
+
+- ``ann_ret``: compound annual growth rate, ``prod(1 + r) ** (freq / n) - 1``.
+- ``ann_vol``: sample standard deviation (ddof=1) times ``sqrt(freq)``.
+- ``sharpe``: annualised arithmetic mean over ``ann_vol`` (zero risk-free rate).
+- ``sortino``: annualised mean over the annualised downside deviation
+  (root mean square of the negative returns, target 0).
+- ``max_dd``: worst drop of equity from its running peak, the starting
+  capital counting as the first peak.
+- ``max_dd_duration``: longest stretch, in periods, spent below a prior peak.
+- ``calmar``: ``ann_ret / |max_dd|``.
+- ``turnover``: annualised one-way turnover, when turnover is supplied.
+
+Returns are laid out strategy-major (one contiguous row per strategy) and
+processed in blocks of rows, so 10k-column sweeps stay within a fixed memory
+budget. Missing returns count as flat periods.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+METRICS = ("ann_ret", "ann_vol", "sharpe", "sortino", "max_dd", "max_dd_duration", "calmar", "turnover")
+RETURN_METRICS = METRICS[:-1]
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def row_stats(values: np.ndarray, freq: int = 252, logs: Optional[np.ndarray] = None) -> np.ndarray:
+    """`RETURN_METRICS` for each row of a ``(strategies, periods)`` array.
+
+    Args:
+        values: Period returns, one strategy per row (NaN-free).
+        freq: Periods per year.
+        logs: ``log1p(values)`` if the caller already has it.
+
+    Returns:
+        Array of shape ``(strategies, len(RETURN_METRICS))``.
+    """
+    n = values.shape[1]
+    logs = np.log1p(values) if logs is None else logs
+    cum = np.cumsum(logs, axis=1)
+    peak = np.maximum(np.maximum.accumulate(cum, axis=1), 0.0)
+    max_dd = np.expm1((cum - peak).min(axis=1))
+
+    steps = np.arange(1, n + 1)
+    last_peak = np.maximum.accumulate(np.where(cum < peak, 0, steps), axis=1)
+    max_dd_duration = (steps - last_peak).max(axis=1).astype(float)
+
+    ann_ret = np.expm1(cum[:, -1] * (freq / n))
+    ann_mean = values.mean(axis=1) * freq
+    ann_vol = values.std(axis=1, ddof=1) * np.sqrt(freq) if n > 1 else np.zeros(len(values))
+    downside = np.sqrt(np.square(np.minimum(values, 0.0)).mean(axis=1) * freq)
+    return np.stack(
+        [
+            ann_ret,
+            ann_vol,
+            _ratio(ann_mean, ann_vol),
+            _ratio(ann_mean, downside),
+            max_dd,
+            max_dd_duration,
+            _ratio(ann_ret, np.abs(max_dd)),
+        ],
+        axis=-1,
+    )
+
+
+def strategy_stats(
+    returns: pd.DataFrame | pd.Series | np.ndarray,
+    turnover: pd.DataFrame | pd.Series | np.ndarray | None = None,
+    *,
+    freq: int = 252,
+    max_bytes: int = 128 * 2**20,
+) -> pd.DataFrame:
+    """Every metric in `METRICS` for each strategy.
+
+    Args:
+        returns: Period returns, dates x strategies.
+        turnover: One-way turnover per period (any sampling, e.g. only
+            rebalance dates), one column per strategy; it is summed and
+            annualised over the span of `returns`. Omitted: ``turnover`` is NaN.
+        freq: Periods per year.
+        max_bytes: Approximate memory budget per block of strategies.
+
+    Returns:
+        DataFrame indexed by strategy (the columns of `returns`) with one
+        column per metric.
+    """
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame()
+    index = returns.columns if isinstance(returns, pd.DataFrame) else pd.RangeIndex(np.shape(returns)[1])
+    values = np.asarray(returns, dtype=float)
+    n_periods, n_strategies = values.shape
+    if n_periods == 0:
+        return pd.DataFrame(0.0, index=index, columns=list(METRICS))
+
+    # strategy-major so each row's scans and reductions run over contiguous memory
+    by_strategy = np.nan_to_num(np.ascontiguousarray(values.T), nan=0.0)
+    block = max(1, max_bytes // (6 * 8 * n_periods))
+    out = np.empty((n_strategies, len(METRICS)))
+    for start in range(0, n_strategies, block):
+        out[start : start + block, :-1] = row_stats(by_strategy[start : start + block], freq)
+
+    if turnover is None:
+        out[:, -1] = np.nan
+    else:
+        traded = np.nan_to_num(np.asarray(turnover, dtype=float), nan=0.0)
+        out[:, -1] = traded.reshape(len(traded), -1).sum(axis=0) * (freq / n_periods)
+    return pd.DataFrame(out, index=index, columns=list(METRICS))
+
+
+def summary(
+    returns: pd.Series,
+    turnover: pd.Series | np.ndarray | None = None,
+    freq: int = 252,
+) -> Dict[str, float]:
+    """`strategy_stats` of a single return series as a plain dict."""
+    row = strategy_stats(returns, turnover, freq=freq).iloc[0]
+    return {key: float(value) for key, value in row.items()}
@@ -1,5 +1,6 @@
 import pandas as pd
-import numpy as np
+
+from .. import performance
 
 def backtest(prices: pd.Series, pos: pd.Series, cash: pd.Series | None = None, tc_bps: float = 5.0) -> pd.DataFrame:
     """Close-to-close backtest with simple transaction costs."""
@@ -24,9 +25,6 @@ def backtest(prices: pd.Series, pos: pd.Series, cash: pd.Series | None = None, t
         "drawdown": dd
     })
 
-def annualized_stats(returns: pd.Series, freq: int = 252) -> dict:
-    r = (1 + returns).prod() ** (freq / max(len(returns), 1)) - 1
-    vol = returns.std() * np.sqrt(freq)
-    sharpe = 0.0 if vol == 0 else (returns.mean() * freq) / vol
-    mdd = ((1 + returns).cumprod() / ((1 + returns).cumprod().cummax()) - 1).min()
-    return {"ann_return": r, "ann_vol": vol, "sharpe": sharpe, "max_dd": mdd}
+def annualized_stats(returns: pd.Series, freq: int = 252, turnover: pd.Series | None = None) -> dict:
+    stats = performance.summary(returns, turnover, freq=freq)
+    return {"ann_return": stats.pop("ann_ret"), **stats}
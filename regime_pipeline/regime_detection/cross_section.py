@@ -0,0 +1,235 @@
+"""Per-asset regime detection across a ticker universe.
+
+`detect_universe` fits the switching mean/variance model to every column
+of a returns panel. Each column is fitted on its own non-missing history,
+so assets with different listing dates can share one panel.
+
+Fits run on a process pool that reads the panel from a `SharedPanel`.
+Workers send back plain arrays (probabilities, bull state, parameters), not
+statsmodels results objects, and only a few tasks are in flight at a time.
+Probabilities are appended to a Parquet file as row groups while assets
+finish, so memory stays flat however large the universe is.
+
+Outputs under `output_dir`:
+
+- ``probabilities.parquet``: long format, one row per (date, ticker), with
+  ``Regime_*`` columns and ``bull_prob``.
+- ``assets.parquet``: one row per ticker with the bull state index,
+  log-likelihood, fitted parameters, fit time and any error.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .._lazy import lazy_import
+from ..shared_panel import PanelHandle, SharedPanel
+from . import data, markov, model
+
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+PROBABILITIES_FILE = "probabilities.parquet"
+ASSETS_FILE = "assets.parquet"
+
+_WORKER_STATE: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(handle: PanelHandle) -> None:
+    _WORKER_STATE["values"] = handle.array()
+    _WORKER_STATE["dates"] = handle.index.asi8
+
+
+def _fit_column(
+    column: int,
+    k_regimes: int,
+    engine: str,
+    probabilities: str,
+    min_obs: int,
+) -> Dict:
+    """Fit one asset; returns arrays only, so no results object leaves the worker."""
+    began = time.perf_counter()
+    values = _WORKER_STATE["values"][:, column]
+    keep = ~np.isnan(values)
+    dates = _WORKER_STATE["dates"][keep]
+    out: Dict = {"column": column, "dates": dates, "probs": None, "bull_state": -1, "llf": np.nan, "params": None}
+    try:
+        if keep.sum() < min_obs:
+            raise ValueError(f"only {int(keep.sum())} observations (min_obs={min_obs})")
+        series = pd.Series(values[keep], index=pd.DatetimeIndex(dates))
+        res = model.fit_markov_model(series, k_regimes=k_regimes, engine=engine)
+        marginals = (
+            res.smoothed_marginal_probabilities if probabilities == "smoothed" else res.filtered_marginal_probabilities
+        )
+        out["probs"] = model._time_by_state(marginals, k_regimes)
+        out["bull_state"] = model.identify_bull_state(res)
+        out["llf"] = float(res.llf)
+        out["params"] = model._param_values(res, markov.param_names(k_regimes))
+        out["error"] = ""
+    except Exception as exc:  # one bad asset must not sink the batch
+        out["error"] = f"{type(exc).__name__}: {exc}"
+    out["seconds"] = time.perf_counter() - began
+    return out
+
+
+class _ProbabilityWriter:
+    """Buffers long-format rows and appends them to Parquet in row groups."""
+
+    def __init__(self, path: Path, k_regimes: int, flush_rows: int) -> None:
+        self.path = path
+        self.states = [f"Regime_{i}" for i in range(k_regimes)]
+        self.flush_rows = flush_rows
+        self.schema = pa.schema(
+            [("date", pa.timestamp("ns")), ("ticker", pa.string())]
+            + [(name, pa.float64()) for name in self.states]
+            + [("bull_prob", pa.float64())]
+        )
+        self.writer = pq.ParquetWriter(str(path), self.schema)
+        self.buffer: List[Dict[str, np.ndarray]] = []
+        self.buffered = 0
+
+    def add(self, ticker: str, dates: np.ndarray, probs: np.ndarray, bull_state: int) -> None:
+        chunk = {"date": dates, "ticker": np.full(len(dates), ticker, dtype=object)}
+        chunk.update({name: probs[:, i] for i, name in enumerate(self.states)})
+        chunk["bull_prob"] = probs[:, bull_state]
+        self.buffer.append(chunk)
+        self.buffered += len(dates)
+        if self.buffered >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        columns = {name: np.concatenate([chunk[name] for chunk in self.buffer]) for name in self.schema.names}
+        columns["date"] = columns["date"].astype("datetime64[ns]")
+        self.writer.write_table(pa.table(columns, schema=self.schema))
+        self.buffer, self.buffered = [], 0
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+
+def detect_universe(
+    returns: pd.DataFrame,
+    output_dir: str | Path,
+    *,
+    k_regimes: int = 2,
+    engine: str = "statsmodels",
+    probabilities: str = "smoothed",
+    n_jobs: int = 1,
+    min_obs: int = 252,
+    flush_rows: int = 250_000,
+) -> pd.DataFrame:
+    """Fit the switching model to every column of a returns panel.
+
+    Args:
+        returns: Daily returns, dates x tickers; NaNs mark days an asset did
+            not trade.
+        output_dir: Directory for the Parquet outputs.
+        k_regimes: Number of regimes.
+        engine: ``"statsmodels"`` or ``"native"``.
+        probabilities: ``"smoothed"`` (full-sample, like
+            `run_regime_detection`) or ``"filtered"``.
+        n_jobs: Worker processes (-1 for all cores).
+        min_obs: Assets with fewer observations are skipped with an error.
+        flush_rows: Probability rows buffered per Parquet row group.
+
+    Returns:
+        The per-asset table also written to ``assets.parquet``.
+    """
+    if probabilities not in ("smoothed", "filtered"):
+        raise ValueError(f"Unknown probabilities kind {probabilities!r}")
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    tickers = [str(column) for column in returns.columns]
+    names = markov.param_names(k_regimes)
+    rows: List[Dict] = []
+
+    def collect(result: Dict) -> None:
+        ticker = tickers[result["column"]]
+        if result["probs"] is not None:
+            writer.add(ticker, result["dates"], result["probs"], result["bull_state"])
+        params = result["params"] if result["params"] is not None else np.full(len(names), np.nan)
+        row = {"ticker": ticker, "bull_state": result["bull_state"], "llf": result["llf"], "n_obs": len(result["dates"])}
+        row.update(zip(names, params))
+        row.update(seconds=result["seconds"], error=result["error"])
+        rows.append(row)
+
+    n_workers = (os.cpu_count() or 1) if n_jobs == -1 else max(int(n_jobs), 1)
+    task_args = (k_regimes, engine, probabilities, min_obs)
+    writer = _ProbabilityWriter(out / PROBABILITIES_FILE, k_regimes, flush_rows)
+    try:
+        with SharedPanel.from_frame(returns) as panel:
+            if n_workers == 1 or len(tickers) == 1:
+                _init_worker(panel.handle)
+                try:
+                    for column in range(len(tickers)):
+                        collect(_fit_column(column, *task_args))
+                finally:
+                    _WORKER_STATE.clear()
+            else:
+                with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(panel.handle,)) as pool:
+                    pending = set()
+                    # keep a bounded number of fits in flight and write each as it lands
+                    for column in range(len(tickers)):
+                        pending.add(pool.submit(_fit_column, column, *task_args))
+                        if len(pending) >= 2 * n_workers:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                collect(future.result())
+                    for future in pending:
+                        collect(future.result())
+    finally:
+        writer.close()
+
+    assets = pd.DataFrame(rows).set_index("ticker").reindex(tickers)
+    assets.to_parquet(out / ASSETS_FILE)
+    return assets
+
+
+def load_bull_probabilities(output_dir: str | Path, tickers: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Bull-regime probabilities from `detect_universe` output as a dates x tickers frame."""
+    filters = [("ticker", "in", list(tickers))] if tickers is not None else None
+    frame = pd.read_parquet(Path(output_dir) / PROBABILITIES_FILE, columns=["date", "ticker", "bull_prob"], filters=filters)
+    wide = frame.pivot(index="date", columns="ticker", values="bull_prob")
+    wide.columns.name = None
+    return wide.reindex(columns=list(tickers)) if tickers is not None else wide
+
+
+def run_universe_detection(
+    tickers: Iterable[str],
+    output_dir: str | Path,
+    *,
+    config_path: Path | str | None = None,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """Load the universe through the market-data layer and run `detect_universe`.
+
+    Dates, data provider and model settings come from the regime-detection
+    config; only the ticker list is replaced.
+    """
+    cfg = data.load_config(config_path)
+    cache_dir = cfg["data"].get("cache_dir", "data")
+    prices = data.download_prices(
+        list(tickers),
+        start=cfg["data"]["start"],
+        end=cfg["data"].get("end"),
+        cache_path=Path(cache_dir) / "prices" if cache_dir else None,
+        provider=cfg["data"].get("provider"),
+    )
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    return detect_universe(
+        returns,
+        output_dir,
+        k_regimes=cfg["model"]["n_states"],
+        engine=cfg["model"].get("engine", "statsmodels"),
+        n_jobs=n_jobs,
+    )
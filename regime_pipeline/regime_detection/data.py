@@ -4,9 +4,11 @@ from pathlib import Path
 from typing import Any, Dict, Iterable
 
 import pandas as pd
-import yfinance as yf
 import yaml
 
+from .. import market_data
+from ..market_data import PriceProvider
+
 
 def default_config_path() -> Path:
     """Return the default location of the regime detection config."""
@@ -24,25 +26,17 @@ def download_prices(
     tickers: Iterable[str],
     start: str,
     end: str | None = None,
+    *,
+    cache_path: Path | str | None = market_data.DEFAULT_CACHE_DIR,
+    provider: PriceProvider | str | dict | None = None,
 ) -> pd.DataFrame:
-    """Download adjusted close prices for the provided tickers."""
-    data = yf.download(
-        tickers=list(tickers),
-        start=start,
-        end=end,
-        auto_adjust=False,
-        progress=False,
-        threads=True,
-    )
-    if data.empty:
-        raise ValueError("No price data returned from Yahoo Finance.")
+    """Load adjusted close prices through the shared market-data layer.
 
-    if isinstance(data.columns, pd.MultiIndex):
-        prices = data["Adj Close"]
-    else:
-        prices = data
-
-    return prices.sort_index().ffill()
+    The default cache directory is the one used by the sector-rotation stage,
+    so both stages share a single store and in-memory panel.
+    """
+    market = market_data.shared(cache_path=cache_path, provider=provider)
+    return market.prices(list(tickers), start=start, end=end).sort_index()
 
 
 def load_prices(
@@ -56,8 +50,15 @@ def load_prices(
     tickers = cfg["data"]["tickers"]
     start = cfg["data"]["start"]
     end = cfg["data"].get("end")
+    cache_dir = cfg["data"].get("cache_dir", "data")
 
-    prices = download_prices(tickers, start=start, end=end)
+    prices = download_prices(
+        tickers,
+        start=start,
+        end=end,
+        cache_path=Path(cache_dir) / "prices" if cache_dir else None,
+        provider=cfg["data"].get("provider"),
+    )
     prices = prices.dropna(how="all")
     if returns:
         return prices.pct_change().dropna()
@@ -0,0 +1,364 @@
+"""Native NumPy engine for the two-parameter Markov-switching model.
+
+Covers the ``MarkovRegression(trend="c", switching_variance=True)`` case used by
+`model.fit_markov_model`: each regime has its own mean and variance, and the
+regime follows a first-order Markov chain started from its ergodic
+distribution. All kernels carry a leading batch axis so many series (tickers,
+rolling windows) are filtered, smoothed and fitted in the same pass over time.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+_TINY = 1e-300
+
+
+def param_names(k_regimes: int) -> List[str]:
+    """Parameter labels in the same order as statsmodels' MarkovRegression."""
+    names = [f"p[{i}->{j}]" for j in range(k_regimes - 1) for i in range(k_regimes)]
+    names += [f"const[{i}]" for i in range(k_regimes)]
+    names += [f"sigma2[{i}]" for i in range(k_regimes)]
+    return names
+
+
+def stationary_distribution(transmat: np.ndarray) -> np.ndarray:
+    """Ergodic distributions of a batch of row-stochastic matrices (B, k, k) -> (B, k)."""
+    transmat = np.asarray(transmat, dtype=float)
+    k = transmat.shape[-1]
+    a = np.concatenate([np.swapaxes(transmat, -1, -2) - np.eye(k), np.ones(transmat.shape[:-2] + (1, k))], axis=-2)
+    b = np.zeros(transmat.shape[:-2] + (k + 1, 1))
+    b[..., -1, 0] = 1.0
+    ata = np.swapaxes(a, -1, -2) @ a
+    atb = np.swapaxes(a, -1, -2) @ b
+    pi = np.linalg.solve(ata, atb)[..., 0]
+    pi = np.clip(pi, 0.0, None)
+    return pi / pi.sum(axis=-1, keepdims=True)
+
+
+def emission_loglik(y: np.ndarray, means: np.ndarray, variances: np.ndarray) -> np.ndarray:
+    """Gaussian log densities of (T, B) observations under (B, k) regime parameters -> (T, B, k)."""
+    resid = y[:, :, None] - means[None, :, :]
+    return -0.5 * (np.log(2 * np.pi * variances)[None, :, :] + resid**2 / variances[None, :, :])
+
+
+def hamilton_filter(
+    loglik: np.ndarray,
+    transmat: np.ndarray,
+    initial: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hamilton filter in scaled form.
+
+    Emission densities are exponentiated only after subtracting each row's
+    maximum, and the scale factors are accumulated in log space, so the
+    likelihood is exact without underflow.
+
+    Args:
+        loglik: Regime log densities, shape (T, B, k).
+        transmat: Row-stochastic transition matrices, shape (B, k, k).
+        initial: Distribution of the regime before the first observation,
+            shape (B, k). Defaults to the ergodic distribution.
+
+    Returns:
+        Tuple of filtered probabilities (T, B, k), predicted probabilities
+        (T, B, k) and log-likelihoods (B,).
+    """
+    n_obs, n_batch, k = loglik.shape
+    shift = loglik.max(axis=2, keepdims=True)
+    lik = np.exp(loglik - shift)
+    probs = stationary_distribution(transmat) if initial is None else np.asarray(initial, dtype=float)
+
+    filtered = np.empty_like(lik)
+    predicted = np.empty_like(lik)
+    norms = np.empty((n_obs, n_batch))
+    for t in range(n_obs):
+        pred = (probs[:, None, :] @ transmat)[:, 0, :]
+        joint = pred * lik[t]
+        norm = joint.sum(axis=1)
+        probs = joint / np.maximum(norm, _TINY)[:, None]
+        predicted[t] = pred
+        filtered[t] = probs
+        norms[t] = norm
+
+    llf = (np.log(np.maximum(norms, _TINY)) + shift[:, :, 0]).sum(axis=0)
+    return filtered, predicted, llf
+
+
+def kim_smoother(
+    filtered: np.ndarray,
+    predicted: np.ndarray,
+    transmat: np.ndarray,
+    initial: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Kim smoother returning smoothed marginals and expected transition counts.
+
+    Args:
+        filtered: Filtered probabilities (T, B, k).
+        predicted: One-step predicted probabilities (T, B, k).
+        transmat: Row-stochastic transition matrices (B, k, k).
+        initial: Pre-sample regime distribution used by the filter (B, k).
+            Defaults to the ergodic distribution.
+
+    Returns:
+        Tuple of smoothed probabilities (T, B, k), expected transition counts
+        ``sum_t P(s_{t-1}=i, s_t=j | Y)`` including the pre-sample transition
+        (B, k, k), and the smoothed pre-sample distribution (B, k).
+    """
+    n_obs = filtered.shape[0]
+    initial = stationary_distribution(transmat) if initial is None else np.asarray(initial, dtype=float)
+    smoothed = np.empty_like(filtered)
+    smoothed[-1] = filtered[-1]
+    counts = np.zeros_like(transmat)
+    for t in range(n_obs - 2, -1, -1):
+        ratio = smoothed[t + 1] / np.maximum(predicted[t + 1], _TINY)
+        joint = filtered[t][:, :, None] * transmat * ratio[:, None, :]
+        counts += joint
+        smoothed[t] = joint.sum(axis=2)
+
+    ratio = smoothed[0] / np.maximum(predicted[0], _TINY)
+    joint = initial[:, :, None] * transmat * ratio[:, None, :]
+    counts += joint
+    return smoothed, counts, joint.sum(axis=2)
+
+
+def _transition_mstep(
+    counts: np.ndarray,
+    presample: np.ndarray,
+    transmat: np.ndarray,
+    n_steps: int = 20,
+) -> np.ndarray:
+    """Maximise ``sum N_ij log P_ij + sum_l g_l log pi_l(P)`` over row-stochastic P.
+
+    The ergodic prior makes the M-step non-closed-form; its stationarity
+    condition ``P_ij = (N_ij + P_ij G_ij) / sum_j (N_ij + P_ij G_ij)`` with
+    ``G_ij = d/dP_ij sum_l g_l log pi_l = pi_i sum_l Z_jl g_l / pi_l`` (Z the
+    fundamental matrix) is solved by fixed-point iteration from the
+    count-based estimate. The correction is O(1) against O(T) counts, so it
+    converges in a handful of steps.
+    """
+    k = transmat.shape[-1]
+    ones = np.ones(k)
+    trans = counts / np.maximum(counts.sum(axis=2, keepdims=True), _TINY)
+    for _ in range(n_steps):
+        pi = stationary_distribution(trans)
+        fundamental = np.linalg.inv(np.eye(k) - trans + ones[:, None] * pi[:, None, :])
+        grad = pi[:, :, None] * (fundamental @ (presample / np.maximum(pi, _TINY))[:, :, None])[:, None, :, 0]
+        numer = np.maximum(counts + trans * grad, _TINY)
+        updated = numer / numer.sum(axis=2, keepdims=True)
+        if np.max(np.abs(updated - trans)) < 1e-14:
+            trans = updated
+            break
+        trans = updated
+    return trans
+
+
+@dataclass
+class EMResult:
+    """Array-level output of the batched EM fitter."""
+
+    transmat: np.ndarray
+    means: np.ndarray
+    variances: np.ndarray
+    llf: np.ndarray
+    n_iter: np.ndarray
+    converged: np.ndarray
+    filtered: np.ndarray
+    predicted: np.ndarray
+    smoothed: np.ndarray
+
+
+def _start_params(y: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Deterministic starting values: regimes spread from calm/high-mean to volatile/low-mean."""
+    n_batch = y.shape[1]
+    mean = y.mean(axis=0)
+    std = y.std(axis=0)
+    spread = np.linspace(0.5, -0.5, k) if k > 1 else np.zeros(1)
+    scale = np.linspace(0.5, 2.0, k) if k > 1 else np.ones(1)
+    means = mean[:, None] + 0.1 * spread[None, :] * std[:, None]
+    variances = (std[:, None] ** 2) * scale[None, :]
+    stay = 0.9 if k > 1 else 1.0
+    transmat = np.full((n_batch, k, k), (1 - stay) / max(k - 1, 1))
+    transmat[:, np.arange(k), np.arange(k)] = stay
+    return transmat, means, variances
+
+
+def em_fit(
+    y: np.ndarray,
+    k_regimes: int = 2,
+    *,
+    max_iter: int = 500,
+    tol: float = 1e-8,
+    start: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+) -> EMResult:
+    """Fit switching-mean/variance models to every column of `y` by EM.
+
+    Each iteration runs the filter and smoother over all columns at once. The
+    chain is started from its ergodic distribution, matching statsmodels'
+    default initialisation. Columns stop updating once the log-likelihood gain
+    falls below `tol`.
+
+    Args:
+        y: Observations with shape (T,) or (T, B).
+        k_regimes: Number of regimes.
+        max_iter: Maximum number of EM iterations.
+        tol: Absolute log-likelihood improvement that counts as converged.
+        start: Optional (transmat (B, k, k), means (B, k), variances (B, k))
+            starting values, e.g. a previous fit for warm starts.
+
+    Returns:
+        EMResult with parameters, diagnostics and probabilities for each column.
+    """
+    y = np.asarray(y, dtype=float)
+    if y.ndim == 1:
+        y = y[:, None]
+    n_obs, n_batch = y.shape
+    k = k_regimes
+
+    if start is None:
+        transmat, means, variances = _start_params(y, k)
+    else:
+        transmat, means, variances = (np.array(p, dtype=float, copy=True) for p in start)
+    var_floor = 1e-8 * np.maximum(y.var(axis=0), _TINY)[:, None]
+
+    llf = np.full(n_batch, -np.inf)
+    n_iter = np.zeros(n_batch, dtype=int)
+    converged = np.zeros(n_batch, dtype=bool)
+    for _ in range(max_iter):
+        filtered, predicted, new_llf = hamilton_filter(emission_loglik(y, means, variances), transmat)
+        smoothed, counts, presample = kim_smoother(filtered, predicted, transmat)
+
+        converged |= np.abs(new_llf - llf) < tol
+        active = ~converged
+        llf = np.where(active, new_llf, llf)
+        if not active.any():
+            break
+        n_iter += active
+
+        weights = smoothed.sum(axis=0)
+        new_means = np.einsum("tbk,tb->bk", smoothed, y) / np.maximum(weights, _TINY)
+        resid2 = (y[:, :, None] - new_means[None, :, :]) ** 2
+        new_vars = np.maximum(np.einsum("tbk,tbk->bk", smoothed, resid2) / np.maximum(weights, _TINY), var_floor)
+        new_trans = _transition_mstep(counts, presample, transmat)
+
+        means = np.where(active[:, None], new_means, means)
+        variances = np.where(active[:, None], new_vars, variances)
+        transmat = np.where(active[:, None, None], new_trans, transmat)
+    else:
+        filtered, predicted, llf = hamilton_filter(emission_loglik(y, means, variances), transmat)
+        smoothed, _, _ = kim_smoother(filtered, predicted, transmat)
+
+    return EMResult(
+        transmat=transmat,
+        means=means,
+        variances=variances,
+        llf=llf,
+        n_iter=n_iter,
+        converged=converged,
+        filtered=filtered,
+        predicted=predicted,
+        smoothed=smoothed,
+    )
+
+
+@dataclass
+class MarkovSwitchingResults:
+    """Fitted switching-mean/variance model exposing the statsmodels results surface
+    used by `model.extract_probabilities`, `model.identify_bull_state` and
+    `model.filter_state`."""
+
+    params: pd.Series
+    k_regimes: int
+    llf: float
+    n_iter: int
+    converged: bool
+    filtered_marginal_probabilities: pd.DataFrame
+    predicted_marginal_probabilities: pd.DataFrame
+    smoothed_marginal_probabilities: pd.DataFrame
+
+    @property
+    def param_names(self) -> List[str]:
+        return list(self.params.index)
+
+    def start_params(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Parameters in the (transmat, means, variances) layout accepted by `em_fit(start=...)`."""
+        k = self.k_regimes
+        values = self.params
+        transmat = np.zeros((1, k, k))
+        for i in range(k):
+            transmat[0, i, :-1] = [values[f"p[{i}->{j}]"] for j in range(k - 1)]
+            transmat[0, i, -1] = 1.0 - transmat[0, i, :-1].sum()
+        means = np.array([[values[f"const[{i}]"] for i in range(k)]])
+        variances = np.array([[values[f"sigma2[{i}]"] for i in range(k)]])
+        return transmat, means, variances
+
+
+def _results_from_em(em: EMResult, column: int, index: pd.Index, k_regimes: int) -> MarkovSwitchingResults:
+    transmat = em.transmat[column]
+    values = [transmat[i, j] for j in range(k_regimes - 1) for i in range(k_regimes)]
+    values += list(em.means[column]) + list(em.variances[column])
+
+    def frame(arr: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(arr[:, column, :], index=index, columns=range(k_regimes))
+
+    return MarkovSwitchingResults(
+        params=pd.Series(values, index=param_names(k_regimes), dtype=float),
+        k_regimes=k_regimes,
+        llf=float(em.llf[column]),
+        n_iter=int(em.n_iter[column]),
+        converged=bool(em.converged[column]),
+        filtered_marginal_probabilities=frame(em.filtered),
+        predicted_marginal_probabilities=frame(em.predicted),
+        smoothed_marginal_probabilities=frame(em.smoothed),
+    )
+
+
+def fit_markov_switching(
+    returns: pd.Series,
+    k_regimes: int = 2,
+    *,
+    max_iter: int = 500,
+    tol: float = 1e-8,
+    start: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+) -> MarkovSwitchingResults:
+    """Fit the switching-mean/variance model to a single return series.
+
+    Args:
+        returns: Daily returns.
+        k_regimes: Number of regimes.
+        max_iter: Maximum number of EM iterations.
+        tol: Absolute log-likelihood improvement that counts as converged.
+        start: Optional starting values, e.g. `previous.start_params()`.
+
+    Returns:
+        MarkovSwitchingResults with parameters and marginal probabilities.
+    """
+    em = em_fit(returns.to_numpy(dtype=float), k_regimes, max_iter=max_iter, tol=tol, start=start)
+    return _results_from_em(em, 0, returns.index, k_regimes)
+
+
+def fit_markov_switching_panel(
+    returns: pd.DataFrame,
+    k_regimes: int = 2,
+    *,
+    max_iter: int = 500,
+    tol: float = 1e-8,
+) -> Dict[str, MarkovSwitchingResults]:
+    """Fit one model per column of an aligned return panel in a single batched EM run.
+
+    Args:
+        returns: Daily returns with one column per series and no missing values.
+        k_regimes: Number of regimes.
+        max_iter: Maximum number of EM iterations.
+        tol: Absolute log-likelihood improvement that counts as converged.
+
+    Returns:
+        Mapping of column name to its fitted results.
+    """
+    if returns.isna().any().any():
+        raise ValueError("Return panel must not contain missing values; align or drop them first.")
+    em = em_fit(returns.to_numpy(dtype=float), k_regimes, max_iter=max_iter, tol=tol)
+    return {name: _results_from_em(em, j, returns.index, k_regimes) for j, name in enumerate(returns.columns)}
@@ -1,20 +1,62 @@
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.regime_switching.markov_regression import MarkovRegression
 
-def fit_markov_model(returns: pd.Series, k_regimes: int = 2):
+from .._lazy import lazy_import
+from ..filtering import RegimeFilter
+from . import markov, multistart
+
+markov_regression = lazy_import("statsmodels.tsa.regime_switching.markov_regression")
+
+def fit_markov_model(
+    returns: pd.Series,
+    k_regimes: int = 2,
+    engine: str = "statsmodels",
+    warm_start=None,
+    n_starts: int = 1,
+    n_jobs: int = 1,
+    seed: int | None = 0,
+    return_diagnostics: bool = False,
+):
     """
     Fit a Markov-switching model on daily returns.
+
+    `engine="native"` uses the in-package NumPy EM (`markov.fit_markov_switching`),
+    which reaches the same maximum-likelihood estimates as statsmodels.
+    `warm_start` is a previous fit (from the same engine) whose parameters
+    seed the optimiser instead of the default starting values. Otherwise
+    `n_starts > 1` keeps the best of several randomised starts, run on
+    `n_jobs` processes (see `multistart.fit_markov_multistart`).
+
+    With `return_diagnostics`, returns a tuple of the results and the
+    per-start diagnostics frame (None for a single start).
     """
-    model = MarkovRegression(returns, k_regimes=k_regimes, trend="c", switching_variance=True)
-    res = model.fit(disp=False)
-    return res
+    if warm_start is None and n_starts > 1:
+        res, diagnostics = multistart.fit_markov_multistart(
+            returns, k_regimes, engine=engine, n_starts=n_starts, n_jobs=n_jobs, seed=seed
+        )
+        return (res, diagnostics) if return_diagnostics else res
+    if engine == "native":
+        start = warm_start.start_params() if warm_start is not None else None
+        res = markov.fit_markov_switching(returns, k_regimes=k_regimes, start=start)
+        return (res, None) if return_diagnostics else res
+    if engine != "statsmodels":
+        raise ValueError(f"Unknown Markov model engine: {engine!r}")
+    model = markov_regression.MarkovRegression(returns, k_regimes=k_regimes, trend="c", switching_variance=True)
+    start = np.asarray(warm_start.params, dtype=float) if warm_start is not None else None
+    res = model.fit(start_params=start, disp=False)
+    return (res, None) if return_diagnostics else res
 
 def extract_probabilities(res):
     """
     Extract smoothed state probabilities.
     """
-    probs = pd.DataFrame(res.smoothed_marginal_probabilities.T, columns=[f"Regime_{i}" for i in range(res.k_regimes)])
+    smoothed = res.smoothed_marginal_probabilities
+    index = smoothed.index if isinstance(smoothed, pd.DataFrame) else None
+    probs = pd.DataFrame(
+        _time_by_state(smoothed, res.k_regimes),
+        index=index,
+        columns=[f"Regime_{i}" for i in range(res.k_regimes)],
+    )
     return probs
 
 def identify_bull_state(res):
@@ -35,5 +77,41 @@ def identify_bull_state(res):
 
     return int(np.argmax(means))
 
+def _param_values(res, names):
+    params = res.params
+    if isinstance(params, pd.Series):
+        return np.array([params[name] for name in names], dtype=float)
+    param_names = list(getattr(res.model, "param_names", []))
+    return np.array([params[param_names.index(name)] for name in names], dtype=float)
+
+def _time_by_state(probs, k_regimes: int) -> np.ndarray:
+    arr = np.asarray(probs, dtype=float)
+    if arr.shape[0] == k_regimes and arr.shape[1] != k_regimes:
+        arr = arr.T
+    return arr
+
+def filter_state(res, refit_every: int | None = None) -> RegimeFilter:
+    """
+    Build an online filter state from a fitted switching-mean/variance model,
+    positioned after the last in-sample observation.
+    """
+    k = res.k_regimes
+    transmat = np.zeros((k, k))
+    for i in range(k):
+        transmat[i, :-1] = _param_values(res, [f"p[{i}->{j}]" for j in range(k - 1)])
+        transmat[i, -1] = 1.0 - transmat[i, :-1].sum()
+
+    filtered = res.filtered_marginal_probabilities
+    index = getattr(filtered, "index", None)
+    return RegimeFilter(
+        transmat=transmat,
+        means=_param_values(res, [f"const[{i}]" for i in range(k)]),
+        covariances=_param_values(res, [f"sigma2[{i}]" for i in range(k)]),
+        probabilities=_time_by_state(filtered, k)[-1],
+        bull_state=identify_bull_state(res),
+        last_date=index[-1] if isinstance(index, pd.DatetimeIndex) else None,
+        refit_every=refit_every,
+    )
+
 if __name__ == "__main__":
     print("Model module loaded.")
@@ -0,0 +1,188 @@
+"""Multi-start maximum likelihood for the Markov-switching model.
+
+A single fit from the default starting values occasionally stops in a poor
+local optimum, which can also flip which regime `identify_bull_state`
+labels as bull. `fit_markov_multistart` runs several randomised starts
+and keeps the best.
+
+Starts advance in rounds of a few EM iterations (the native kernel from
+`markov`), one task per start on a process pool that reads the returns
+from a `SharedPanel`. After every round, starts whose log-likelihood
+trails the leader by more than `abandon_margin` are dropped, so hopeless
+starts cost only a round or two. The best surviving parameters then seed a
+final fit with the requested engine.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .._lazy import lazy_import
+from ..shared_panel import PanelHandle, SharedPanel
+from . import markov
+
+markov_regression = lazy_import("statsmodels.tsa.regime_switching.markov_regression")
+
+Params = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+_WORKER_STATE: Dict[str, np.ndarray] = {}
+
+
+def random_starts(y: np.ndarray, k_regimes: int, n_starts: int, seed: Optional[int] = 0) -> List[Params]:
+    """Starting values: the native EM's deterministic start first, then random ones.
+
+    The first start is `markov._start_params`, the same for both engines; it
+    is not statsmodels' own ``start_params``.
+
+    Random starts draw regime means around the sample mean (half a standard
+    deviation of spread), variances within a factor of about 4.5 of the
+    sample variance, and persistent transition matrices.
+    """
+    y = np.asarray(y, dtype=float)
+    rng = np.random.default_rng(seed)
+    default = markov._start_params(y[:, None], k_regimes)
+    starts = [default]
+    mean, std = y.mean(), y.std()
+    for _ in range(n_starts - 1):
+        means = mean + std * rng.normal(0.0, 0.5, k_regimes)
+        variances = std**2 * np.exp(rng.uniform(-1.5, 1.5, k_regimes))
+        stay = rng.uniform(0.7, 0.99, k_regimes) if k_regimes > 1 else np.ones(1)
+        transmat = rng.dirichlet(np.ones(k_regimes), k_regimes)
+        np.fill_diagonal(transmat, 0.0)
+        transmat *= ((1 - stay) / np.maximum(transmat.sum(axis=1), 1e-12))[:, None]
+        transmat[np.diag_indices(k_regimes)] = stay
+        starts.append((transmat[None], means[None], variances[None]))
+    return starts
+
+
+def _init_worker(handle: PanelHandle) -> None:
+    _WORKER_STATE["y"] = handle.array()[:, 0]
+
+
+def _advance(params: Params, n_iter: int, tol: float) -> Tuple[Params, float, int, bool, float]:
+    """Run up to `n_iter` EM iterations from `params` on the worker's returns."""
+    began = time.perf_counter()
+    em = markov.em_fit(_WORKER_STATE["y"], params[1].shape[-1], max_iter=n_iter, tol=tol, start=params)
+    fitted = (em.transmat, em.means, em.variances)
+    return fitted, float(em.llf[0]), int(em.n_iter[0]), bool(em.converged[0]), time.perf_counter() - began
+
+
+def _to_vector(params: Params) -> np.ndarray:
+    """(transmat, means, variances) in statsmodels' `param_names` order."""
+    transmat, means, variances = (np.asarray(p)[0] for p in params)
+    k = means.shape[0]
+    values = [transmat[i, j] for j in range(k - 1) for i in range(k)]
+    return np.array(values + list(means) + list(variances), dtype=float)
+
+
+def _final_fit(returns: pd.Series, k_regimes: int, engine: str, params: Params):
+    if engine == "native":
+        return markov.fit_markov_switching(returns, k_regimes=k_regimes, start=params)
+    if engine != "statsmodels":
+        raise ValueError(f"Unknown Markov model engine: {engine!r}")
+    model = markov_regression.MarkovRegression(returns, k_regimes=k_regimes, trend="c", switching_variance=True)
+    return model.fit(start_params=_to_vector(params), disp=False)
+
+
+def fit_markov_multistart(
+    returns: pd.Series,
+    k_regimes: int = 2,
+    *,
+    engine: str = "statsmodels",
+    n_starts: int = 8,
+    n_jobs: int = 1,
+    seed: Optional[int] = 0,
+    round_iter: int = 10,
+    max_iter: int = 500,
+    abandon_margin: float = 10.0,
+    tol: float = 1e-8,
+):
+    """Fit from `n_starts` starting points and keep the highest likelihood.
+
+    Args:
+        returns: Daily returns.
+        k_regimes: Number of regimes.
+        engine: Engine of the final fit (``"statsmodels"`` or ``"native"``).
+        n_starts: Number of starts, the first being the native EM's
+            deterministic start (see `random_starts`).
+        n_jobs: Worker processes (-1 for all cores).
+        seed: Seed for the random starts.
+        round_iter: EM iterations per round between abandonment checks.
+        max_iter: EM iteration budget per start.
+        abandon_margin: Log-likelihood gap to the leader beyond which a start
+            is dropped after a round.
+        tol: Log-likelihood gain that counts as converged.
+
+    Returns:
+        Tuple of the best fitted results and a diagnostics frame with one row
+        per start: log-likelihood, EM iterations, seconds, the bull-regime
+        mean and the outcome (``selected``, ``converged``, ``max_iter`` or
+        ``abandoned``).
+    """
+    returns = returns.dropna()
+    y = returns.to_numpy(dtype=float)
+    params = random_starts(y, k_regimes, max(int(n_starts), 1), seed)
+    n = len(params)
+    llf = np.full(n, -np.inf)
+    iterations = np.zeros(n, dtype=int)
+    seconds = np.zeros(n)
+    status = np.array(["running"] * n, dtype=object)
+
+    n_workers = (os.cpu_count() or 1) if n_jobs == -1 else max(int(n_jobs), 1)
+    n_workers = min(n_workers, n)
+    panel = SharedPanel(y[:, None])
+    pool = None
+    try:
+        if n_workers > 1:
+            pool = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(panel.handle,))
+        else:
+            _init_worker(panel.handle)
+
+        while (status == "running").any():
+            active = np.flatnonzero(status == "running")
+            budget = [min(round_iter, max_iter - iterations[i]) for i in active]
+            if pool is None:
+                outcomes = [_advance(params[i], b, tol) for i, b in zip(active, budget)]
+            else:
+                outcomes = list(pool.map(_advance, [params[i] for i in active], budget, [tol] * len(active)))
+            for i, (fitted, value, used, converged, elapsed) in zip(active, outcomes):
+                params[i], llf[i] = fitted, value
+                iterations[i] += used
+                seconds[i] += elapsed
+                if converged:
+                    status[i] = "converged"
+                elif iterations[i] >= max_iter:
+                    status[i] = "max_iter"
+            running = status == "running"
+            status[running & (llf < llf.max() - abandon_margin)] = "abandoned"
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _WORKER_STATE.pop("y", None)
+        panel.close()
+
+    candidates = np.flatnonzero(status != "abandoned")
+    best = int(candidates[np.argmax(llf[candidates])])
+    began = time.perf_counter()
+    result = _final_fit(returns, k_regimes, engine, params[best])
+    seconds[best] += time.perf_counter() - began
+    status[best] = "selected"
+
+    diagnostics = pd.DataFrame(
+        {
+            "llf": llf,
+            "iterations": iterations,
+            "seconds": seconds,
+            "bull_mean": [float(p[1].max()) for p in params],
+            "status": status,
+        },
+        index=pd.RangeIndex(n, name="start"),
+    )
+    diagnostics.loc[best, "llf"] = float(result.llf)
+    return result, diagnostics
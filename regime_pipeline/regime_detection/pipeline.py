@@ -1,13 +1,25 @@
 from __future__ import annotations
 
+import json
+import os
+import shutil
+import uuid
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
+from .. import artifacts
+from .._lazy import lazy_import
 from . import backtest, data, model, plots, signals
+from .walk_forward import WalkForwardConfig, walk_forward_probabilities
+
+plt = lazy_import("matplotlib.pyplot")
+
+# bump when the model, signal or artifact layout changes so old caches miss
+CACHE_VERSION = 4
+_FRAMES = ("returns", "prices", "probabilities", "backtest")
 
 
 @dataclass
@@ -21,19 +33,176 @@ class RegimeDetectionResult:
     signal: pd.Series
     backtest: pd.DataFrame
     stats: Dict[str, float]
+    bull_state: Optional[int] = None
+    diagnostics: Optional[pd.DataFrame] = None
 
     def risk_flag(self) -> pd.Series:
         """Binary 1/0 risk-on signal derived from the trading position."""
         return (self.signal > 0.5).astype(int)
 
+    def save(self, directory: Path | str) -> Path:
+        """Persist every artifact under `directory` (written atomically)."""
+        target = Path(directory)
+        staging = target.parent / f".{target.name}.{uuid.uuid4().hex}.tmp"
+        staging.mkdir(parents=True)
+        for name in _FRAMES:
+            getattr(self, name).to_parquet(staging / f"{name}.parquet")
+        self.signal.to_frame("signal").to_parquet(staging / "signal.parquet")
+        if self.diagnostics is not None:
+            self.diagnostics.to_parquet(staging / "diagnostics.parquet")
+        meta = {"config": self.config, "stats": self.stats, "bull_state": self.bull_state}
+        (staging / "result.json").write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(staging, target)
+        return target
+
+    @classmethod
+    def load(cls, directory: Path | str) -> "RegimeDetectionResult":
+        """Restore a result written by `save`."""
+        directory = Path(directory)
+        meta = json.loads((directory / "result.json").read_text(encoding="utf-8"))
+        frames = {name: pd.read_parquet(directory / f"{name}.parquet") for name in _FRAMES}
+        signal = pd.read_parquet(directory / "signal.parquet")["signal"]
+        diagnostics_path = directory / "diagnostics.parquet"
+        return cls(
+            config=meta["config"],
+            signal=signal.rename(None),
+            stats=meta["stats"],
+            bull_state=meta["bull_state"],
+            diagnostics=pd.read_parquet(diagnostics_path) if diagnostics_path.exists() else None,
+            **frames,
+        )
+
+
+def result_key(cfg: Dict, returns: pd.DataFrame) -> str:
+    """Cache key for a config and the returns it is fitted on."""
+    return artifacts.cache_key(CACHE_VERSION, artifacts.config_hash(cfg), artifacts.frame_fingerprint(returns))
+
+
+def fit_regimes(
+    returns: pd.Series,
+    *,
+    n_states: int = 2,
+    engine: str = "statsmodels",
+    walk_forward: Optional[Dict] = None,
+    n_starts: int = 1,
+    n_jobs: int = 1,
+) -> Dict:
+    """Fit the Markov model; returns regime probabilities, the bull state and fit diagnostics.
+
+    By default one full-sample fit gives smoothed probabilities. With an
+    enabled `walk_forward` config section the probabilities are out of sample
+    (see `walk_forward.walk_forward_probabilities`) and start after the
+    burn-in period. `n_starts > 1` keeps the best of several randomised
+    starts of the full-sample fit, run on `n_jobs` processes.
+
+    ``diagnostics`` holds one row per refit in walk-forward mode, one row
+    per start when `n_starts > 1`, and is None otherwise.
+    """
+    wf_config = WalkForwardConfig.from_config(walk_forward)
+    if wf_config is not None:
+        probabilities, diagnostics = walk_forward_probabilities(returns, wf_config, k_regimes=n_states, engine=engine)
+        return {"probabilities": probabilities, "bull_state": 0, "diagnostics": diagnostics}
+    res, diagnostics = model.fit_markov_model(
+        returns, k_regimes=n_states, engine=engine, n_starts=n_starts, n_jobs=n_jobs, return_diagnostics=True
+    )
+    return {
+        "probabilities": model.extract_probabilities(res),
+        "bull_state": int(model.identify_bull_state(res)),
+        "diagnostics": diagnostics,
+    }
+
+
+def regime_signal(probabilities: pd.DataFrame, bull_state: int, *, threshold: float = 0.5) -> pd.Series:
+    """Smoothed hysteresis position on the bull-state probability."""
+    buy = max(0.5, threshold)
+    sell = min(0.5, 1 - threshold)
+    positions = signals.hysteresis_signal(probabilities[f"Regime_{bull_state}"], buy=buy, sell=sell)
+    return signals.smooth_positions(positions, k=3)
+
+
+def signal_lag(walk_forward: Optional[Dict] = None) -> int:
+    """Bars between a signal and the return it trades.
+
+    Walk-forward probabilities are filtered, so the signal for day t already
+    reflects that day's return and can only be traded from day t + 1.
+    """
+    return 1 if WalkForwardConfig.from_config(walk_forward) is not None else 0
+
+
+def regime_backtest(
+    prices: pd.DataFrame,
+    signal: pd.Series,
+    *,
+    bench: str,
+    cash: Optional[str] = None,
+    tc_bps: float = 5.0,
+    lag: int = 0,
+) -> Dict:
+    """Backtest the regime signal from its first date; returns the backtest frame and its stats.
+
+    With `lag`, the position held on each day is the signal from `lag` bars
+    earlier (see `signal_lag`).
+    """
+    prices = prices.loc[signal.index[0] :]
+    cash_series = prices[cash] if cash else None
+    bt = backtest.backtest(prices[bench], signal.shift(lag), cash=cash_series, tc_bps=tc_bps)
+    return {"backtest": bt, "stats": backtest.annualized_stats(bt["strat_ret"], turnover=bt["turnover"])}
+
+
+def _detect(cfg: Dict, returns: pd.DataFrame) -> RegimeDetectionResult:
+    bench = cfg["data"]["tickers"][0]
+    cash = cfg["data"]["tickers"][1] if len(cfg["data"]["tickers"]) > 1 else None
+
+    prices = (1 + returns).cumprod()
+    fit = fit_regimes(
+        returns[bench],
+        n_states=cfg["model"]["n_states"],
+        engine=cfg["model"].get("engine", "statsmodels"),
+        walk_forward=cfg["model"].get("walk_forward"),
+        n_starts=cfg["model"].get("n_starts", 1),
+        n_jobs=cfg["model"].get("n_jobs", 1),
+    )
+    smoothed = regime_signal(fit["probabilities"], fit["bull_state"], threshold=cfg["signals"]["threshold"])
+    bt = regime_backtest(
+        prices,
+        smoothed,
+        bench=bench,
+        cash=cash,
+        tc_bps=cfg.get("trading_cost_bps", 5.0),
+        lag=signal_lag(cfg["model"].get("walk_forward")),
+    )
+
+    return RegimeDetectionResult(
+        config=cfg,
+        returns=returns,
+        prices=prices,
+        probabilities=fit["probabilities"],
+        signal=smoothed,
+        backtest=bt["backtest"],
+        stats=bt["stats"],
+        bull_state=fit["bull_state"],
+        diagnostics=fit["diagnostics"],
+    )
+
 
 def run_regime_detection(
     config_path: Path | str | None = None,
     *,
     output_dir: Path | str | None = None,
     show_plots: bool = False,
+    save_plots: bool = False,
+    cache_dir: Path | str | None = None,
+    use_cache: bool = True,
 ) -> RegimeDetectionResult:
-    """Execute the regime-detection workflow and optionally persist outputs."""
+    """Execute the regime-detection workflow and optionally persist outputs.
+
+    Results are cached under `cache_dir` (default: ``<output_dir>/cache``),
+    keyed by a hash of the config and a fingerprint of the input returns. A
+    hit skips the model fit; any change to either recomputes. With
+    `save_plots`, the charts are rendered headlessly to ``<output_dir>/plots``.
+    """
     cfg = data.load_config(config_path)
 
     bench = cfg["data"]["tickers"][0]
@@ -42,32 +211,23 @@ def run_regime_detection(
     returns = data.load_prices(cfg, returns=True)
     returns = returns[[bench] + ([cash] if cash else [])].dropna()
 
-    prices = (1 + returns).cumprod()
+    if cache_dir is None and output_dir:
+        cache_dir = Path(output_dir) / "cache"
+    entry = Path(cache_dir) / result_key(cfg, returns) if use_cache and cache_dir else None
 
-    res = model.fit_markov_model(returns[bench], k_regimes=cfg["model"]["n_states"])
-    probabilities = model.extract_probabilities(res)
-    bull_state = model.identify_bull_state(res)
-    bull_col = f"Regime_{bull_state}"
+    result = None
+    if entry is not None and (entry / "result.json").exists():
+        try:
+            result = RegimeDetectionResult.load(entry)
+        except Exception:
+            result = None
+    if result is None:
+        result = _detect(cfg, returns)
+        if entry is not None:
+            result.save(entry)
 
-    threshold = cfg["signals"]["threshold"]
-    buy = max(0.5, threshold)
-    sell = min(0.5, 1 - threshold)
-    positions = signals.hysteresis_signal(probabilities[bull_col], buy=buy, sell=sell)
-    smoothed = signals.smooth_positions(positions, k=3)
-
-    cash_series = prices[cash] if cash else None
-    bt = backtest.backtest(prices[bench], smoothed, cash=cash_series, tc_bps=cfg.get("trading_cost_bps", 5.0))
-    stats = backtest.annualized_stats(bt["strat_ret"])
-
-    result = RegimeDetectionResult(
-        config=cfg,
-        returns=returns,
-        prices=prices,
-        probabilities=probabilities,
-        signal=smoothed,
-        backtest=bt,
-        stats=stats,
-    )
+    prices, probabilities, bt, stats = result.prices, result.probabilities, result.backtest, result.stats
+    bull_col = f"Regime_{result.bull_state}"
 
     if output_dir:
         out_dir = Path(output_dir)
@@ -76,6 +236,10 @@ def run_regime_detection(
         result.risk_flag().to_csv(out_dir / "risk_signal.csv", header=["risk_on"])
         bt.to_csv(out_dir / "regime_backtest.csv")
         pd.Series(stats).to_csv(out_dir / "regime_stats.csv", header=["value"])
+        if result.diagnostics is not None:
+            result.diagnostics.to_csv(out_dir / "fit_diagnostics.csv")
+        if save_plots:
+            plots.render_report(prices[bench], probabilities[bull_col], bt, out_dir / "plots")
 
     if show_plots:
         plots.plot_regimes(prices[bench], probabilities, bull_col=bull_col)
@@ -1,6 +1,18 @@
-import matplotlib.pyplot as plt
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict
+
 import pandas as pd
 
+from .. import report
+from .._lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
+
+CHARTS = ("regimes", "equity", "drawdown")
+
+
 def plot_regimes(prices: pd.Series, probs: pd.DataFrame, bull_col: str = "Regime_0"):
     fig, ax1 = plt.subplots(figsize=(10, 5))
     ax1.plot(prices, color="black", label="Price")
@@ -9,20 +21,42 @@ def plot_regimes(prices: pd.Series, probs: pd.DataFrame, bull_col: str = "Regime
     ax1.set_title("Price and Bull Regime Probability")
     ax1.legend(loc="upper left")
     ax2.legend(loc="upper right")
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    return fig
 
 def plot_equity(df: pd.DataFrame):
     fig, ax = plt.subplots(figsize=(10, 4))
     ax.plot(df["equity"], label="Strategy Equity", color="green")
     ax.set_title("Strategy Equity Curve")
     ax.legend()
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    return fig
 
 def plot_drawdown(df: pd.DataFrame):
     fig, ax = plt.subplots(figsize=(10, 2))
     ax.fill_between(df.index, df["drawdown"], color="red", alpha=0.5)
     ax.set_title("Drawdown")
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    return fig
+
+def render_report(
+    prices: pd.Series,
+    bull_probability: pd.Series,
+    backtest: pd.DataFrame,
+    out_dir: str | Path,
+    *,
+    prefix: str | None = None,
+    dpi: int = report.DEFAULT_DPI,
+    max_points: int = report.DEFAULT_MAX_POINTS,
+) -> Dict[str, str]:
+    """Write the regime, equity and drawdown charts as PNGs (headless).
+
+    Returns a mapping of chart name to written path.
+    """
+    paths = report.output_paths(out_dir, CHARTS, prefix)
+    figures = {
+        "regimes": report.regime_figure(prices, bull_probability, max_points=max_points),
+        "equity": report.equity_figure(backtest["equity"], title="Strategy Equity Curve", max_points=max_points),
+        "drawdown": report.drawdown_figure(backtest["drawdown"], max_points=max_points),
+    }
+    return {name: report.save_figure(fig, paths[name], dpi=dpi) for name, fig in figures.items()}
@@ -1,5 +1,63 @@
+from __future__ import annotations
+
+from typing import Iterable, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
 
+
+def hysteresis_positions(bull_prob: np.ndarray, buy, sell) -> np.ndarray:
+    """
+    Vectorized hysteresis kernel.
+
+    `bull_prob` has shape (T,); `buy` and `sell` are scalars or 1-D arrays of
+    length G. Returns a (T,) array for scalar thresholds, otherwise (T, G).
+    The state at each step is the most recent decisive event (prob >= buy ->
+    1, prob <= sell -> 0, buy taking precedence), starting flat.
+    """
+    prob = np.asarray(bull_prob, dtype=float)
+    scalar = np.ndim(buy) == 0 and np.ndim(sell) == 0
+    buy_arr = np.atleast_1d(np.asarray(buy, dtype=float))
+    sell_arr = np.atleast_1d(np.asarray(sell, dtype=float))
+    buy_arr, sell_arr = np.broadcast_arrays(buy_arr, sell_arr)
+
+    p = prob[:, None]
+    go_long = p >= buy_arr[None, :]
+    go_flat = ~go_long & (p <= sell_arr[None, :])
+    decisive = go_long | go_flat
+
+    # forward-fill the index of the last decisive observation per column
+    rows = np.arange(len(prob))[:, None]
+    last = np.maximum.accumulate(np.where(decisive, rows, -1), axis=0)
+    filled = np.take_along_axis(go_long, np.maximum(last, 0), axis=0)
+    pos = np.where(last >= 0, filled, False).astype(float)
+    return pos[:, 0] if scalar else pos
+
+
+def smooth_positions_array(pos: np.ndarray, windows: Iterable[int]) -> np.ndarray:
+    """
+    Trailing rolling mean (min_periods=1) of a (T,) or (T, G) position array
+    for each window in `windows`. Returns shape (T, G, len(windows)).
+    """
+    windows = list(windows)
+    arr = np.asarray(pos, dtype=float)
+    if arr.ndim == 1:
+        arr = arr[:, None]
+    n = arr.shape[0]
+    csum = np.vstack([np.zeros((1, arr.shape[1])), np.cumsum(arr, axis=0)])
+    ends = np.arange(1, n + 1)
+
+    out = np.empty(arr.shape + (len(windows),), dtype=float)
+    for j, k in enumerate(windows):
+        if k <= 1:
+            out[:, :, j] = arr
+            continue
+        starts = np.maximum(ends - k, 0)
+        counts = (ends - starts)[:, None]
+        out[:, :, j] = np.clip((csum[ends] - csum[starts]) / counts, 0, 1)
+    return out
+
+
 def hysteresis_signal(bull_prob: pd.Series, buy=0.60, sell=0.40) -> pd.Series:
     """
     Long/flat with hysteresis:
@@ -7,16 +65,35 @@ def hysteresis_signal(bull_prob: pd.Series, buy=0.60, sell=0.40) -> pd.Series:
       - go flat when prob <= sell
       - otherwise keep previous state
     """
-    pos, state = pd.Series(index=bull_prob.index, dtype=float), 0.0
-    for t, p in bull_prob.items():
-        if p >= buy:
-            state = 1.0
-        elif p <= sell:
-            state = 0.0
-        pos.loc[t] = state
-    return pos
+    pos = hysteresis_positions(bull_prob.to_numpy(dtype=float), buy, sell)
+    return pd.Series(pos, index=bull_prob.index, dtype=float)
+
 
 def smooth_positions(pos: pd.Series, k: int = 3) -> pd.Series:
     if k <= 1:
         return pos
     return pos.rolling(k, min_periods=1).mean().clip(0, 1)
+
+
+def hysteresis_grid(
+    bull_prob: pd.Series,
+    thresholds: Sequence[Tuple[float, float]],
+    windows: Sequence[int] = (3,),
+) -> pd.DataFrame:
+    """
+    Evaluate every (buy, sell) pair and smoothing window in one pass.
+
+    Returns a DataFrame indexed like `bull_prob` with (buy, sell, k) MultiIndex
+    columns; each column equals
+    `smooth_positions(hysteresis_signal(bull_prob, buy, sell), k)`.
+    """
+    pairs = np.asarray(thresholds, dtype=float).reshape(-1, 2)
+    raw = hysteresis_positions(bull_prob.to_numpy(dtype=float), pairs[:, 0], pairs[:, 1])
+    smoothed = smooth_positions_array(raw, windows)
+
+    columns = pd.MultiIndex.from_tuples(
+        [(buy, sell, k) for buy, sell in pairs for k in windows],
+        names=["buy", "sell", "k"],
+    )
+    values = smoothed.reshape(len(bull_prob), -1)
+    return pd.DataFrame(values, index=bull_prob.index, columns=columns)
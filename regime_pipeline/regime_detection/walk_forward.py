@@ -0,0 +1,179 @@
+"""Walk-forward (out-of-sample) regime probabilities.
+
+The full-sample fit trades on smoothed probabilities, which look ahead. In
+walk-forward mode the model is refitted on a schedule (e.g. at every month
+start) using only the data before the refit date. The next stretch up to
+the following refit is then tracked with the Hamilton filter from that
+fit's parameters, so the probability for day t uses returns up to t only.
+
+Refits either warm-start from the previous fit's parameters, which makes
+each refit a few optimiser steps and forces them to run in sequence, or
+start cold and run concurrently in a process pool that reads the returns
+from a `SharedPanel`.
+
+Regime labels are made consistent across refits by ordering regimes by
+fitted mean, highest first, so ``Regime_0`` is always the bull regime.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..shared_panel import PanelHandle, SharedPanel
+from . import model
+
+_WORKER_STATE: Dict[str, pd.Series] = {}
+
+
+@dataclass(frozen=True)
+class WalkForwardConfig:
+    """Walk-forward settings (the ``model.walk_forward`` config section).
+
+    Attributes:
+        refit: Refit schedule: a pandas period alias (``"M"``, ``"Q"``,
+            ``"W"``) refits at the first observation of each period, an
+            integer refits every that many observations.
+        window: ``"expanding"`` trains on all history, ``"rolling"`` on the
+            last `lookback` observations.
+        min_train: Observations before the first fit; no probabilities are
+            produced for this burn-in period.
+        lookback: Training window length for ``window="rolling"``.
+        warm_start: Seed each refit with the previous fit's parameters.
+        n_jobs: Worker processes for cold-start refits (-1 for all cores).
+    """
+
+    refit: str | int = "M"
+    window: str = "expanding"
+    min_train: int = 504
+    lookback: Optional[int] = None
+    warm_start: bool = True
+    n_jobs: int = 1
+
+    def __post_init__(self) -> None:
+        if self.window not in ("expanding", "rolling"):
+            raise ValueError(f"Unknown walk-forward window {self.window!r}")
+        if self.window == "rolling" and not self.lookback:
+            raise ValueError("A rolling walk-forward window needs `lookback`")
+
+    @classmethod
+    def from_config(cls, section: Optional[Mapping]) -> Optional["WalkForwardConfig"]:
+        """Settings from a config section, or None when walk-forward is disabled."""
+        if not section or not section.get("enabled", False):
+            return None
+        known = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in section.items() if key in known})
+
+
+def refit_schedule(index: pd.DatetimeIndex, config: WalkForwardConfig) -> np.ndarray:
+    """Positions in `index` at which the model is refitted."""
+    n = len(index)
+    first = int(config.min_train)
+    if first >= n:
+        raise ValueError(f"Need more than min_train={first} observations, got {n}")
+    if isinstance(config.refit, (int, np.integer)):
+        return np.arange(first, n, int(config.refit))
+    periods = index.to_period(config.refit)
+    starts = np.flatnonzero(periods[1:] != periods[:-1]) + 1
+    return np.concatenate([[first], starts[starts > first]])
+
+
+def _train_start(stop: int, config: WalkForwardConfig) -> int:
+    return 0 if config.window == "expanding" else max(0, stop - int(config.lookback))
+
+
+def _fit_segment(
+    returns: pd.Series,
+    bounds: Tuple[int, int, int],
+    k_regimes: int,
+    engine: str,
+    warm_start=None,
+) -> Tuple[np.ndarray, Dict, object]:
+    """Fit on ``[start, stop)`` and filter ``[stop, end)``.
+
+    Returns:
+        Out-of-sample probabilities with regimes ordered by mean (highest
+        first), a diagnostics row and the fitted results.
+    """
+    start, stop, end = bounds
+    began = time.perf_counter()
+    res = model.fit_markov_model(returns.iloc[start:stop], k_regimes=k_regimes, engine=engine, warm_start=warm_start)
+    state = model.filter_state(res)
+    probs = state.update(returns.iloc[stop:end]).to_numpy()
+    order = np.argsort(-state.means[:, 0], kind="stable")
+    info = {
+        "date": returns.index[stop],
+        "train_start": returns.index[start],
+        "n_train": stop - start,
+        "llf": float(res.llf),
+        "bull_mean": float(state.means[order[0], 0]),
+        "bear_mean": float(state.means[order[-1], 0]),
+        "seconds": time.perf_counter() - began,
+    }
+    return probs[:, order], info, res
+
+
+def _init_worker(handle: PanelHandle) -> None:
+    _WORKER_STATE["returns"] = handle.frame().iloc[:, 0]
+
+
+def _cold_segment(bounds: Tuple[int, int, int], k_regimes: int, engine: str) -> Tuple[np.ndarray, Dict]:
+    probs, info, _ = _fit_segment(_WORKER_STATE["returns"], bounds, k_regimes, engine)
+    return probs, info
+
+
+def walk_forward_probabilities(
+    returns: pd.Series,
+    config: WalkForwardConfig,
+    *,
+    k_regimes: int = 2,
+    engine: str = "statsmodels",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Out-of-sample filtered regime probabilities.
+
+    Args:
+        returns: Daily returns of the benchmark.
+        config: Refit schedule, window and parallelism.
+        k_regimes: Number of regimes.
+        engine: ``"statsmodels"`` or ``"native"`` (see `model.fit_markov_model`).
+
+    Returns:
+        Tuple of probabilities (``Regime_*`` columns, bull regime first) from
+        the first refit date on, and one diagnostics row per refit.
+    """
+    returns = returns.dropna()
+    refits = refit_schedule(returns.index, config)
+    ends = np.append(refits[1:], len(returns))
+    segments: List[Tuple[int, int, int]] = [
+        (_train_start(stop, config), int(stop), int(end)) for stop, end in zip(refits, ends)
+    ]
+
+    n_workers = (os.cpu_count() or 1) if config.n_jobs == -1 else max(int(config.n_jobs), 1)
+    if config.warm_start or n_workers == 1 or len(segments) == 1:
+        results, previous = [], None
+        for bounds in segments:
+            probs, info, fitted = _fit_segment(returns, bounds, k_regimes, engine, previous)
+            results.append((probs, info))
+            previous = fitted if config.warm_start else None
+    else:
+        with SharedPanel.from_frame(returns.to_frame()) as panel:
+            with ProcessPoolExecutor(
+                max_workers=min(n_workers, len(segments)), initializer=_init_worker, initargs=(panel.handle,)
+            ) as pool:
+                futures = [pool.submit(_cold_segment, bounds, k_regimes, engine) for bounds in segments]
+                results = [future.result() for future in futures]
+
+    index = returns.index[refits[0] :]
+    probabilities = pd.DataFrame(
+        np.concatenate([probs for probs, _ in results]),
+        index=index,
+        columns=[f"Regime_{i}" for i in range(k_regimes)],
+    )
+    diagnostics = pd.DataFrame([info for _, info in results]).set_index("date")
+    return probabilities, diagnostics
@@ -0,0 +1,183 @@
+"""Headless chart rendering shared by both pipeline stages.
+
+Charts are built on explicit `matplotlib.figure.Figure` objects with an Agg
+canvas, so nothing touches pyplot's global state or needs a display, and
+rendering is safe in worker processes. Long daily series are decimated
+with `downsample` before drawing, keeping each bucket's extremes so spikes
+and drawdowns stay visible. `render_many` renders many runs' reports on a
+process pool.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ._lazy import lazy_import
+
+mpl_figure = lazy_import("matplotlib.figure")
+backend_agg = lazy_import("matplotlib.backends.backend_agg")
+
+DEFAULT_MAX_POINTS = 2000
+DEFAULT_DPI = 100
+
+ReportJob = Tuple[Callable[..., Dict[str, str]], Mapping[str, Any]]
+
+
+def downsample(data: pd.Series | pd.DataFrame, max_points: int = DEFAULT_MAX_POINTS) -> pd.Series | pd.DataFrame:
+    """Min/max decimation of a series or frame to at most about `max_points` rows.
+
+    Rows are split into ``max_points // 2`` equal buckets and, per column, the
+    rows holding each bucket's minimum and maximum are kept (the first and
+    last rows are always kept). Shorter inputs are returned unchanged.
+    """
+    n = len(data)
+    if max_points <= 0 or n <= max_points:
+        return data
+    values = data.to_numpy(dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+
+    buckets = max(1, max_points // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    size = int(np.diff(edges).max())
+    # pad every bucket to the same width so argmin/argmax run on one array
+    positions = edges[:-1, None] + np.arange(size)[None, :]
+    valid = positions < edges[1:, None]
+    positions = np.minimum(positions, n - 1)
+
+    keep = [np.array([0, n - 1])]
+    for col in range(values.shape[1]):
+        block = values[positions, col]
+        with np.errstate(invalid="ignore"):
+            low = np.where(valid & ~np.isnan(block), block, np.inf)
+            high = np.where(valid & ~np.isnan(block), block, -np.inf)
+        rows = np.arange(buckets)
+        keep.append(positions[rows, low.argmin(axis=1)])
+        keep.append(positions[rows, high.argmax(axis=1)])
+    return data.iloc[np.unique(np.concatenate(keep))]
+
+
+def new_figure(figsize: Tuple[float, float] = (10, 4)):
+    """Figure bound to an Agg canvas (no pyplot, no display)."""
+    fig = mpl_figure.Figure(figsize=figsize)
+    backend_agg.FigureCanvasAgg(fig)
+    return fig
+
+
+def save_figure(fig, path: str | Path, dpi: int = DEFAULT_DPI) -> str:
+    """Write a figure to `path` and release it."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    fig.clear()
+    return str(path)
+
+
+# ---------------------------------------------------------------------- charts
+def equity_figure(equity: pd.Series, title: str = "Equity Curve", max_points: int = DEFAULT_MAX_POINTS):
+    fig = new_figure((10, 5))
+    ax = fig.add_subplot()
+    shown = downsample(equity, max_points)
+    ax.plot(shown.index, shown.to_numpy(), color="green", label="Equity")
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Equity")
+    ax.legend(loc="upper left")
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+def drawdown_figure(drawdown: pd.Series, title: str = "Drawdown", max_points: int = DEFAULT_MAX_POINTS):
+    fig = new_figure((10, 2.5))
+    ax = fig.add_subplot()
+    shown = downsample(drawdown, max_points)
+    ax.fill_between(shown.index, shown.to_numpy(), color="red", alpha=0.5)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+def regime_figure(
+    prices: pd.Series,
+    bull_probability: pd.Series,
+    title: str = "Price and Bull Regime Probability",
+    max_points: int = DEFAULT_MAX_POINTS,
+):
+    fig = new_figure((10, 5))
+    ax1 = fig.add_subplot()
+    shown = downsample(prices, max_points)
+    ax1.plot(shown.index, shown.to_numpy(), color="black", label="Price")
+    ax2 = ax1.twinx()
+    prob = downsample(bull_probability, max_points)
+    ax2.plot(prob.index, prob.to_numpy(), color="blue", alpha=0.6, label="Bull prob")
+    ax2.set_ylim(0, 1)
+    ax1.set_title(title)
+    ax1.legend(loc="upper left")
+    ax2.legend(loc="upper right")
+    return fig
+
+
+def weights_figure(weights: pd.DataFrame, title: str = "Portfolio Weights"):
+    fig = new_figure((10, 5))
+    ax = fig.add_subplot()
+    held = weights.loc[:, (weights != 0).any(axis=0)]
+    if not held.empty:
+        ax.stackplot(held.index, held.to_numpy().T, labels=[str(c) for c in held.columns], step="post")
+        ax.legend(loc="upper left", fontsize="small", ncol=max(1, len(held.columns) // 8))
+    ax.set_ylim(0, max(1.0, float(held.sum(axis=1).max()) if not held.empty else 1.0))
+    ax.set_title(title)
+    return fig
+
+
+def turnover_figure(weights: pd.DataFrame, title: str = "Turnover per Rebalance"):
+    fig = new_figure((10, 2.5))
+    ax = fig.add_subplot()
+    turnover = 0.5 * weights.diff().abs().sum(axis=1)
+    if len(turnover):
+        turnover.iloc[0] = 0.5 * weights.iloc[0].abs().sum()
+        # one line collection instead of a patch per bar keeps long histories cheap
+        ax.vlines(turnover.index, 0.0, turnover.to_numpy(), color="steelblue", linewidth=2)
+        ax.set_ylim(bottom=0.0)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+# ---------------------------------------------------------------------- batches
+def _run_job(job: ReportJob) -> Dict[str, str]:
+    func, kwargs = job
+    return func(**kwargs)
+
+
+def render_many(jobs: Sequence[ReportJob], n_jobs: int = 1) -> List[Dict[str, str]]:
+    """Render many reports, optionally on a process pool.
+
+    Args:
+        jobs: ``(render_function, kwargs)`` pairs; render functions must be
+            module-level (picklable) and return a mapping of chart paths.
+        n_jobs: Worker processes (-1 for all cores).
+
+    Returns:
+        Each job's returned mapping, in input order.
+    """
+    n_workers = (os.cpu_count() or 1) if n_jobs == -1 else max(int(n_jobs), 1)
+    if n_workers == 1 or len(jobs) < 2:
+        return [_run_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs))) as pool:
+        return list(pool.map(_run_job, jobs, chunksize=max(1, len(jobs) // (4 * n_workers))))
+
+
+def drawdown_of(equity: pd.Series) -> pd.Series:
+    return equity / equity.cummax() - 1
+
+
+def output_paths(out_dir: str | Path, names: Sequence[str], prefix: Optional[str] = None) -> Dict[str, Path]:
+    out = Path(out_dir)
+    return {name: out / (f"{prefix}_{name}.png" if prefix else f"{name}.png") for name in names}
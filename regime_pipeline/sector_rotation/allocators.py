@@ -1,11 +1,92 @@
 from __future__ import annotations
 
-from typing import Iterable, List
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Tuple
 
 import numpy as np
 import pandas as pd
-from scipy.cluster.hierarchy import linkage, leaves_list
-from scipy.spatial.distance import squareform
+
+from .._lazy import lazy_import
+
+hierarchy = lazy_import("scipy.cluster.hierarchy")
+spatial_distance = lazy_import("scipy.spatial.distance")
+
+
+def top_k_mask(scores: np.ndarray, k: int) -> np.ndarray:
+    """Select the k highest non-NaN scores in each row of a score matrix.
+
+    Rows are partitioned around their k-th largest score rather than sorted.
+    Ties at the threshold go to the earliest columns, matching
+    `Series.nlargest(keep="first")`.
+
+    Args:
+        scores: Array of shape (dates, assets); NaN marks ineligible assets.
+        k: Number of assets to select per row.
+
+    Returns:
+        Boolean array of the same shape flagging the selected assets.
+    """
+    values = np.asarray(scores, dtype=float)
+    valid = ~np.isnan(values)
+    n_assets = values.shape[1]
+    kk = min(k, n_assets)
+    if kk <= 0 or values.size == 0:
+        return np.zeros(values.shape, dtype=bool)
+
+    filled = np.where(valid, values, -np.inf)
+    threshold = -np.partition(-filled, kk - 1, axis=1)[:, kk - 1 : kk]
+    above = valid & (filled > threshold)
+    ties = valid & (filled == threshold)
+    needed = kk - above.sum(axis=1, keepdims=True)
+    return above | (ties & (np.cumsum(ties, axis=1) <= needed))
+
+
+def top_k_weights(
+    scores: pd.DataFrame,
+    universe: Iterable[str],
+    k: int = 4,
+    scheme: str = "equal",
+) -> pd.DataFrame:
+    """Allocate across the top-k scoring assets per date.
+
+    Args:
+        scores: DataFrame of scores indexed by date.
+        universe: Eligible tickers.
+        k: Number of top assets to select.
+        scheme: ``"equal"`` for equal weights, ``"rank"`` for weights
+            proportional to rank (best asset gets k, next k-1, ...), or
+            ``"score"`` for weights proportional to the positive part of the
+            score (equal weights when no selected score is positive).
+
+    Returns:
+        DataFrame of weights indexed like `scores` with one column per ticker.
+    """
+    universe_list: List[str] = list(universe)
+    values = scores.reindex(columns=universe_list).to_numpy(dtype=float)
+    selected = top_k_mask(values, k)
+    counts = selected.sum(axis=1, keepdims=True)
+
+    if scheme == "equal":
+        raw = selected.astype(float)
+    elif scheme == "rank":
+        rows, cols = np.nonzero(selected)
+        order = np.lexsort((cols, -values[rows, cols], rows))
+        rows, cols = rows[order], cols[order]
+        row_start = np.concatenate([[0], np.cumsum(counts[:, 0])[:-1]])
+        position = np.arange(len(rows)) - row_start[rows]
+        raw = np.zeros(values.shape)
+        raw[rows, cols] = counts[rows, 0] - position
+    elif scheme == "score":
+        raw = np.where(selected, np.clip(np.nan_to_num(values, nan=0.0), 0.0, None), 0.0)
+        no_positive = raw.sum(axis=1) <= 0
+        raw[no_positive] = selected[no_positive]
+    else:
+        raise ValueError(f"Unknown top-k weighting scheme: {scheme!r}")
+
+    totals = raw.sum(axis=1, keepdims=True)
+    weights = np.divide(raw, totals, out=np.zeros_like(raw), where=totals > 0)
+    return pd.DataFrame(weights, index=scores.index, columns=universe_list)
 
 
 def top_k_equal(scores: pd.DataFrame, universe: Iterable[str], k: int = 4) -> pd.DataFrame:
@@ -19,21 +100,47 @@ def top_k_equal(scores: pd.DataFrame, universe: Iterable[str], k: int = 4) -> pd
     Returns:
         DataFrame of equal weights across selected assets.
     """
-    universe_list: List[str] = list(universe)
-    weights = []
-    index = []
+    return top_k_weights(scores, universe, k=k, scheme="equal")
+
+
+def inverse_vol_matrix(vol: np.ndarray, selected: np.ndarray | None = None) -> np.ndarray:
+    """Row-wise inverse-volatility weights over a selection of assets.
 
-    for dt, row in scores.iterrows():
-        row = row.reindex(universe_list)
-        valid = row.dropna()
-        alloc = pd.Series(0.0, index=universe_list)
-        if not valid.empty:
-            top = valid.nlargest(min(k, len(valid)))
-            alloc.loc[top.index] = 1.0 / len(top)
-        weights.append(alloc)
-        index.append(dt)
+    Zero or missing volatilities get no weight; rows where no selected asset
+    has a usable volatility fall back to equal weights across the selection.
+
+    Args:
+        vol: Volatilities of shape (dates, assets).
+        selected: Boolean mask of the same shape; defaults to every asset.
+
+    Returns:
+        Array of weights with each row summing to one over its selection
+        (rows without any selected asset are all zero).
+    """
+    vol = np.asarray(vol, dtype=float)
+    selected = np.ones(vol.shape, dtype=bool) if selected is None else np.asarray(selected, dtype=bool)
+    usable = selected & ~np.isnan(vol) & (vol != 0)
+    inv_vol = np.where(usable, 1.0 / np.where(usable, vol, 1.0), 0.0)
+    totals = inv_vol.sum(axis=1, keepdims=True)
+    weights = np.divide(inv_vol, totals, out=np.zeros_like(inv_vol), where=totals > 0)
+    counts = selected.sum(axis=1, keepdims=True)
+    equal = np.divide(1.0, counts, out=np.zeros(counts.shape), where=counts > 0)
+    return np.where((totals == 0) & selected, equal, weights)
 
-    return pd.DataFrame(weights, index=index, columns=universe_list)
+
+def inverse_vol_from_vol(vol: pd.Series) -> pd.Series:
+    """Inverse-volatility weights from a precomputed volatility vector.
+
+    Zero or missing volatilities get no weight; if none is usable the
+    weights fall back to equal weighting.
+
+    Args:
+        vol: Volatility per asset.
+
+    Returns:
+        Series of weights summing to one.
+    """
+    return pd.Series(inverse_vol_matrix(vol.to_numpy(dtype=float)[None])[0], index=vol.index)
 
 
 def inverse_vol_weights(prices: pd.DataFrame, lookback: int = 60) -> pd.DataFrame:
@@ -54,17 +161,147 @@ def inverse_vol_weights(prices: pd.DataFrame, lookback: int = 60) -> pd.DataFram
     if window.empty:
         weights = pd.Series(1.0 / len(prices.columns), index=prices.columns)
     else:
-        vol = window.std().replace(0.0, np.nan)
-        inv_vol = 1.0 / vol
-        if inv_vol.sum(min_count=1) == 0 or inv_vol.isna().all():
-            weights = pd.Series(1.0 / len(prices.columns), index=prices.columns)
-        else:
-            weights = inv_vol / inv_vol.sum()
-            weights = weights.fillna(0.0)
+        weights = inverse_vol_from_vol(window.std())
 
     return pd.DataFrame([weights], index=[prices.index[-1]])
 
 
+def _bisection_splits(n: int) -> List[Tuple[int, int, int]]:
+    """Top-down (start, split, stop) segments of HRP's recursive bisection over n leaves.
+
+    The halving depends only on the number of leaves, so the tree is shared by
+    every date and only the leaf ordering differs.
+    """
+    splits: List[Tuple[int, int, int]] = []
+    stack = [(0, n)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        mid = lo + (hi - lo) // 2
+        splits.append((lo, mid, hi))
+        stack.extend([(mid, hi), (lo, mid)])
+    return splits
+
+
+def _quasi_diag_order(corr: np.ndarray) -> np.ndarray | None:
+    """Single-linkage leaf order for one correlation matrix, or None if unusable."""
+    n = corr.shape[0]
+    upper = corr[np.triu_indices(n, k=1)]
+    if not np.isfinite(upper).all():
+        return None
+    distance = np.sqrt(np.clip(1.0 - corr, 0.0, None) / 2.0)
+    try:
+        condensed = spatial_distance.squareform(distance, checks=False)
+        return hierarchy.leaves_list(hierarchy.linkage(condensed, method="single")).astype(int)
+    except Exception:
+        return None
+
+
+def _hrp_chunk(cov: np.ndarray, corr: np.ndarray) -> np.ndarray:
+    n_dates, n = cov.shape[:2]
+    weights = np.full((n_dates, n), 1.0 / n)
+    if n == 1:
+        return weights
+
+    orders = np.tile(np.arange(n), (n_dates, 1))
+    usable = np.zeros(n_dates, dtype=bool)
+    for pos in range(n_dates):
+        order = _quasi_diag_order(corr[pos])
+        if order is not None:
+            orders[pos], usable[pos] = order, True
+    if not usable.any():
+        return weights
+
+    rows = np.flatnonzero(usable)
+    perm = orders[rows]
+    # covariance in quasi-diagonal order, then a summed-area table so that any
+    # contiguous cluster's equal-weight variance is an O(1) lookup
+    ordered = np.take_along_axis(np.take_along_axis(cov[rows], perm[:, :, None], axis=1), perm[:, None, :], axis=2)
+    table = np.zeros((len(rows), n + 1, n + 1))
+    table[:, 1:, 1:] = ordered.cumsum(axis=1).cumsum(axis=2)
+
+    def cluster_var(lo: int, hi: int) -> np.ndarray:
+        block = table[:, hi, hi] - table[:, lo, hi] - table[:, hi, lo] + table[:, lo, lo]
+        return block / float((hi - lo) ** 2)
+
+    alloc = np.ones((len(rows), n))
+    for lo, mid, hi in _bisection_splits(n):
+        left_var, right_var = cluster_var(lo, mid), cluster_var(mid, hi)
+        total = left_var + right_var
+        with np.errstate(invalid="ignore", divide="ignore"):
+            alpha_left = np.where(total == 0, 0.5, 1.0 - left_var / total)
+            alpha_right = np.where(total == 0, 0.5, 1.0 - right_var / total)
+        alloc[:, lo:mid] *= alpha_left[:, None]
+        alloc[:, mid:hi] *= alpha_right[:, None]
+    alloc /= alloc.sum(axis=1, keepdims=True)
+
+    placed = np.empty_like(alloc)
+    np.put_along_axis(placed, perm, alloc, axis=1)
+    weights[rows] = placed
+    return weights
+
+
+def hrp_weights_batch(
+    cov: np.ndarray,
+    corr: np.ndarray | None = None,
+    n_jobs: int = 1,
+    chunksize: int | None = None,
+) -> np.ndarray:
+    """Hierarchical Risk Parity weights for a stack of covariance matrices.
+
+    Each date's assets are ordered by single-linkage clustering on the
+    correlation distance; recursive bisection then runs on integer positions
+    for all dates at once, with cluster variances read from summed-area
+    tables of the reordered covariances.
+
+    Args:
+        cov: Covariance matrices of shape (dates, assets, assets).
+        corr: Matching correlation matrices; derived from `cov` when omitted.
+        n_jobs: Worker processes for the clustering step (-1 for all cores).
+        chunksize: Dates per worker task; defaults to an even split across workers.
+
+    Returns:
+        Array of shape (dates, assets) with HRP weights in the input asset
+        order. Dates whose correlations are unusable get equal weights.
+    """
+    cov = np.asarray(cov, dtype=float)
+    if cov.ndim != 3 or cov.shape[1] != cov.shape[2]:
+        raise ValueError("cov must have shape (dates, assets, assets).")
+    if corr is None:
+        vol = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / (vol[:, :, None] * vol[:, None, :])
+    corr = np.asarray(corr, dtype=float)
+
+    n_dates = cov.shape[0]
+    n_workers = (os.cpu_count() or 1) if n_jobs == -1 else max(int(n_jobs), 1)
+    if n_workers == 1 or n_dates < 2:
+        return _hrp_chunk(cov, corr)
+
+    chunksize = chunksize or max(1, -(-n_dates // (4 * n_workers)))
+    bounds = range(0, n_dates, chunksize)
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        parts = pool.map(_hrp_chunk, [cov[i : i + chunksize] for i in bounds], [corr[i : i + chunksize] for i in bounds])
+        return np.concatenate(list(parts), axis=0)
+
+
+def hrp_from_moments(cov: pd.DataFrame, corr: pd.DataFrame) -> pd.Series:
+    """Hierarchical Risk Parity weights from precomputed covariance and correlation.
+
+    Args:
+        cov: Covariance matrix labelled by asset.
+        corr: Correlation matrix with the same labels.
+
+    Returns:
+        Series of HRP weights in the order of `cov.columns`; equal weights if
+        the correlation matrix is unusable or clustering fails.
+    """
+    columns = cov.columns
+    weights = hrp_weights_batch(cov.to_numpy()[None], corr.reindex(index=columns, columns=columns).to_numpy()[None])
+    return pd.Series(weights[0], index=columns)
+
+
 def hrp_weights(prices: pd.DataFrame, lookback: int = 60) -> pd.DataFrame:
     """Compute Hierarchical Risk Parity weights via recursive bisection.
 
@@ -84,56 +321,5 @@ def hrp_weights(prices: pd.DataFrame, lookback: int = 60) -> pd.DataFrame:
         weights = pd.Series(1.0 / len(prices.columns), index=prices.columns)
         return pd.DataFrame([weights], index=[prices.index[-1]])
 
-    if len(prices.columns) == 1:
-        weights = pd.Series(1.0, index=prices.columns)
-        return pd.DataFrame([weights], index=[prices.index[-1]])
-
-    cov = window.cov()
-    corr = window.corr()
-
-    if corr.isna().all().all():
-        weights = pd.Series(1.0 / len(prices.columns), index=prices.columns)
-        return pd.DataFrame([weights], index=[prices.index[-1]])
-
-    distance = np.sqrt((1 - corr).clip(lower=0) / 2.0)
-    condensed = squareform(distance.values, checks=False)
-    try:
-        link = linkage(condensed, method="single")
-        sort_ix = leaves_list(link).astype(int)
-        ordered = corr.index[sort_ix].tolist()
-    except Exception:
-        weights = pd.Series(1.0 / len(prices.columns), index=prices.columns)
-        return pd.DataFrame([weights], index=[prices.index[-1]])
-
-    def _cluster_var(indices: List[str]) -> float:
-        cov_slice = cov.loc[indices, indices]
-        weights_vec = np.ones(len(indices)) / len(indices)
-        return float(weights_vec @ cov_slice.values @ weights_vec)
-
-    def _recursive_bisection(items: List[str]) -> dict[str, float]:
-        if len(items) == 1:
-            return {items[0]: 1.0}
-        split = len(items) // 2
-        left = items[:split]
-        right = items[split:]
-        left_var = _cluster_var(left)
-        right_var = _cluster_var(right)
-        total = left_var + right_var
-        if total == 0:
-            alpha_left = alpha_right = 0.5
-        else:
-            alpha_left = 1 - left_var / total
-            alpha_right = 1 - right_var / total
-        alloc = {}
-        for key, value in _recursive_bisection(left).items():
-            alloc[key] = value * alpha_left
-        for key, value in _recursive_bisection(right).items():
-            alloc[key] = value * alpha_right
-        return alloc
-
-    allocation = _recursive_bisection(ordered)
-    weights_series = pd.Series(allocation, index=ordered)
-    weights_series = weights_series / weights_series.sum()
-    weights_series = weights_series.reindex(prices.columns, fill_value=0.0)
-
-    return pd.DataFrame([weights_series], index=[prices.index[-1]])
+    weights = hrp_from_moments(window.cov(), window.corr())
+    return pd.DataFrame([weights.reindex(prices.columns, fill_value=0.0)], index=[prices.index[-1]])
@@ -3,6 +3,8 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
+from .. import performance
+
 
 def cap_turnover(
     prev_w: pd.Series,
@@ -30,20 +32,66 @@ def cap_turnover(
     return adjusted
 
 
+def cap_turnover_path(
+    targets: np.ndarray,
+    cap: float | np.ndarray = 0.30,
+    initial: np.ndarray | None = None,
+    renormalize: bool = False,
+) -> np.ndarray:
+    """Apply `cap_turnover` along a sequence of target weights.
+
+    Each date's rebalance starts from the previous date's capped weights, so
+    the dates are walked in order, but every step is a whole-array operation
+    and any leading axes are treated as independent portfolios.
+
+    Args:
+        targets: Target weights of shape (..., dates, assets).
+        cap: Maximum allowable turnover per rebalance (0-1); an array is
+            broadcast against the leading axes, one cap per portfolio.
+        initial: Weights held before the first date, shape (..., assets);
+            defaults to all cash (zeros).
+        renormalize: Rescale each capped row to sum to one when its sum is
+            positive, before it becomes the next starting point.
+
+    Returns:
+        Array of capped weights with the same shape as `targets`.
+    """
+    targets = np.asarray(targets, dtype=float)
+    prev = np.zeros(targets.shape[:-2] + targets.shape[-1:]) if initial is None else np.asarray(initial, dtype=float)
+    cap = np.asarray(cap, dtype=float)[..., None]
+    capped = np.empty(np.broadcast_shapes(targets.shape, cap.shape[:-1] + (1, 1)))
+    for t in range(targets.shape[-2]):
+        target = targets[..., t, :]
+        diff = target - prev
+        turnover = 0.5 * np.abs(diff).sum(axis=-1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            adjusted = np.where((turnover <= cap) | (turnover == 0), target, prev + diff * (cap / turnover))
+        if renormalize:
+            total = adjusted.sum(axis=-1, keepdims=True)
+            adjusted = np.divide(adjusted, total, out=adjusted.copy(), where=total > 0)
+        capped[..., t, :] = adjusted
+        prev = adjusted
+    return capped
+
+
 def portfolio_returns(
     weights: pd.DataFrame,
     prices: pd.DataFrame,
     fee_bps: float = 10,
-) -> pd.Series:
+    return_turnover: bool = False,
+) -> pd.Series | tuple[pd.Series, pd.Series]:
     """Compute daily portfolio returns from periodic weights.
 
     Args:
         weights: DataFrame of portfolio weights (e.g., monthly).
         prices: DataFrame of daily prices.
         fee_bps: Transaction fee per trade expressed in basis points.
+        return_turnover: Also return the daily one-way turnover the fees
+            were charged on.
 
     Returns:
-        Series of daily net returns after fees.
+        Series of daily net returns after fees, or a tuple of it and the
+        turnover with `return_turnover`.
     """
     prices = prices.sort_index()
     returns = prices.pct_change().fillna(0.0)
@@ -59,7 +107,45 @@ def portfolio_returns(
     turnover = 0.5 * (weights_daily.sub(weights_daily.shift(1)).abs().sum(axis=1))
     transaction_cost = turnover * (fee_bps / 10_000)
     net = gross - transaction_cost.fillna(0.0)
-    return net
+    return (net, turnover) if return_turnover else net
+
+
+def rebalance_returns(
+    weights: np.ndarray,
+    rebalance_dates: pd.DatetimeIndex,
+    returns: pd.DataFrame,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Daily gross returns and turnover for stacks of periodic weights.
+
+    Follows `portfolio_returns`: weights take effect on rebalance dates that
+    are trading days, are held until the next one, and earn returns from the
+    following day.
+
+    Args:
+        weights: Weights of shape (..., rebalance dates, assets), with assets
+            ordered like `returns.columns`.
+        rebalance_dates: Dates of the weight rows.
+        returns: Daily asset returns (NaN-free), shape (days, assets).
+
+    Returns:
+        Tuple of gross returns and one-way turnover, each of shape (..., days).
+    """
+    weights = np.asarray(weights, dtype=float)
+    n_days = len(returns)
+    pos = returns.index.get_indexer(pd.DatetimeIndex(rebalance_dates))
+    marker = np.full(n_days, -1)
+    marker[pos[pos >= 0]] = np.flatnonzero(pos >= 0)
+    # row of the weights held at the close of each day; -1 before the first rebalance
+    held = np.maximum.accumulate(marker)
+    lagged = np.concatenate([[-1], held[:-1]])
+
+    padded = np.concatenate([np.zeros(weights.shape[:-2] + (1, weights.shape[-1])), weights], axis=-2)
+    held_w = padded[..., held + 1, :]
+    lagged_w = padded[..., lagged + 1, :]
+    gross = np.einsum("...tn,tn->...t", lagged_w, returns.to_numpy(dtype=float))
+    turnover = 0.5 * np.abs(held_w - lagged_w).sum(axis=-1)
+    turnover[..., 0] = 0.0
+    return gross, turnover
 
 
 def vol_target(
@@ -71,8 +157,9 @@ def vol_target(
     """Apply volatility targeting to a return series.
 
     Args:
-        returns: Daily returns.
-        target_annual_vol: Desired annualized volatility.
+        returns: Daily returns, or a DataFrame of independent strategies.
+        target_annual_vol: Desired annualized volatility (one per column
+            when `returns` is a DataFrame).
         lookback: Lookback window in days for realized volatility.
         max_leverage: Maximum leverage multiplier.
 
@@ -87,23 +174,23 @@ def vol_target(
     return returns * scale
 
 
-def perf_stats(returns: pd.Series) -> dict[str, float]:
-    """Compute performance statistics for a daily return series."""
-    if returns.empty:
-        return {"ann_ret": 0.0, "ann_vol": 0.0, "sharpe": 0.0, "max_dd": 0.0}
+def perf_stats_frame(returns: pd.DataFrame, turnover: np.ndarray | pd.DataFrame | None = None) -> pd.DataFrame:
+    """`perf_stats` for every column of a frame of daily returns.
+
+    Args:
+        returns: Daily returns, one strategy per column.
+        turnover: Optional one-way turnover with one column per strategy.
+
+    Returns:
+        DataFrame indexed by the input columns with one column per
+        `performance.METRICS` entry.
+    """
+    return performance.strategy_stats(returns, turnover)
 
-    cumulative = (1 + returns).cumprod()
-    running_max = cumulative.cummax()
-    drawdown = (cumulative / running_max) - 1
-    max_dd = drawdown.min()
 
-    ann_ret = (1 + returns).prod() ** (252 / len(returns)) - 1
-    ann_vol = returns.std(ddof=0) * np.sqrt(252)
-    sharpe = ann_ret / ann_vol if ann_vol > 0 else 0.0
+def perf_stats(returns: pd.Series, turnover: np.ndarray | pd.Series | None = None) -> dict[str, float]:
+    """Compute performance statistics for a daily return series.
 
-    return {
-        "ann_ret": float(ann_ret),
-        "ann_vol": float(ann_vol),
-        "sharpe": float(sharpe),
-        "max_dd": float(max_dd),
-    }
+    See `regime_pipeline.performance` for the metric definitions.
+    """
+    return performance.summary(returns, turnover)
@@ -4,7 +4,10 @@ from pathlib import Path
 from typing import Iterable, List, Sequence
 
 import pandas as pd
-import yfinance as yf
+
+from .. import market_data
+from ..market_data import PriceProvider
+from ..store import PriceStore
 
 SECTORS: List[str] = [
     "XLY",
@@ -34,54 +37,30 @@ def download_prices(
     start: str,
     end: str | None = None,
     cache_path: str | Path | None = None,
+    provider: PriceProvider | str | dict | None = None,
 ) -> pd.DataFrame:
     """Download (or load cached) adjusted close prices for the given tickers.
 
+    Prices come from the shared `market_data` layer: ranges already loaded in
+    this process are served from memory, and with a cache only the date ranges
+    not yet covered for each ticker are downloaded and merged into the store.
+    The current day's bar is never marked as covered, so each new run
+    refreshes the tail with a small incremental download and replaces a
+    stored intraday snapshot with the final close.
+
     Args:
         tickers: Iterable of ticker symbols.
         start: Start date (inclusive).
         end: End date (exclusive). Defaults to None (use latest available).
-        cache_path: Optional CSV path to cache the downloaded data.
+        cache_path: Optional directory of a `PriceStore` caching the data.
+        provider: Price provider (instance, name or config mapping); defaults to yfinance.
 
     Returns:
         DataFrame of adjusted close prices indexed by date.
     """
     tickers_list = sorted(set(_ensure_iterable(tickers)))
-    cache_file = Path(cache_path) if cache_path else None
-
-    if cache_file and cache_file.exists():
-        cached = pd.read_csv(cache_file, index_col=0, parse_dates=True)
-        cached = cached.sort_index()
-        # ensure coverage of requested tickers and start date
-        if set(tickers_list).issubset(cached.columns):
-            filtered = cached.loc[start:end] if end else cached.loc[start:]
-            if not filtered.empty:
-                return filtered[tickers_list]
-
-    data = yf.download(
-        tickers=tickers_list,
-        start=start,
-        end=end,
-        auto_adjust=False,
-        progress=False,
-        threads=True,
-    )
-
-    if data.empty:
-        raise ValueError(f"No data returned for tickers: {tickers_list}")
-
-    if isinstance(data.columns, pd.MultiIndex):
-        prices = data["Adj Close"]
-    else:
-        prices = data["Adj Close"].to_frame(name=tickers_list[0]) if "Adj Close" in data else data
-
-    prices = prices.sort_index().ffill()
-
-    if cache_file:
-        cache_file.parent.mkdir(parents=True, exist_ok=True)
-        prices.to_csv(cache_file)
-
-    return prices[tickers_list]
+    market = market_data.shared(cache_path=cache_path or None, provider=provider)
+    return market.prices(tickers_list, start=start, end=end)[tickers_list]
 
 
 def load_all(
@@ -89,6 +68,7 @@ def load_all(
     end: str | None = None,
     tickers: Iterable[str] | None = None,
     cache_dir: str | Path = "data",
+    provider: PriceProvider | str | dict | None = None,
 ) -> pd.DataFrame:
     """Load all required prices with caching.
 
@@ -96,7 +76,9 @@ def load_all(
         start: Start date.
         end: Optional end date.
         tickers: Optional explicit list of tickers.
-        cache_dir: Directory for cached CSV files.
+        cache_dir: Directory holding the `prices/` store. A legacy
+            `prices.csv` cache found there is imported into the store once.
+        provider: Price provider (instance, name or config mapping); defaults to yfinance.
 
     Returns:
         DataFrame of adjusted close prices.
@@ -104,6 +86,9 @@ def load_all(
     universe = sorted(set(_ensure_iterable(tickers) if tickers else SECTORS + BENCH))
     cache_dir_path = Path(cache_dir)
     cache_dir_path.mkdir(parents=True, exist_ok=True)
-    cache_file = cache_dir_path / "prices.csv"
-    prices = download_prices(universe, start=start, end=end, cache_path=cache_file)
+    store_path = cache_dir_path / "prices"
+    legacy_csv = cache_dir_path / "prices.csv"
+    if legacy_csv.exists() and not PriceStore(store_path).tickers():
+        PriceStore(store_path).write(pd.read_csv(legacy_csv, index_col=0, parse_dates=True))
+    prices = download_prices(universe, start=start, end=end, cache_path=store_path, provider=provider)
     return prices[universe]
@@ -0,0 +1,275 @@
+"""Rebalance engine for the sector-rotation strategy.
+
+`RotationEngine` turns a daily price panel and a risk-on flag into monthly
+portfolio weights and backtest returns without going through the CLI:
+
+* risk-on months (regime and absolute momentum both on) hold the top-k
+  sectors by momentum, inverse-volatility weighted;
+* risk-off months hold the defensive sleeve, HRP weighted;
+* targets are normalised and walked through the turnover cap.
+
+Weights are built for every rebalance date at once in preallocated arrays.
+Intermediates that depend only on the data (returns, rolling moments,
+momentum and HRP weights per lookback) are cached on the engine, so repeated
+runs with different parameters only recompute what changed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..shared_panel import SharedPanel
+from . import allocators, backtest, moments, signals
+
+
+@dataclass(frozen=True)
+class RotationParams:
+    """Strategy parameters for one backtest run."""
+
+    top_k: int = 4
+    momentum_months: int = 12
+    skip_last_months: int = 1
+    absolute_threshold: float = 0.0
+    inverse_vol_lookback: int = 60
+    hrp_lookback: int = 60
+    turnover_cap: float = 0.30
+    fee_bps: float = 10.0
+    target_annual_vol: float = 0.12
+    vol_target_lookback: int = 63
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> "RotationParams":
+        """Read parameters from a sector-rotation config mapping."""
+        signals_cfg = config.get("signals", {}) or {}
+        defaults = cls()
+        return cls(
+            top_k=signals_cfg.get("top_k", defaults.top_k),
+            momentum_months=signals_cfg.get("momentum_months", defaults.momentum_months),
+            skip_last_months=signals_cfg.get("skip_last_months", defaults.skip_last_months),
+            absolute_threshold=signals_cfg.get("absolute_threshold", defaults.absolute_threshold),
+            inverse_vol_lookback=signals_cfg.get("inverse_vol_lookback", defaults.inverse_vol_lookback),
+            hrp_lookback=signals_cfg.get("hrp_lookback", defaults.hrp_lookback),
+            turnover_cap=config.get("turnover_cap", defaults.turnover_cap),
+            fee_bps=config.get("fee_bps", defaults.fee_bps),
+            target_annual_vol=config.get("target_annual_vol", defaults.target_annual_vol),
+            vol_target_lookback=config.get("vol_target_lookback", defaults.vol_target_lookback),
+        )
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+@dataclass
+class RotationResult:
+    """Weights and returns of one sector-rotation backtest."""
+
+    params: RotationParams
+    weights: pd.DataFrame
+    portfolio_returns: pd.Series
+    returns: pd.Series
+    stats: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def equity(self) -> pd.Series:
+        """Cumulative growth of the vol-targeted returns."""
+        return (1 + self.returns).cumprod()
+
+
+def risk_off_universe(defensives: Iterable[str], bench: Iterable[str], columns: Iterable[str]) -> List[str]:
+    """Defensive tickers available in `columns`, plus IEF when it is listed."""
+    columns = list(columns)
+    defensives, bench = list(defensives), list(bench)
+    universe = [ticker for ticker in defensives if ticker in columns]
+    if "IEF" in columns and "IEF" not in universe and "IEF" in bench + defensives:
+        universe.append("IEF")
+    return universe
+
+
+class RotationEngine:
+    """Reusable sector-rotation backtester over a fixed price panel.
+
+    Args:
+        prices: Daily prices with a column per sector, defensive, benchmark
+            and the `momentum_ticker`.
+        risk_on: Daily (or sparser) 1/0 regime flag; forward-filled onto the
+            price dates, missing values count as risk-off.
+        sectors: Risk-on candidate tickers, in tie-breaking order.
+        defensives: Risk-off sleeve tickers.
+        bench: Benchmark tickers (also investable).
+        momentum_ticker: Asset whose trailing return gates risk-on exposure.
+        n_jobs: Worker processes for the HRP clustering step.
+    """
+
+    def __init__(
+        self,
+        prices: pd.DataFrame,
+        risk_on: pd.Series,
+        sectors: Iterable[str],
+        defensives: Iterable[str],
+        bench: Iterable[str] = (),
+        *,
+        momentum_ticker: str = "SPY",
+        n_jobs: int = 1,
+    ) -> None:
+        self.prices = prices.sort_index()
+        self.sectors = list(dict.fromkeys(sectors))
+        self.defensives = list(dict.fromkeys(defensives))
+        self.bench = list(dict.fromkeys(bench))
+        self.investable = sorted(set(self.sectors + self.defensives + self.bench))
+        self.momentum_ticker = momentum_ticker
+        self.n_jobs = n_jobs
+
+        self.risk_on = risk_on.reindex(self.prices.index).ffill().fillna(0.0)
+        self.risk_off_universe = risk_off_universe(self.defensives, self.bench, self.prices.columns)
+
+        self._positions = pd.Index(self.investable)
+        self._sector_cols = self._positions.get_indexer(self.sectors)
+        self._defensive_cols = self._positions.get_indexer(self.risk_off_universe)
+        # first priced date per investable asset (int64 ns, never-priced assets never qualify)
+        first_valid = self.prices[self.investable].apply(lambda column: column.first_valid_index())
+        self._first_valid = np.array(
+            [np.iinfo(np.int64).max if pd.isna(date) else pd.Timestamp(date).value for date in first_valid],
+            dtype=np.int64,
+        )
+
+        self.moments = moments.RollingMoments(self.prices[self.investable])
+        self._returns: pd.DataFrame | None = None
+        self._shared_returns: SharedPanel | None = None
+        self._momentum: Dict[Tuple[int, int], pd.DataFrame] = {}
+        self._gate: Dict[Tuple[int, int, float], np.ndarray] = {}
+        self._hrp: Dict[Tuple[int, int, int], np.ndarray] = {}
+
+    # ------------------------------------------------------------------ intermediates
+    @property
+    def returns(self) -> pd.DataFrame:
+        """Daily investable returns as used by `backtest.portfolio_returns`."""
+        if self._returns is None:
+            self._returns = self.prices[self.investable].pct_change().fillna(0.0)
+        return self._returns
+
+    def shared_returns(self) -> SharedPanel:
+        """`returns` published once for worker processes; freed with the engine."""
+        if self._shared_returns is None or self._shared_returns.closed:
+            self._shared_returns = SharedPanel.from_frame(self.returns)
+        return self._shared_returns
+
+    def momentum(self, months: int, skip_last: int) -> pd.DataFrame:
+        """Monthly trailing sector returns; its index defines the rebalance dates."""
+        key = (int(months), int(skip_last))
+        if key not in self._momentum:
+            self._momentum[key] = signals.trailing_return(self.prices[self.sectors], months=months, skip_last=skip_last)
+        return self._momentum[key]
+
+    def _risk_gate(self, params: RotationParams, dates: pd.DatetimeIndex) -> np.ndarray:
+        key = (int(params.momentum_months), int(params.skip_last_months), float(params.absolute_threshold))
+        if key not in self._gate:
+            abs_mom = signals.absolute_momentum(
+                self.prices[self.momentum_ticker],
+                months=params.momentum_months,
+                threshold=params.absolute_threshold,
+            )
+            regime = self.risk_on.reindex(dates, method="ffill").fillna(0.0).astype(int)
+            absolute = abs_mom.reindex(dates, method="ffill").fillna(0).astype(int)
+            self._gate[key] = (regime.to_numpy() != 0) & (absolute.to_numpy() != 0)
+        return self._gate[key]
+
+    def _hrp_weights(self, dates: pd.DatetimeIndex, lookback: int, momentum_key: Tuple[int, int]) -> np.ndarray:
+        key = momentum_key + (int(lookback),)
+        if key not in self._hrp:
+            cube = self.moments.cube(dates, lookback).select(self.risk_off_universe)
+            self._hrp[key] = allocators.hrp_weights_batch(cube.cov, cube.corr(), n_jobs=self.n_jobs)
+        return self._hrp[key]
+
+    def _has_history(self, dates: pd.DatetimeIndex, cols: np.ndarray) -> np.ndarray:
+        return self._first_valid[cols][None, :] <= dates.asi8[:, None]
+
+    # ------------------------------------------------------------------ weights
+    def target_weights(self, params: RotationParams, momentum: pd.DataFrame | None = None) -> pd.DataFrame:
+        """Normalised target weights per rebalance date, before the turnover cap.
+
+        Args:
+            params: Strategy parameters.
+            momentum: Precomputed `momentum()` scores for the params' lookbacks
+                (e.g. from a cached pipeline step); computed when omitted.
+        """
+        momentum_key = (int(params.momentum_months), int(params.skip_last_months))
+        if momentum is not None:
+            self._momentum[momentum_key] = momentum
+        scores = self.momentum(*momentum_key)
+        dates = pd.DatetimeIndex(scores.index)
+        targets = np.zeros((len(dates), len(self.investable)))
+        risk_on = self._risk_gate(params, dates)
+
+        selected = allocators.top_k_mask(scores.reindex(columns=self.sectors).to_numpy(dtype=float), params.top_k)
+        selected &= risk_on[:, None]
+        vol = self.moments.cube(dates, params.inverse_vol_lookback).select(self.sectors).vol()
+        sector_weights = allocators.inverse_vol_matrix(vol, selected)
+        tradable = (selected & self._has_history(dates, self._sector_cols)).any(axis=1)
+        targets[:, self._sector_cols] = np.where(tradable[:, None], sector_weights, 0.0)
+
+        if self.risk_off_universe:
+            hrp = np.nan_to_num(self._hrp_weights(dates, params.hrp_lookback, momentum_key), nan=0.0)
+            usable = hrp.sum(axis=1) > 0
+            hrp[~usable] = 1.0 / len(self.risk_off_universe)
+            defensive = ~risk_on & self._has_history(dates, self._defensive_cols).any(axis=1)
+            targets[np.ix_(defensive, self._defensive_cols)] = hrp[defensive]
+
+        totals = targets.sum(axis=1, keepdims=True)
+        targets = np.divide(targets, totals, out=targets, where=totals > 0)
+        return pd.DataFrame(targets, index=dates, columns=self.investable)
+
+    def weights(self, params: RotationParams, momentum: pd.DataFrame | None = None) -> pd.DataFrame:
+        """Rebalance weights after the turnover cap."""
+        targets = self.target_weights(params, momentum=momentum)
+        capped = backtest.cap_turnover_path(targets.to_numpy(), cap=params.turnover_cap, renormalize=True)
+        return pd.DataFrame(capped, index=targets.index, columns=targets.columns)
+
+    def run(self, params: RotationParams | None = None) -> RotationResult:
+        """Backtest one parameter set.
+
+        Args:
+            params: Strategy parameters; defaults to `RotationParams()`.
+
+        Returns:
+            RotationResult with weights, raw and vol-targeted daily returns, and stats.
+        """
+        params = params or RotationParams()
+        weights = self.weights(params)
+        portfolio_rets, turnover = backtest.portfolio_returns(
+            weights, self.prices[self.investable], fee_bps=params.fee_bps, return_turnover=True
+        )
+        targeted = backtest.vol_target(
+            portfolio_rets,
+            target_annual_vol=params.target_annual_vol,
+            lookback=params.vol_target_lookback,
+        )
+        return RotationResult(
+            params=params,
+            weights=weights,
+            portfolio_returns=portfolio_rets,
+            returns=targeted,
+            stats=backtest.perf_stats(targeted, turnover),
+        )
+
+
+def run_rotation(
+    prices: pd.DataFrame,
+    risk_on: pd.Series,
+    config: Mapping,
+    *,
+    n_jobs: int = 1,
+) -> RotationResult:
+    """Backtest the strategy described by a sector-rotation config mapping."""
+    engine = RotationEngine(
+        prices,
+        risk_on,
+        sectors=config.get("sectors", []),
+        defensives=config.get("defensives", []),
+        bench=config.get("bench", []),
+        n_jobs=n_jobs,
+    )
+    return engine.run(RotationParams.from_config(config))
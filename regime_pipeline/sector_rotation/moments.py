@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class MomentCube:
+    """Trailing-window covariance statistics for a sequence of rebalance dates.
+
+    Attributes:
+        dates: Rebalance dates (one slice per date).
+        assets: Asset labels along the last two axes.
+        lookback: Trailing window length in return observations.
+        counts: Pairwise-complete observation counts, shape (dates, assets, assets).
+        cov: Sample covariances (ddof=1), shape (dates, assets, assets); NaN where
+            fewer than two joint observations are available.
+    """
+
+    dates: pd.DatetimeIndex
+    assets: pd.Index
+    lookback: int
+    counts: np.ndarray
+    cov: np.ndarray
+
+    def vol(self) -> np.ndarray:
+        """Per-asset volatility (ddof=1) with shape (dates, assets)."""
+        return np.sqrt(np.diagonal(self.cov, axis1=1, axis2=2))
+
+    def corr(self) -> np.ndarray:
+        """Correlation matrices with shape (dates, assets, assets)."""
+        vol = self.vol()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.cov / (vol[:, :, None] * vol[:, None, :])
+
+    def select(self, assets: Iterable[str]) -> "MomentCube":
+        """Cube restricted to `assets`, in the given order."""
+        labels = list(assets)
+        idx = self.assets.get_indexer(labels)
+        if (idx < 0).any():
+            raise KeyError(f"Assets not in moment cube: {[a for a, i in zip(labels, idx) if i < 0]}")
+        grid = np.ix_(np.arange(len(self.dates)), idx, idx)
+        return MomentCube(
+            dates=self.dates,
+            assets=pd.Index(labels),
+            lookback=self.lookback,
+            counts=self.counts[grid],
+            cov=self.cov[grid],
+        )
+
+    def _locate(self, date, assets: Iterable[str]) -> Tuple[int, np.ndarray, List[str]]:
+        labels = list(assets)
+        pos = self.dates.get_loc(pd.Timestamp(date))
+        return pos, self.assets.get_indexer(labels), labels
+
+    def vol_at(self, date, assets: Iterable[str]) -> pd.Series:
+        """Volatility vector for a subset of assets on one rebalance date."""
+        pos, idx, labels = self._locate(date, assets)
+        return pd.Series(np.sqrt(self.cov[pos, idx, idx]), index=labels)
+
+    def cov_at(self, date, assets: Iterable[str]) -> pd.DataFrame:
+        """Covariance matrix for a subset of assets on one rebalance date."""
+        pos, idx, labels = self._locate(date, assets)
+        return pd.DataFrame(self.cov[pos][np.ix_(idx, idx)], index=labels, columns=labels)
+
+    def corr_at(self, date, assets: Iterable[str]) -> pd.DataFrame:
+        """Correlation matrix for a subset of assets on one rebalance date."""
+        cov = self.cov_at(date, assets)
+        vol = np.sqrt(np.diag(cov.to_numpy()))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return cov / np.outer(vol, vol)
+
+
+class RollingMoments:
+    """Rolling volatility/covariance engine over a fixed price panel.
+
+    Daily returns are computed once. For each requested lookback the engine
+    walks the rebalance dates in order and maintains the window's sufficient
+    statistics (sums of cross products, pairwise sums and counts) by adding
+    the rows entering the window and subtracting the rows leaving it, so each
+    date costs O(rows moved x assets^2) regardless of how long the history is.
+
+    Windows use the last `lookback` returns up to and including each date.
+    Missing returns (e.g. before an asset's inception) are excluded pairwise;
+    for fully observed windows the results equal
+    ``returns.tail(lookback).std() / .cov() / .corr()``.
+
+    Args:
+        prices: Daily prices indexed by date, one column per asset.
+    """
+
+    def __init__(self, prices: pd.DataFrame) -> None:
+        prices = prices.sort_index()
+        returns = prices.pct_change(fill_method=None)
+        self.index = pd.DatetimeIndex(returns.index)
+        self.assets = pd.Index(returns.columns)
+        values = returns.to_numpy(dtype=float)
+        self._mask = (~np.isnan(values)).astype(float)
+        self._values = np.where(self._mask > 0, values, 0.0)
+        self._cache: Dict[Tuple[int, Tuple[int, ...]], MomentCube] = {}
+
+    def _window_sums(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        x = self._values[start:end]
+        m = self._mask[start:end]
+        return x.T @ x, x.T @ m, m.T @ m
+
+    def cube(self, dates: Sequence, lookback: int) -> MomentCube:
+        """Moments for every date in `dates` over a trailing `lookback` window.
+
+        Args:
+            dates: Rebalance dates; each window covers returns dated on or before it.
+            lookback: Number of trailing return observations per window.
+
+        Returns:
+            MomentCube with counts and covariances for each date.
+        """
+        dates = pd.DatetimeIndex(dates)
+        key = (int(lookback), tuple(dates.asi8))
+        if key in self._cache:
+            return self._cache[key]
+
+        n_assets = len(self.assets)
+        ends = self.index.searchsorted(dates, side="right")
+        counts = np.empty((len(dates), n_assets, n_assets))
+        cov = np.empty((len(dates), n_assets, n_assets))
+
+        sxy = sx = n = None
+        prev_start = prev_end = 0
+        for pos, end in enumerate(ends):
+            start = max(0, end - lookback)
+            if sxy is None or start < prev_start or end < prev_end or start >= prev_end:
+                sxy, sx, n = self._window_sums(start, end)
+            else:
+                add = self._window_sums(prev_end, end)
+                drop = self._window_sums(prev_start, start)
+                sxy = sxy + add[0] - drop[0]
+                sx = sx + add[1] - drop[1]
+                n = n + add[2] - drop[2]
+            prev_start, prev_end = start, end
+
+            # sx[i, j] sums asset i over rows where j is observed too
+            with np.errstate(invalid="ignore", divide="ignore"):
+                centered = sxy - sx * sx.T / n
+                cov[pos] = np.where(n > 1, centered / (n - 1), np.nan)
+            np.fill_diagonal(cov[pos], np.maximum(np.diagonal(cov[pos]), 0.0))
+            counts[pos] = n
+
+        cube = MomentCube(dates=dates, assets=self.assets, lookback=int(lookback), counts=counts, cov=cov)
+        self._cache[key] = cube
+        return cube
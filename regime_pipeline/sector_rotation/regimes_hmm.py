@@ -1,7 +1,36 @@
 from __future__ import annotations
 
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
-from hmmlearn import hmm
+
+from .. import artifacts, gaussian_hmm
+from ..disk_cache import DEFAULT_MAX_BYTES, DiskCache
+from ..filtering import RegimeFilter
+from ..shared_panel import PanelHandle, SharedPanel
+
+_PARAM_NAMES = ("startprob", "transmat", "means", "covars")
+_MAX_BATCH = 256
+# bump when the fit kernel or WindowFit layout changes so old memo entries miss
+FIT_CACHE_VERSION = 2
+
+
+@dataclass
+class WindowFit:
+    """Outcome of a single rolling-window HMM fit."""
+
+    risk_flag: int
+    n_iter: int
+    converged: bool
+    seconds: float
+    params: Dict[str, np.ndarray]
 
 
 def make_features(prices: pd.DataFrame) -> pd.DataFrame:
@@ -23,22 +52,233 @@ def make_features(prices: pd.DataFrame) -> pd.DataFrame:
     return features.dropna()
 
 
+def _sorted_params(params: gaussian_hmm.Params, ret_idx: int) -> Dict[str, np.ndarray]:
+    """Fitted parameters with states ordered by ascending mean return.
+
+    A canonical ordering keeps state labels stable from one window to the next
+    when the parameters are used to seed the following fit.
+    """
+    startprob, transmat, means, covars = params
+    order = np.argsort(means[:, ret_idx])
+    return {
+        "startprob": startprob[order].copy(),
+        "transmat": transmat[np.ix_(order, order)].copy(),
+        "means": means[order].copy(),
+        "covars": covars[order].copy(),
+    }
+
+
+def _fit_windows(
+    windows: np.ndarray,
+    ret_idx: int,
+    n_states: int,
+    n_iter: int,
+    tol: float,
+    seeds: List[Optional[int]],
+    init: Optional[Dict[str, np.ndarray]] = None,
+) -> List[Optional[WindowFit]]:
+    """Fit Gaussian HMMs on a batch of equal-length windows and classify each last observation.
+
+    Args:
+        windows: Feature windows, shape (observations, windows, features).
+        ret_idx: Column index of the benchmark return feature.
+        n_states: Number of hidden states.
+        n_iter: Maximum number of EM iterations.
+        tol: Log-likelihood improvement below which EM stops.
+        seeds: Seed for the random initialisation of each window.
+        init: Optional parameters from a previous fit used as the EM starting
+            point of every window.
+
+    Returns:
+        One WindowFit per window with the risk flag, convergence diagnostics
+        and fitted parameters, or None where the fit failed.
+    """
+    started = time.perf_counter()
+    start = None
+    if init is not None:
+        n_batch = windows.shape[1]
+        start = tuple(np.repeat(init[name][None], n_batch, axis=0) for name in _PARAM_NAMES)
+    res = gaussian_hmm.em_fit(windows, n_states, n_iter=n_iter, tol=tol, start=start, seeds=seeds)
+    states = gaussian_hmm.decode(windows, res)
+    seconds = (time.perf_counter() - started) / windows.shape[1]
+
+    fits: List[Optional[WindowFit]] = []
+    for b in range(windows.shape[1]):
+        if res.failed[b]:
+            fits.append(None)
+            continue
+        path, returns = states[:, b], windows[:, b, ret_idx]
+        spy_means = {
+            state: returns[path == state].mean() if np.any(path == state) else np.nan for state in range(n_states)
+        }
+        risk_on_state = max(spy_means, key=lambda s: -np.inf if np.isnan(spy_means[s]) else spy_means[s])
+        fits.append(
+            WindowFit(
+                risk_flag=int(path[-1] == risk_on_state),
+                n_iter=int(res.n_iter[b]),
+                converged=bool(res.converged[b]),
+                seconds=seconds,
+                params=_sorted_params(res.params(b), ret_idx),
+            )
+        )
+    return fits
+
+
+def _fit_window(
+    values: np.ndarray,
+    ret_idx: int,
+    n_states: int,
+    n_iter: int,
+    tol: float,
+    random_state: Optional[int],
+    init: Optional[Dict[str, np.ndarray]] = None,
+) -> WindowFit:
+    """Fit a Gaussian HMM on one window (observations x features); see `_fit_windows`."""
+    fit = _fit_windows(values[:, None, :], ret_idx, n_states, n_iter, tol, [random_state], init)[0]
+    if fit is None:
+        raise ValueError("HMM fit failed: the likelihood became non-finite")
+    return fit
+
+
+def _date_seed(random_state: Optional[int], date: pd.Timestamp) -> Optional[int]:
+    """Derive a deterministic per-date seed from the base seed."""
+    if random_state is None:
+        return None
+    seq = np.random.SeedSequence([int(random_state), date.toordinal()])
+    return int(seq.generate_state(1)[0])
+
+
+_WORKER_STATE: Dict[str, object] = {}
+
+
+def _init_worker(handle: PanelHandle, ret_idx: int, lookback: int, n_states: int, n_iter: int, tol: float) -> None:
+    """Attach to the shared feature matrix once per worker process."""
+    _WORKER_STATE.update(
+        values=handle.array(),
+        ret_idx=ret_idx,
+        lookback=lookback,
+        n_states=n_states,
+        n_iter=n_iter,
+        tol=tol,
+    )
+
+
+def _fit_batch(
+    values: np.ndarray,
+    ends: List[int],
+    seeds: List[Optional[int]],
+    ret_idx: int,
+    lookback: int,
+    n_states: int,
+    n_iter: int,
+    tol: float,
+) -> List[Optional[WindowFit]]:
+    """Fit the equal-length windows ending at `ends` in one batched EM run.
+
+    If the batch raises (e.g. k-means cannot initialise a degenerate window),
+    the windows are refitted one at a time so only the offending ones are lost.
+    """
+    length = min(ends[0], lookback)
+    try:
+        windows = gaussian_hmm.strided_windows(values, ends, length)
+        return _fit_windows(windows, ret_idx, n_states, n_iter, tol, seeds)
+    except Exception:
+        if len(ends) == 1:
+            return [None]
+        return [
+            fit
+            for end, seed in zip(ends, seeds)
+            for fit in _fit_batch(values, [end], [seed], ret_idx, lookback, n_states, n_iter, tol)
+        ]
+
+
+def _batches(tasks: List[Tuple[int, Optional[int]]], lookback: int, size: int) -> List[Tuple[List[int], List[Optional[int]]]]:
+    """Split (end, seed) tasks into runs of equal window length of at most `size` windows."""
+    batches: List[Tuple[List[int], List[Optional[int]]]] = []
+    length = None
+    for end, seed in tasks:
+        if min(end, lookback) != length or len(batches[-1][0]) >= size:
+            batches.append(([], []))
+            length = min(end, lookback)
+        batches[-1][0].append(end)
+        batches[-1][1].append(seed)
+    return batches
+
+
+def _fit_task(task: Tuple[List[int], List[Optional[int]]]) -> List[Optional[WindowFit]]:
+    """Fit a batch of windows ending at the given row positions using the worker's feature matrix."""
+    ends, seeds = task
+    state = _WORKER_STATE
+    return _fit_batch(
+        state["values"], ends, seeds, state["ret_idx"], state["lookback"], state["n_states"], state["n_iter"], state["tol"]
+    )
+
+
+def _window_key(
+    window: np.ndarray,
+    n_states: int,
+    seed: Optional[int],
+    n_iter: int,
+    tol: float,
+    init: Optional[Dict[str, np.ndarray]] = None,
+) -> str:
+    """Memo key of one window fit: its data, model settings, seed and warm start."""
+    start = artifacts.value_fingerprint(init) if init is not None else "cold"
+    data = artifacts.value_fingerprint(np.ascontiguousarray(window))
+    return artifacts.cache_key(FIT_CACHE_VERSION, data, n_states, "full", seed, n_iter, repr(tol), start)
+
+
 def fit_predict_hmm(
     features: pd.DataFrame,
     lookback: int = 750,
     n_states: int = 2,
     rebal: str = "M",
-) -> pd.DataFrame:
+    *,
+    warm_start: bool = False,
+    n_iter: int = 200,
+    tol: float = 1e-2,
+    random_state: Optional[int] = 0,
+    n_jobs: int = 1,
+    chunksize: Optional[int] = None,
+    cache_dir: str | Path | None = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    return_diagnostics: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
     """Fit a rolling Gaussian HMM and infer risk regimes.
 
+    With `cache_dir`, every window fit is memoized on disk under a hash of the
+    window's feature values, the number of states, covariance type, EM
+    settings, seed and (for warm starts) starting parameters. Reruns over
+    unchanged data, such as backtests that only vary the allocation
+    parameters, load the fits instead of repeating them. Unseeded fits
+    (`random_state=None`) are never memoized.
+
     Args:
         features: DataFrame of features with daily frequency.
         lookback: Number of observations for each rolling fit.
         n_states: Number of hidden states.
         rebal: Rebalance frequency (pandas offset alias).
+        warm_start: Seed each fit with the previous date's parameters instead of
+            a random initialisation.
+        n_iter: Maximum number of EM iterations per fit.
+        tol: Convergence threshold on the log-likelihood gain for early stopping.
+        random_state: Base seed; each evaluation date gets a deterministic seed
+            derived from it and the date. None restores unseeded fits.
+        n_jobs: Worker processes for the walk-forward (-1 for all cores). Only
+            available without warm starts, which are inherently sequential.
+        chunksize: Evaluation dates fitted together in one batched EM run
+            (and dispatched as one worker task). Defaults to spreading the
+            dates over roughly four batches per worker, at most 256 each.
+        cache_dir: Directory of the window-fit memo; None disables it.
+        cache_max_bytes: Size of the memo beyond which the least recently
+            used fits are evicted.
+        return_diagnostics: Also return per-date iteration counts and wall times.
 
     Returns:
-        DataFrame with a `risk_on` column (1 for risk-on, 0 otherwise).
+        DataFrame with a `risk_on` column (1 for risk-on, 0 otherwise). When
+        `return_diagnostics` is set, a tuple of that frame and a per-date
+        diagnostics frame (`n_iter`, `converged`, `seconds`, `warm_start`,
+        `cached`).
     """
     if "ret_spy" not in features.columns:
         raise KeyError("Feature matrix must include 'ret_spy'.")
@@ -47,33 +287,141 @@ def fit_predict_hmm(
     if feature_matrix.empty:
         raise ValueError("No data available to fit the HMM.")
 
+    n_workers = (os.cpu_count() or 1) if n_jobs == -1 else max(int(n_jobs), 1)
+    if warm_start and n_workers > 1:
+        raise ValueError("warm_start fits are sequential and cannot run with n_jobs > 1.")
+
+    values = np.ascontiguousarray(feature_matrix.to_numpy(dtype=float))
+    ret_idx = feature_matrix.columns.get_loc("ret_spy")
     evaluation_dates = feature_matrix.resample(rebal).last().index
-    risk_series = pd.Series(index=feature_matrix.index, dtype=float)
+    ends = feature_matrix.index.searchsorted(evaluation_dates, side="right")
+    min_obs = max(n_states * 10, lookback // 2)
 
-    for current_date in evaluation_dates:
-        window = feature_matrix.loc[:current_date].tail(lookback)
-        if len(window) < max(n_states * 10, lookback // 2):
+    dates: List[pd.Timestamp] = []
+    tasks: List[Tuple[int, Optional[int]]] = []
+    for current_date, end in zip(evaluation_dates, ends):
+        if min(end, lookback) < min_obs:
             continue
+        dates.append(current_date)
+        tasks.append((int(end), _date_seed(random_state, current_date)))
 
-        model = hmm.GaussianHMM(
-            n_components=n_states,
-            covariance_type="full",
-            n_iter=200,
-            random_state=None,
-        )
+    cache = DiskCache(cache_dir, cache_max_bytes) if cache_dir is not None and random_state is not None else None
+    fits: List[Optional[WindowFit]] = [None] * len(tasks)
+    cached = [False] * len(tasks)
+    warm_flags = [False] * len(tasks)
+    if not warm_start:
+        keys: List[str] = []
+        if cache is not None:
+            keys = [_window_key(values[max(0, end - lookback) : end], n_states, seed, n_iter, tol) for end, seed in tasks]
+        for i, key in enumerate(keys):
+            fits[i] = cache.get(key)
+            cached[i] = fits[i] is not None
+        pending = [i for i in range(len(tasks)) if not cached[i]]
+        todo = [tasks[i] for i in pending]
+        results: List[Optional[WindowFit]] = []
+        if n_workers > 1 and todo:
+            size = chunksize or min(_MAX_BATCH, max(1, math.ceil(len(todo) / (4 * n_workers))))
+            with SharedPanel(values) as panel:
+                init_args = (panel.handle, ret_idx, lookback, n_states, n_iter, tol)
+                with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=init_args) as pool:
+                    results = [fit for batch in pool.map(_fit_task, _batches(todo, lookback, size)) for fit in batch]
+        else:
+            for ends_batch, seeds in _batches(todo, lookback, chunksize or _MAX_BATCH):
+                results.extend(_fit_batch(values, ends_batch, seeds, ret_idx, lookback, n_states, n_iter, tol))
+        for i, fit in zip(pending, results):
+            fits[i] = fit
+            if cache is not None and fit is not None:
+                cache.put(keys[i], fit)
+    else:
+        previous: Optional[Dict[str, np.ndarray]] = None
+        for i, (end, seed) in enumerate(tasks):
+            window = values[max(0, end - lookback) : end]
+            key = _window_key(window, n_states, seed, n_iter, tol, previous) if cache is not None else None
+            fit = cache.get(key) if key is not None else None
+            cached[i] = fit is not None
+            if fit is None:
+                try:
+                    fit = _fit_window(window, ret_idx, n_states, n_iter, tol, seed, init=previous)
+                except Exception:
+                    fit = None
+                if key is not None and fit is not None:
+                    cache.put(key, fit)
+            fits[i] = fit
+            warm_flags[i] = previous is not None
+            previous = fit.params if fit is not None else None
 
-        try:
-            model.fit(window.values)
-            states = model.predict(window.values)
-        except Exception:
+    flags: Dict[pd.Timestamp, int] = {}
+    records: List[dict] = []
+    for current_date, fit, warm, hit in zip(dates, fits, warm_flags, cached):
+        if fit is None:
             continue
+        flags[current_date] = fit.risk_flag
+        records.append(
+            {
+                "date": current_date,
+                "n_iter": fit.n_iter,
+                "converged": fit.converged,
+                "seconds": fit.seconds,
+                "warm_start": warm,
+                "cached": hit,
+            }
+        )
 
-        spy_means = {
-            state: window.iloc[states == state]["ret_spy"].mean() for state in range(n_states)
-        }
-        risk_on_state = max(spy_means, key=spy_means.get)
-        risk_flag = int(states[-1] == risk_on_state)
-        risk_series.loc[current_date] = risk_flag
-
+    risk_series = pd.Series(flags, dtype=float)
     risk_series = risk_series.reindex(feature_matrix.index).ffill().fillna(0.0).astype(int)
-    return pd.DataFrame({"risk_on": risk_series})
+    risk_frame = pd.DataFrame({"risk_on": risk_series})
+    if not return_diagnostics:
+        return risk_frame
+
+    diagnostics = pd.DataFrame(records, columns=["date", "n_iter", "converged", "seconds", "warm_start", "cached"])
+    return risk_frame, diagnostics.set_index("date")
+
+
+def hmm_filter_state(
+    features: pd.DataFrame,
+    lookback: int = 750,
+    n_states: int = 2,
+    *,
+    n_iter: int = 200,
+    tol: float = 1e-2,
+    random_state: Optional[int] = 0,
+    refit_every: Optional[int] = None,
+) -> RegimeFilter:
+    """Fit the HMM on the latest window and return an online filter positioned at its end.
+
+    Subsequent feature rows can be absorbed with `RegimeFilter.update` instead of
+    refitting; states are ordered by mean return, so the last state is risk-on.
+
+    Args:
+        features: DataFrame of features with daily frequency.
+        lookback: Number of trailing observations used for the fit.
+        n_states: Number of hidden states.
+        n_iter: Maximum number of EM iterations.
+        tol: Convergence threshold on the log-likelihood gain.
+        random_state: Seed for the initialisation.
+        refit_every: Number of updates after which the filter reports a refit is due.
+
+    Returns:
+        RegimeFilter with filtered probabilities as of the last feature row.
+    """
+    if "ret_spy" not in features.columns:
+        raise KeyError("Feature matrix must include 'ret_spy'.")
+
+    window = features.dropna().tail(lookback)
+    if window.empty:
+        raise ValueError("No data available to fit the HMM.")
+
+    ret_idx = window.columns.get_loc("ret_spy")
+    fit = _fit_window(window.to_numpy(dtype=float), ret_idx, n_states, n_iter, tol, random_state)
+    state = RegimeFilter(
+        transmat=fit.params["transmat"],
+        means=fit.params["means"],
+        covariances=fit.params["covars"],
+        initial=fit.params["startprob"],
+        state_names=[f"state_{i}" for i in range(n_states)],
+        bull_state=n_states - 1,
+        refit_every=refit_every,
+    )
+    state.update(window)
+    state.steps_since_fit = 0
+    return state
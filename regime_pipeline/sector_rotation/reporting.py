@@ -1,25 +1,83 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Dict, Sequence
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
+from .. import report
+from .engine import RotationEngine, RotationParams
+
+CHARTS = ("equity", "drawdown", "weights", "turnover")
+
 
 def save_equity_plot(returns: pd.Series, path: str | Path = "data/equity.png") -> None:
     """Save an equity curve plot to disk."""
-    output_path = Path(path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
     equity = (1 + returns).cumprod()
+    fig = report.equity_figure(equity, title="Regime-Switching Sector Rotation")
+    report.save_figure(fig, path, dpi=150)
+
+
+def render_report(
+    returns: pd.Series,
+    weights: pd.DataFrame,
+    out_dir: str | Path,
+    *,
+    prefix: str | None = None,
+    title: str = "Regime-Switching Sector Rotation",
+    dpi: int = report.DEFAULT_DPI,
+    max_points: int = report.DEFAULT_MAX_POINTS,
+) -> Dict[str, str]:
+    """Write the equity, drawdown, weights and turnover charts for one run.
+
+    Rendering is headless (Agg), so this is safe on servers and in worker
+    processes.
+
+    Args:
+        returns: Daily portfolio returns.
+        weights: Rebalance-date weights (dates x assets).
+        out_dir: Directory for the PNG files.
+        prefix: Optional file-name prefix, e.g. a run id.
+        title: Title of the equity chart.
+        dpi: Output resolution.
+        max_points: Daily series longer than this are downsampled.
+
+    Returns:
+        Mapping of chart name to written path.
+    """
+    paths = report.output_paths(out_dir, CHARTS, prefix)
+    equity = (1 + returns.fillna(0.0)).cumprod()
+    figures = {
+        "equity": report.equity_figure(equity, title=title, max_points=max_points),
+        "drawdown": report.drawdown_figure(report.drawdown_of(equity), max_points=max_points),
+        "weights": report.weights_figure(weights),
+        "turnover": report.turnover_figure(weights),
+    }
+    return {name: report.save_figure(fig, paths[name], dpi=dpi) for name, fig in figures.items()}
+
+
+def render_run_reports(
+    engine: RotationEngine,
+    runs: Sequence[RotationParams],
+    out_dir: str | Path,
+    *,
+    n_jobs: int = 1,
+    **options,
+) -> Dict[str, Dict[str, str]]:
+    """Backtest each parameter set and render its report under ``out_dir/run_<i>``.
+
+    Backtests run in this process (they share the engine's cached
+    intermediates); chart rendering, the slow part, is spread over `n_jobs`
+    worker processes.
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(equity.index, equity.values, label="Equity Curve")
-    plt.title("Regime-Switching Sector Rotation")
-    plt.xlabel("Date")
-    plt.ylabel("Equity")
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150)
-    plt.close()
+    Returns:
+        Mapping of run directory name to that run's chart paths.
+    """
+    jobs = []
+    names = []
+    for pos, params in enumerate(runs):
+        result = engine.run(params)
+        names.append(f"run_{pos:03d}")
+        kwargs = dict(options, returns=result.returns, weights=result.weights, out_dir=Path(out_dir) / names[-1])
+        jobs.append((render_report, kwargs))
+    return dict(zip(names, report.render_many(jobs, n_jobs=n_jobs)))
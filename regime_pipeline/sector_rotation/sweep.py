@@ -0,0 +1,146 @@
+"""Parameter sweeps over `RotationParams` on a single loaded price panel.
+
+Combinations that share the selection parameters (top-k, momentum lookbacks,
+volatility lookbacks) share one set of target weights. Within such a group,
+the turnover cap is applied to all caps at once, daily gross returns and
+turnover are computed once per cap, and fees, volatility targeting and
+performance statistics are evaluated as column-wise array math over every
+combination. Groups are spread over a process pool when `n_jobs > 1`; the
+workers attach to the engine's shared daily-returns panel instead of
+receiving a pickled copy.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+from pathlib import Path
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..shared_panel import PanelHandle
+from . import backtest
+from .engine import RotationEngine, RotationParams
+
+# parameters that change the target weights; everything else is applied on top
+SELECTION_FIELDS = (
+    "top_k",
+    "momentum_months",
+    "skip_last_months",
+    "absolute_threshold",
+    "inverse_vol_lookback",
+    "hrp_lookback",
+)
+
+_WORKER_STATE: Dict[str, pd.DataFrame] = {}
+
+
+def expand_grid(grid: Mapping[str, Sequence], base: RotationParams | None = None) -> List[RotationParams]:
+    """Cartesian product of parameter values on top of `base`.
+
+    Args:
+        grid: Mapping of `RotationParams` field names to candidate values.
+        base: Parameters used for fields not in the grid.
+
+    Returns:
+        One `RotationParams` per combination, in grid order.
+    """
+    base = base or RotationParams()
+    known = {f.name for f in fields(RotationParams)}
+    unknown = sorted(set(grid) - known)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {unknown}")
+    names = list(grid)
+    return [replace(base, **dict(zip(names, values))) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def _init_worker(handle: PanelHandle) -> None:
+    _WORKER_STATE["returns"] = handle.frame()
+
+
+def _evaluate_group(
+    targets: np.ndarray,
+    dates: pd.DatetimeIndex,
+    params: Sequence[RotationParams],
+    returns: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """Net and vol-targeted performance for combinations sharing `targets`."""
+    returns = _WORKER_STATE["returns"] if returns is None else returns
+    caps = sorted({p.turnover_cap for p in params})
+    weights = backtest.cap_turnover_path(targets[None], cap=np.array(caps), renormalize=True)
+    gross, turnover = backtest.rebalance_returns(weights, dates, returns)
+
+    cap_row = np.array([caps.index(p.turnover_cap) for p in params])
+    fees = np.array([p.fee_bps for p in params], dtype=float)
+    net = pd.DataFrame((gross[cap_row] - turnover[cap_row] * (fees[:, None] / 10_000)).T, index=returns.index)
+
+    targeted = pd.DataFrame(index=returns.index, columns=net.columns, dtype=float)
+    lookbacks = np.array([p.vol_target_lookback for p in params])
+    vols = np.array([p.target_annual_vol for p in params], dtype=float)
+    for lookback in np.unique(lookbacks):
+        cols = np.flatnonzero(lookbacks == lookback)
+        targeted.iloc[:, cols] = backtest.vol_target(
+            net.iloc[:, cols], target_annual_vol=vols[cols], lookback=int(lookback)
+        ).to_numpy()
+    return backtest.perf_stats_frame(targeted, turnover[cap_row].T)
+
+
+def run_sweep(
+    engine: RotationEngine,
+    grid: Mapping[str, Sequence] | Sequence[RotationParams],
+    *,
+    base: RotationParams | None = None,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """Backtest every parameter combination on the engine's price panel.
+
+    Args:
+        engine: Engine holding the prices, regime flag and universe.
+        grid: Mapping of parameter names to candidate values, or an explicit
+            list of `RotationParams`.
+        base: Parameters used for fields not in the grid.
+        n_jobs: Worker processes across selection groups (-1 for all cores).
+
+    Returns:
+        DataFrame with one row per combination: the parameters followed by
+        the `perf_stats` columns.
+    """
+    combos = list(grid) if not isinstance(grid, Mapping) else expand_grid(grid, base)
+    groups: Dict[Tuple, List[int]] = {}
+    for pos, params in enumerate(combos):
+        groups.setdefault(tuple(getattr(params, name) for name in SELECTION_FIELDS), []).append(pos)
+
+    returns = engine.returns
+    tasks = []
+    for members in groups.values():
+        targets = engine.target_weights(combos[members[0]])
+        tasks.append((targets.to_numpy(), targets.index, [combos[pos] for pos in members]))
+
+    n_workers = (os.cpu_count() or 1) if n_jobs == -1 else max(int(n_jobs), 1)
+    if n_workers == 1 or len(tasks) == 1:
+        results = [_evaluate_group(*task, returns=returns) for task in tasks]
+    else:
+        handle = engine.shared_returns().handle
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(handle,)) as pool:
+            results = list(pool.map(_evaluate_group, *zip(*tasks)))
+
+    stats = pd.concat(
+        [frame.set_axis(members) for frame, members in zip(results, groups.values())]
+    ).sort_index()
+    table = pd.DataFrame([params.to_dict() for params in combos])
+    return pd.concat([table, stats], axis=1)
+
+
+def save_results(results: pd.DataFrame, path: str | Path) -> Path:
+    """Write a sweep table as CSV or Parquet, chosen by the file suffix."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".parquet":
+        results.to_parquet(path, index=False)
+    else:
+        results.to_csv(path, index=False)
+    return path
@@ -0,0 +1,141 @@
+"""Zero-copy panels shared with worker processes.
+
+A `SharedPanel` publishes a 2-D float array (prices, returns, features) once
+into a memory-mapped ``.npy`` file, on the RAM-backed ``/dev/shm`` when the
+platform has it. Workers receive only a small picklable `PanelHandle` (file
+path plus the date/ticker labels) and map the same physical pages read-only,
+so per-worker memory stays flat however large the panel is.
+
+Typical use with a process pool::
+
+    with SharedPanel.from_frame(prices) as panel:
+        with ProcessPoolExecutor(initializer=_init, initargs=(panel.handle,)) as pool:
+            ...
+
+    def _init(handle):
+        _STATE["prices"] = handle.frame()
+
+The owner deletes the backing file on `close()` (or when leaving the
+``with`` block); mappings that workers already hold stay valid until they
+exit.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import uuid
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+_SHM_DIR = Path("/dev/shm")
+_ATTACHED: Dict[str, np.ndarray] = {}
+
+
+def _default_directory() -> Path:
+    if _SHM_DIR.is_dir() and os.access(_SHM_DIR, os.W_OK):
+        return _SHM_DIR
+    return Path(tempfile.gettempdir())
+
+
+@dataclass(frozen=True)
+class PanelHandle:
+    """Picklable reference to a published panel.
+
+    Attributes:
+        path: Backing ``.npy`` file.
+        index: Row labels (e.g. dates).
+        columns: Column labels (e.g. tickers).
+    """
+
+    path: str
+    index: pd.Index
+    columns: pd.Index
+
+    def array(self) -> np.ndarray:
+        """Read-only view of the panel values, mapped once per process."""
+        values = _ATTACHED.get(self.path)
+        if values is None:
+            values = np.load(self.path, mmap_mode="r")
+            _ATTACHED[self.path] = values
+        return values
+
+    def frame(self) -> pd.DataFrame:
+        """DataFrame over the mapped values without copying them."""
+        return pd.DataFrame(self.array(), index=self.index, columns=self.columns, copy=False)
+
+
+def _remove(path: str) -> None:
+    _ATTACHED.pop(path, None)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SharedPanel:
+    """Owner of a published panel; closes (deletes) the backing file when done.
+
+    Args:
+        values: 2-D array to publish.
+        index: Row labels; defaults to a RangeIndex.
+        columns: Column labels; defaults to a RangeIndex.
+        directory: Where to place the backing file; defaults to ``/dev/shm``
+            when available, otherwise the system temp directory.
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        index: Optional[Sequence] = None,
+        columns: Optional[Sequence] = None,
+        directory: str | Path | None = None,
+    ) -> None:
+        values = np.asarray(values)
+        if values.ndim != 2:
+            raise ValueError("SharedPanel expects a 2-D array.")
+        directory = Path(directory) if directory else _default_directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = str(directory / f"regime_pipeline-{os.getpid()}-{uuid.uuid4().hex}.npy")
+
+        mapped = np.lib.format.open_memmap(path, mode="w+", dtype=values.dtype, shape=values.shape)
+        mapped[...] = values
+        mapped.flush()
+        del mapped
+
+        self.handle = PanelHandle(
+            path=path,
+            index=pd.Index(index) if index is not None else pd.RangeIndex(values.shape[0]),
+            columns=pd.Index(columns) if columns is not None else pd.RangeIndex(values.shape[1]),
+        )
+        self._finalizer = weakref.finalize(self, _remove, path)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, dtype=float, directory: str | Path | None = None) -> "SharedPanel":
+        """Publish a DataFrame's values together with its index and columns."""
+        return cls(frame.to_numpy(dtype=dtype), index=frame.index, columns=frame.columns, directory=directory)
+
+    def array(self) -> np.ndarray:
+        return self.handle.array()
+
+    def frame(self) -> pd.DataFrame:
+        return self.handle.frame()
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self) -> None:
+        """Delete the backing file."""
+        self._finalizer()
+
+    def __enter__(self) -> "SharedPanel":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,286 @@
+"""Columnar on-disk price store.
+
+Each ticker lives in its own append-only binary file of ``(date, value)``
+records, with dates stored as int64 nanoseconds. Reads memory-map only the
+requested tickers and binary-search the date slice, so loading a handful of
+series from a large universe touches only those bytes. New bars are appended
+in place; history is rewritten only for a ticker whose incoming data
+changes or precedes what is already stored.
+
+Adjusted prices are restated whenever a split or dividend occurs, so bars
+downloaded later can be on a different basis than the stored history.
+Writers pass a few already-stored bars along with new ones; when those
+overlapping bars all differ from the stored values by one common factor,
+the stored history is rescaled onto the incoming basis.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+RECORD_DTYPE = np.dtype([("date", "<i8"), ("value", "<f8")])
+MANIFEST_NAME = "manifest.json"
+# relative difference below which a refetched bar counts as unchanged
+REBASE_RTOL = 1e-6
+
+Interval = Tuple[pd.Timestamp, pd.Timestamp]
+
+
+def _to_ns(value) -> Optional[int]:
+    if value is None:
+        return None
+    return int(pd.Timestamp(value).value)
+
+
+def add_interval(intervals: List[Interval], start: pd.Timestamp, end: pd.Timestamp) -> List[Interval]:
+    """Insert ``[start, end)`` into sorted disjoint intervals.
+
+    Intervals that overlap or touch the new one are merged with it; the
+    others are kept as they are, so disjoint ranges never claim the dates
+    between them.
+    """
+    if start >= end:
+        return list(intervals)
+    merged: List[Interval] = []
+    for lo, hi in sorted([*intervals, (start, end)]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def missing_intervals(intervals: List[Interval], start: pd.Timestamp, end: pd.Timestamp) -> List[Interval]:
+    """Parts of ``[start, end)`` not covered by sorted disjoint intervals."""
+    missing: List[Interval] = []
+    cursor = start
+    for lo, hi in intervals:
+        if lo >= end:
+            break
+        if hi <= cursor:
+            continue
+        if lo > cursor:
+            missing.append((cursor, lo))
+        cursor = hi
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def rebase_factor(existing: np.ndarray, incoming: np.ndarray, rtol: float = REBASE_RTOL) -> float:
+    """Factor moving stored bars onto the adjustment basis of incoming ones.
+
+    The ratio of incoming to stored values is compared on their common dates,
+    leaving out the last stored bar, which may have been an intraday snapshot.
+    Only a ratio that is shared by all those dates and differs from one is
+    treated as a restatement; anything else counts as individual corrections.
+
+    Args:
+        existing: Stored records, sorted by date.
+        incoming: New records, sorted by date.
+        rtol: Relative tolerance for comparing ratios.
+
+    Returns:
+        Multiplier for the stored values (1.0 when no rebase is needed).
+    """
+    _, at_existing, at_incoming = np.intersect1d(
+        existing["date"], incoming["date"], assume_unique=True, return_indices=True
+    )
+    if len(at_existing) > 1 and at_existing[-1] == len(existing) - 1:
+        at_existing, at_incoming = at_existing[:-1], at_incoming[:-1]
+    if not len(at_existing):
+        return 1.0
+    ratios = incoming["value"][at_incoming] / existing["value"][at_existing]
+    factor = float(ratios[0])
+    if np.isclose(factor, 1.0, rtol=rtol, atol=0.0) or not np.allclose(ratios, factor, rtol=rtol, atol=0.0):
+        return 1.0
+    return factor
+
+
+class PriceStore:
+    """Directory of per-ticker memory-mapped price series.
+
+    Args:
+        root: Directory holding the ticker files and the manifest.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self._manifest: Optional[Dict[str, dict]] = None
+
+    # ------------------------------------------------------------------ manifest
+    @property
+    def manifest(self) -> Dict[str, dict]:
+        if self._manifest is None:
+            path = self.root / MANIFEST_NAME
+            self._manifest = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        return self._manifest
+
+    def _save_manifest(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"{MANIFEST_NAME}.tmp"
+        tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.root / MANIFEST_NAME)
+
+    def _file(self, ticker: str) -> Path:
+        return self.root / f"{quote(ticker, safe='')}.bin"
+
+    def tickers(self) -> List[str]:
+        """Tickers with stored bars."""
+        return sorted(ticker for ticker, entry in self.manifest.items() if entry.get("rows"))
+
+    def __contains__(self, ticker: str) -> bool:
+        return bool(self.manifest.get(ticker, {}).get("rows"))
+
+    # ------------------------------------------------------------------ reads
+    def records(self, ticker: str) -> np.ndarray:
+        """Memory-mapped record array for a ticker (empty if absent)."""
+        path = self._file(ticker)
+        if ticker not in self.manifest or not path.exists() or path.stat().st_size == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r")
+
+    def read_series(self, ticker: str, start=None, end=None) -> pd.Series:
+        """Load one ticker between `start` and `end` (both inclusive)."""
+        recs = self.records(ticker)
+        dates = recs["date"]
+        lo = 0 if start is None else int(np.searchsorted(dates, _to_ns(start), side="left"))
+        hi = len(recs) if end is None else int(np.searchsorted(dates, _to_ns(end), side="right"))
+        chunk = np.array(recs[lo:hi])
+        index = pd.DatetimeIndex(chunk["date"].astype("datetime64[ns]"))
+        return pd.Series(chunk["value"], index=index, name=ticker)
+
+    def read(self, tickers: Iterable[str], start=None, end=None) -> pd.DataFrame:
+        """Load the requested tickers as a wide frame on the union of their dates.
+
+        Args:
+            tickers: Tickers to load; missing tickers raise KeyError.
+            start: Optional first date (inclusive).
+            end: Optional last date (inclusive).
+
+        Returns:
+            DataFrame indexed by date with one column per requested ticker.
+        """
+        tickers = list(tickers)
+        missing = [ticker for ticker in tickers if ticker not in self.manifest]
+        if missing:
+            raise KeyError(f"Tickers not in price store: {missing}")
+        # tickers with coverage but no bars in range come back as all-NaN columns
+        series = [self.read_series(ticker, start, end) for ticker in tickers]
+        if not series:
+            return pd.DataFrame()
+        frame = pd.concat(series, axis=1, sort=True)
+        frame.index.name = None
+        return frame.reindex(columns=tickers)
+
+    def coverage(self, ticker: str) -> List[Interval]:
+        """Sorted disjoint ``[start, end)`` ranges already fetched for a ticker.
+
+        Coverage records what was requested from the data source, which can be
+        wider than the stored bars (e.g. before a ticker's inception). Tickers
+        written without coverage metadata fall back to their stored bar range,
+        excluding a bar from the current day, which may still change.
+        """
+        entry = self.manifest.get(ticker)
+        if not entry:
+            return []
+        if "covered" in entry:
+            return [(pd.Timestamp(lo), pd.Timestamp(hi)) for lo, hi in entry["covered"]]
+        if "covered_start" in entry:  # single-range manifests written by earlier versions
+            return [(pd.Timestamp(entry["covered_start"]), pd.Timestamp(entry["covered_end"]))]
+        if not entry.get("rows"):
+            return []
+        last = pd.Timestamp(entry["last"]) + pd.Timedelta(days=1)
+        return add_interval([], pd.Timestamp(entry["first"]), min(last, pd.Timestamp.today().normalize()))
+
+    def mark_covered(self, tickers: Iterable[str], start, end) -> None:
+        """Record ``[start, end)`` as fetched for each ticker."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        for ticker in tickers:
+            covered = add_interval(self.coverage(ticker), start, end)
+            entry = self.manifest.setdefault(ticker, {"rows": 0, "first": None, "last": None})
+            entry.pop("covered_start", None)
+            entry.pop("covered_end", None)
+            entry["covered"] = [[lo.isoformat(), hi.isoformat()] for lo, hi in covered]
+        self._save_manifest()
+
+    # ------------------------------------------------------------------ writes
+    def write(self, prices: pd.DataFrame) -> Dict[str, float]:
+        """Merge a wide price frame into the store.
+
+        Incoming bars that repeat stored values are dropped, and bars strictly
+        after a ticker's last stored date are appended in place. Changed or
+        earlier bars trigger a rewrite of that ticker only, with incoming
+        values taking precedence. If the overlapping bars show a new
+        adjustment basis (see `rebase_factor`), the rest of the ticker's
+        history is rescaled onto it.
+
+        Returns:
+            Mapping of each rescaled ticker to the factor applied to its
+            previously stored values.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        rebased: Dict[str, float] = {}
+        for ticker in prices.columns:
+            column = prices[ticker].dropna()
+            if column.empty:
+                continue
+            column = column[~column.index.duplicated(keep="last")].sort_index()
+            incoming = np.empty(len(column), dtype=RECORD_DTYPE)
+            incoming["date"] = pd.DatetimeIndex(column.index).as_unit("ns").asi8
+            incoming["value"] = column.to_numpy(dtype=float)
+
+            existing = self.records(ticker)
+            path = self._file(ticker)
+            factor = rebase_factor(existing, incoming) if len(existing) else 1.0
+            if factor != 1.0:
+                existing = np.array(existing)
+                existing["value"] *= factor
+                rebased[ticker] = factor
+            else:
+                _, at_existing, at_incoming = np.intersect1d(
+                    existing["date"], incoming["date"], assume_unique=True, return_indices=True
+                )
+                unchanged = np.isclose(
+                    incoming["value"][at_incoming], existing["value"][at_existing], rtol=REBASE_RTOL, atol=0.0
+                )
+                incoming = np.delete(incoming, at_incoming[unchanged])
+                if not len(incoming):
+                    continue
+
+            if factor == 1.0 and len(existing) and incoming["date"][0] > existing["date"][-1]:
+                with path.open("ab") as handle:
+                    handle.write(incoming.tobytes())
+                merged_first, merged_last = int(existing["date"][0]), int(incoming["date"][-1])
+                rows = len(existing) + len(incoming)
+            else:
+                if len(existing):
+                    keep = ~np.isin(existing["date"], incoming["date"])
+                    merged = np.concatenate([np.array(existing[keep]), incoming])
+                    merged = merged[np.argsort(merged["date"], kind="stable")]
+                else:
+                    merged = incoming
+                del existing
+                tmp = path.with_suffix(".tmp")
+                merged.tofile(tmp)
+                os.replace(tmp, path)
+                merged_first, merged_last = int(merged["date"][0]), int(merged["date"][-1])
+                rows = len(merged)
+
+            entry = self.manifest.setdefault(ticker, {})
+            entry.update(
+                {
+                    "rows": rows,
+                    "first": pd.Timestamp(merged_first).isoformat(),
+                    "last": pd.Timestamp(merged_last).isoformat(),
+                }
+            )
+        self._save_manifest()
+        return rebased
@@ -0,0 +1,232 @@
+"""End-to-end pipeline (both stages) expressed as a memoized stage DAG.
+
+Nodes and what invalidates them::
+
+    regime_returns (always runs) -> markov_fit [model] -> regime_signal [threshold]
+        -> regime_backtest [trading_cost_bps]
+    rotation_prices (always runs) -> momentum [momentum_months, skip_last_months]
+    rotation_prices + regime_signal + momentum
+        -> weights [top_k, lookbacks, absolute_threshold, turnover_cap]
+        -> portfolio_returns [fee_bps] -> vol_target [target_annual_vol, lookback]
+        -> report (always runs; writes CSVs and the charts)
+
+Price loading goes through the shared market-data layer on every run and is
+keyed by content, so new bars invalidate exactly the nodes that depend on
+them, while e.g. a changed `fee_bps` only re-runs `portfolio_returns` and
+`vol_target`.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+import pandas as pd
+
+from .dag import DAG, Node
+from .regime_detection import data as regime_data
+from .regime_detection import pipeline as regime_pipeline
+from .sector_rotation import backtest, engine, reporting, signals
+from .sector_rotation import data as rotation_data
+
+DEFAULT_CACHE_DIR = Path("artifacts") / "pipeline"
+
+
+# ---------------------------------------------------------------------- steps
+def load_regime_returns(*, tickers: List[str], start: str, end: Optional[str], cache_dir: str, provider: Any) -> pd.DataFrame:
+    cfg = {"data": {"tickers": tickers, "start": start, "end": end, "cache_dir": cache_dir, "provider": provider}}
+    returns = regime_data.load_prices(cfg, returns=True)
+    return returns[tickers].dropna()
+
+
+def fit_markov(
+    returns: pd.DataFrame,
+    *,
+    bench: str,
+    n_states: int,
+    engine: str,
+    walk_forward: Optional[Dict] = None,
+    n_starts: int = 1,
+    n_jobs: int = 1,
+) -> Dict:
+    return regime_pipeline.fit_regimes(
+        returns[bench],
+        n_states=n_states,
+        engine=engine,
+        walk_forward=walk_forward,
+        n_starts=n_starts,
+        n_jobs=n_jobs,
+    )
+
+
+def hysteresis(fit: Dict, *, threshold: float) -> pd.Series:
+    return regime_pipeline.regime_signal(fit["probabilities"], fit["bull_state"], threshold=threshold)
+
+
+def backtest_regimes(
+    returns: pd.DataFrame, signal: pd.Series, *, bench: str, cash: Optional[str], tc_bps: float, lag: int = 0
+) -> Dict:
+    prices = (1 + returns).cumprod()
+    return regime_pipeline.regime_backtest(prices, signal, bench=bench, cash=cash, tc_bps=tc_bps, lag=lag)
+
+
+def load_rotation_prices(*, tickers: List[str], start: str, end: Optional[str], provider: Any) -> pd.DataFrame:
+    return rotation_data.load_all(start=start, end=end, tickers=tickers, provider=provider).dropna(how="all")
+
+
+def momentum_scores(prices: pd.DataFrame, *, sectors: List[str], months: int, skip_last: int) -> pd.DataFrame:
+    return signals.trailing_return(prices[sectors], months=months, skip_last=skip_last)
+
+
+def rotation_weights(
+    prices: pd.DataFrame,
+    signal: pd.Series,
+    momentum: pd.DataFrame,
+    *,
+    sectors: List[str],
+    defensives: List[str],
+    bench: List[str],
+    params: Dict,
+) -> pd.DataFrame:
+    rotation = engine.RotationEngine(prices, (signal > 0.5).astype(int), sectors, defensives, bench)
+    return rotation.weights(engine.RotationParams(**params), momentum=momentum)
+
+
+def net_returns(weights: pd.DataFrame, prices: pd.DataFrame, *, fee_bps: float) -> Dict:
+    returns, turnover = backtest.portfolio_returns(weights, prices[weights.columns], fee_bps=fee_bps, return_turnover=True)
+    return {"returns": returns, "turnover": turnover}
+
+
+def target_vol(portfolio: Dict, *, target_annual_vol: float, lookback: int) -> Dict:
+    targeted = backtest.vol_target(portfolio["returns"], target_annual_vol=target_annual_vol, lookback=lookback)
+    return {"returns": targeted, "stats": backtest.perf_stats(targeted, portfolio["turnover"])}
+
+
+def write_report(result: Dict, weights: pd.DataFrame, *, output_dir: str) -> Dict[str, str]:
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    targeted = result["returns"]
+    pd.DataFrame({"returns": targeted, "equity": (1 + targeted).cumprod()}).to_csv(out / "equity_curve.csv")
+    weights.to_csv(out / "weights.csv")
+    reporting.save_equity_plot(targeted, out / "equity.png")
+    written = {name: str(out / name) for name in ("equity_curve.csv", "weights.csv", "equity.png")}
+    written.update(reporting.render_report(targeted, weights, out / "plots"))
+    return written
+
+
+# ---------------------------------------------------------------------- graph
+def build_pipeline(
+    regime_cfg: Mapping,
+    rotation_cfg: Mapping,
+    *,
+    output_dir: str | Path = "data",
+    cache_dir: str | Path | None = DEFAULT_CACHE_DIR,
+    max_workers: Optional[int] = None,
+) -> DAG:
+    """Build the two-stage DAG from the regime-detection and sector-rotation configs."""
+    regime_data_cfg = regime_cfg["data"]
+    bench = regime_data_cfg["tickers"][0]
+    cash = regime_data_cfg["tickers"][1] if len(regime_data_cfg["tickers"]) > 1 else None
+
+    sectors = list(dict.fromkeys(rotation_cfg.get("sectors", [])))
+    defensives = list(dict.fromkeys(rotation_cfg.get("defensives", [])))
+    rotation_bench = list(dict.fromkeys(rotation_cfg.get("bench", [])))
+    investable = sorted(set(sectors + defensives + rotation_bench))
+    params = engine.RotationParams.from_config(rotation_cfg)
+
+    nodes = [
+        Node(
+            "regime_returns",
+            load_regime_returns,
+            params={
+                "tickers": [bench] + ([cash] if cash else []),
+                "start": regime_data_cfg["start"],
+                "end": regime_data_cfg.get("end"),
+                "cache_dir": regime_data_cfg.get("cache_dir", "data"),
+                "provider": regime_data_cfg.get("provider"),
+            },
+            cache=False,
+        ),
+        Node(
+            "markov_fit",
+            fit_markov,
+            inputs=("regime_returns",),
+            params={
+                "bench": bench,
+                "n_states": regime_cfg["model"]["n_states"],
+                "engine": regime_cfg["model"].get("engine", "statsmodels"),
+                "walk_forward": regime_cfg["model"].get("walk_forward"),
+                "n_starts": regime_cfg["model"].get("n_starts", 1),
+                "n_jobs": regime_cfg["model"].get("n_jobs", 1),
+            },
+            version=2,
+        ),
+        Node("regime_signal", hysteresis, inputs=("markov_fit",), params={"threshold": regime_cfg["signals"]["threshold"]}),
+        Node(
+            "regime_backtest",
+            backtest_regimes,
+            inputs=("regime_returns", "regime_signal"),
+            params={
+                "bench": bench,
+                "cash": cash,
+                "tc_bps": regime_cfg.get("trading_cost_bps", 5.0),
+                "lag": regime_pipeline.signal_lag(regime_cfg["model"].get("walk_forward")),
+            },
+            version=3,
+        ),
+        Node(
+            "rotation_prices",
+            load_rotation_prices,
+            params={
+                "tickers": sorted(set(investable + ["SPY", "^VIX"])),
+                "start": rotation_cfg.get("start", "2004-01-01"),
+                "end": rotation_cfg.get("end"),
+                "provider": rotation_cfg.get("provider"),
+            },
+            cache=False,
+        ),
+        Node(
+            "momentum",
+            momentum_scores,
+            inputs=("rotation_prices",),
+            params={"sectors": sectors, "months": params.momentum_months, "skip_last": params.skip_last_months},
+        ),
+        Node(
+            "weights",
+            rotation_weights,
+            inputs=("rotation_prices", "regime_signal", "momentum"),
+            params={
+                "sectors": sectors,
+                "defensives": defensives,
+                "bench": rotation_bench,
+                "params": {
+                    name: getattr(params, name)
+                    for name in (
+                        "top_k",
+                        "momentum_months",
+                        "skip_last_months",
+                        "absolute_threshold",
+                        "inverse_vol_lookback",
+                        "hrp_lookback",
+                        "turnover_cap",
+                    )
+                },
+            },
+        ),
+        Node(
+            "portfolio_returns",
+            net_returns,
+            inputs=("weights", "rotation_prices"),
+            params={"fee_bps": params.fee_bps},
+            version=2,
+        ),
+        Node(
+            "vol_target",
+            target_vol,
+            inputs=("portfolio_returns",),
+            params={"target_annual_vol": params.target_annual_vol, "lookback": params.vol_target_lookback},
+            version=3,
+        ),
+        Node("report", write_report, inputs=("vol_target", "weights"), params={"output_dir": str(output_dir)}, cache=False),
+    ]
+    return DAG(nodes, cache_dir=cache_dir, max_workers=max_workers)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from regime_pipeline import workflow
+from regime_pipeline.regime_detection import data as regime_data
+from regime_pipeline.sector_rotation import utils
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run both pipeline stages as a memoized stage DAG.")
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=str(Path("configs") / "sector_rotation.yaml"),
+        help="Path to the sector-rotation configuration file.",
+    )
+    parser.add_argument(
+        "--regime-config",
+        type=str,
+        default=None,
+        help="Optional override for the regime detection configuration (Part 1).",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default="data",
+        help="Where to write the equity curve, weights and plot.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=str(workflow.DEFAULT_CACHE_DIR),
+        help="Directory for cached stage outputs.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Threads used to run independent stages concurrently.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    dag = workflow.build_pipeline(
+        regime_data.load_config(args.regime_config),
+        utils.load_config(args.config),
+        output_dir=args.output_dir,
+        cache_dir=args.cache_dir,
+        max_workers=args.jobs,
+    )
+    outputs = dag.run(["vol_target", "regime_backtest", "report"])
+    print(dag.summary()[["status", "seconds"]].to_string())
+
+    stats = outputs["vol_target"]["stats"]
+    print()
+    print("Performance Summary")
+    print("-------------------")
+    print(f"Annualized Return: {stats['ann_ret']:.2%}")
+    print(f"Annualized Volatility: {stats['ann_vol']:.2%}")
+    print(f"Sharpe Ratio: {stats['sharpe']:.2f}")
+    print(f"Sortino Ratio: {stats['sortino']:.2f}")
+    print(f"Max Drawdown: {stats['max_dd']:.2%}")
+    print(f"Calmar Ratio: {stats['calmar']:.2f}")
+    print(f"Annual Turnover: {stats['turnover']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 
+from regime_pipeline.regime_detection.cross_section import run_universe_detection
 from regime_pipeline.regime_detection.pipeline import run_regime_detection
 
 
@@ -24,15 +25,52 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Disable interactive charts from the regime detection stage.",
     )
+    parser.add_argument(
+        "--save-plots",
+        action="store_true",
+        help="Render the charts headlessly to <output-dir>/plots.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Refit the model even if a cached result matches the config and data.",
+    )
+    parser.add_argument(
+        "--universe",
+        nargs="+",
+        default=None,
+        metavar="TICKER",
+        help="Fit a separate model per ticker and write Parquet outputs to <output-dir>/universe.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for --universe fits (-1 for all cores).",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    if args.universe:
+        assets = run_universe_detection(
+            args.universe,
+            f"{args.output_dir}/universe",
+            config_path=args.config,
+            n_jobs=args.jobs,
+        )
+        failed = assets["error"].astype(bool)
+        print(f"Fitted {int((~failed).sum())} of {len(assets)} assets")
+        for ticker, error in assets.loc[failed, "error"].items():
+            print(f"  {ticker}: {error}")
+        return
     run_regime_detection(
         config_path=args.config,
         output_dir=args.output_dir,
         show_plots=not args.no_plots,
+        save_plots=args.save_plots,
+        use_cache=not args.no_cache,
     )
 
 
@@ -7,14 +7,7 @@ from typing import List
 import pandas as pd
 
 from regime_pipeline.regime_detection.pipeline import run_regime_detection
-from regime_pipeline.sector_rotation import (
-    allocators,
-    backtest,
-    data,
-    reporting,
-    signals,
-    utils,
-)
+from regime_pipeline.sector_rotation import data, engine, reporting, sweep, utils
 
 
 def parse_args() -> argparse.Namespace:
@@ -37,6 +30,28 @@ def parse_args() -> argparse.Namespace:
         default="artifacts/regime_detection",
         help="Directory to cache/read regime detection outputs.",
     )
+    parser.add_argument(
+        "--refresh-regimes",
+        action="store_true",
+        help="Refit the regime model even if a cached result matches the config and data.",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Backtest every combination in the config's `sweep` grid instead of a single run.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for --sweep and report rendering (-1 for all cores).",
+    )
+    parser.add_argument(
+        "--report-top",
+        type=int,
+        default=0,
+        help="With --sweep, render full reports for the N best combinations by Sharpe.",
+    )
     return parser.parse_args()
 
 
@@ -49,135 +64,78 @@ def build_universe(config: dict) -> tuple[List[str], List[str], List[str]]:
     return sectors, defensives, feature_tickers
 
 
-def ensure_weights_sum(weights: pd.Series) -> pd.Series:
-    total = weights.sum()
-    if total > 0:
-        return weights / total
-    return weights
-
-
-def determine_risk_off_universe(defensives: List[str], bench: List[str], prices: pd.DataFrame) -> List[str]:
-    universe = [ticker for ticker in defensives if ticker in prices.columns]
-    if "IEF" in prices.columns and "IEF" not in universe and "IEF" in bench + defensives:
-        universe.append("IEF")
-    return universe
-
-
 def main() -> None:
     args = parse_args()
     config = utils.load_config(args.config)
 
     sectors, defensives, feature_tickers = build_universe(config)
-    bench = list(dict.fromkeys(config.get("bench", [])))
     start = config.get("start", "2004-01-01")
     end = config.get("end")
     rebalance = config.get("rebalance", "M")
 
-    prices = data.load_all(start=start, end=end, tickers=feature_tickers)
+    prices = data.load_all(start=start, end=end, tickers=feature_tickers, provider=config.get("provider"))
     prices = prices.dropna(how="all")
 
-    regime_dir = Path(args.regime_artifacts)
-    risk_path = regime_dir / "risk_signal.csv"
-    if risk_path.exists():
-        regimes = pd.read_csv(risk_path, index_col=0, parse_dates=True)["risk_on"]
-    else:
-        regime_result = run_regime_detection(config_path=args.regime_config, output_dir=regime_dir)
-        regimes = regime_result.risk_flag()
-        regime_dir.mkdir(parents=True, exist_ok=True)
-        regimes.to_csv(risk_path, header=["risk_on"])
-
-    regimes = regimes.reindex(prices.index).ffill().fillna(0.0).rename("risk_on")
-
-    signals_cfg = config.get("signals", {})
-    momentum_scores = signals.trailing_return(
-        prices[sectors],
-        months=signals_cfg.get("momentum_months", 12),
-        skip_last=signals_cfg.get("skip_last_months", 1),
-    )
-
-    abs_mom = signals.absolute_momentum(
-        prices["SPY"],
-        months=signals_cfg.get("momentum_months", 12),
-        threshold=signals_cfg.get("absolute_threshold", 0.0),
+    # reuses the cached regime fit unless the config or its input data changed
+    regime_result = run_regime_detection(
+        config_path=args.regime_config,
+        output_dir=args.regime_artifacts,
+        use_cache=not args.refresh_regimes,
     )
-
-    rebalance_dates = momentum_scores.index
-    risk_monthly = regimes.reindex(rebalance_dates, method="ffill").fillna(0.0)
-    abs_monthly = abs_mom.reindex(rebalance_dates, method="ffill").fillna(0)
-
-    investable = sorted(set(sectors + defensives + bench))
-    weights_records: list[pd.Series] = []
-    prev_weights = pd.Series(0.0, index=investable)
-
-    inv_vol_lookback = signals_cfg.get("inverse_vol_lookback", 60)
-    hrp_lookback = signals_cfg.get("hrp_lookback", 60)
-
-    for dt in rebalance_dates:
-        risk_on = int(risk_monthly.loc[dt]) if dt in risk_monthly.index else 0
-        abs_on = int(abs_monthly.loc[dt]) if dt in abs_monthly.index else 0
-
-        target = pd.Series(0.0, index=investable)
-
-        if risk_on and abs_on:
-            score_row = momentum_scores.loc[dt].dropna()
-            ordered = score_row.reindex(sectors).dropna()
-            top_k = ordered.nlargest(min(signals_cfg.get("top_k", 4), len(ordered)))
-            if not top_k.empty:
-                history = prices.loc[:dt, top_k.index].dropna(how="all")
-                if not history.empty:
-                    ivol = allocators.inverse_vol_weights(history, lookback=inv_vol_lookback).iloc[-1]
-                    ivol = ivol.reindex(investable, fill_value=0.0)
-                    target.update(ivol)
-        else:
-            defensive_universe = determine_risk_off_universe(defensives, bench, prices)
-            if defensive_universe:
-                history = prices.loc[:dt, defensive_universe].dropna(how="all")
-                if not history.empty:
-                    try:
-                        hrp = allocators.hrp_weights(history, lookback=hrp_lookback).iloc[-1]
-                        hrp = hrp.reindex(investable, fill_value=0.0)
-                        if hrp.sum() <= 0:
-                            raise ValueError("HRP returned zero weights.")
-                        target.update(hrp)
-                    except Exception:
-                        equal_weight = 1.0 / len(defensive_universe)
-                        for ticker in defensive_universe:
-                            if ticker in target.index:
-                                target.loc[ticker] = equal_weight
-
-        target = ensure_weights_sum(target)
-        adjusted = backtest.cap_turnover(prev_weights, target, cap=config.get("turnover_cap", 0.30))
-        adjusted = ensure_weights_sum(adjusted)
-
-        weights_records.append(adjusted)
-        prev_weights = adjusted
-
-    weights_df = pd.DataFrame(weights_records, index=rebalance_dates).reindex(columns=investable).fillna(0.0)
-
-    portfolio_rets = backtest.portfolio_returns(weights_df, prices[investable], fee_bps=config.get("fee_bps", 10))
-    targeted_rets = backtest.vol_target(
-        portfolio_rets,
-        target_annual_vol=config.get("target_annual_vol", 0.12),
-        lookback=config.get("vol_target_lookback", 63),
-    )
-
-    equity_curve = (1 + targeted_rets).cumprod()
-    stats = backtest.perf_stats(targeted_rets)
+    regimes = regime_result.risk_flag()
 
     data_path = Path("data")
     data_path.mkdir(parents=True, exist_ok=True)
 
-    equity_df = pd.DataFrame({"returns": targeted_rets, "equity": equity_curve})
+    if args.sweep:
+        rotation = engine.RotationEngine(
+            prices,
+            regimes,
+            sectors=sectors,
+            defensives=defensives,
+            bench=config.get("bench", []),
+            n_jobs=config.get("signals", {}).get("hrp_n_jobs", 1),
+        )
+        results = sweep.run_sweep(
+            rotation,
+            config.get("sweep", {}),
+            base=engine.RotationParams.from_config(config),
+            n_jobs=args.jobs,
+        )
+        out_path = sweep.save_results(results, data_path / "sweep_results.csv")
+        print(f"Evaluated {len(results)} parameter combinations -> {out_path}")
+        ranked = results.sort_values("sharpe", ascending=False)
+        print(ranked.head(10).to_string(index=False))
+        if args.report_top > 0:
+            fields = list(engine.RotationParams().to_dict())
+            top = [engine.RotationParams(**row) for row in ranked.head(args.report_top)[fields].to_dict("records")]
+            reports = reporting.render_run_reports(rotation, top, data_path / "sweep_reports", n_jobs=args.jobs)
+            print(f"Rendered {len(reports)} reports -> {data_path / 'sweep_reports'}")
+        return
+
+    result = engine.run_rotation(
+        prices,
+        regimes,
+        config,
+        n_jobs=config.get("signals", {}).get("hrp_n_jobs", 1),
+    )
+    weights_df, targeted_rets, stats = result.weights, result.returns, result.stats
+
+    equity_df = pd.DataFrame({"returns": targeted_rets, "equity": result.equity})
     equity_df.to_csv(data_path / "equity_curve.csv")
     weights_df.to_csv(data_path / "weights.csv")
     reporting.save_equity_plot(targeted_rets, data_path / "equity.png")
+    reporting.render_report(targeted_rets, weights_df, data_path / "plots")
 
     print("Performance Summary")
     print("-------------------")
     print(f"Annualized Return: {stats['ann_ret']:.2%}")
     print(f"Annualized Volatility: {stats['ann_vol']:.2%}")
     print(f"Sharpe Ratio: {stats['sharpe']:.2f}")
+    print(f"Sortino Ratio: {stats['sortino']:.2f}")
     print(f"Max Drawdown: {stats['max_dd']:.2%}")
+    print(f"Calmar Ratio: {stats['calmar']:.2f}")
+    print(f"Annual Turnover: {stats['turnover']:.2f}")
 
 
 if __name__ == "__main__":
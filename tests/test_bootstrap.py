@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from regime_pipeline import bootstrap, performance
+
+
+def _returns(n: int = 1500, seed: int = 0) -> pd.Series:
+    index = pd.bdate_range("2010-01-01", periods=n)
+    return pd.Series(np.random.default_rng(seed).normal(0.0004, 0.01, n), index=index)
+
+
+def test_path_stats_match_strategy_stats_on_the_original_path() -> None:
+    returns = _returns()
+    values = returns.to_numpy()[:, None]
+    identity = np.arange(len(returns))[None, :]
+
+    stats = bootstrap._path_stats(values, np.log1p(values), identity, freq=252)[0, 0]
+    expected = performance.summary(returns)
+    for pos, name in enumerate(bootstrap.STATS):
+        assert stats[pos] == pytest.approx(expected[name], rel=1e-9)
+
+
+@pytest.mark.parametrize("method", bootstrap.METHODS)
+def test_bootstrap_is_reproducible_across_chunk_sizes(method: str) -> None:
+    returns = _returns()
+    frame = pd.DataFrame({"a": returns, "b": 2 * returns})
+
+    small_chunks = bootstrap.bootstrap_stats(frame, 600, method=method, seed=3, max_bytes=1)
+    one_chunk = bootstrap.bootstrap_stats(frame, 600, method=method, seed=3)
+    pd.testing.assert_frame_equal(small_chunks, one_chunk)
+
+    single = bootstrap.bootstrap_stats(returns, 600, method=method, seed=3)
+    np.testing.assert_allclose(single.to_numpy(), one_chunk.loc["a"].to_numpy())
+    intervals = bootstrap.confidence_intervals(single, level=0.9)
+    assert (intervals["lower"] <= intervals["median"]).all() and (intervals["median"] <= intervals["upper"]).all()
+
+
+def test_chunks_respect_memory_budget_for_many_strategies(monkeypatch: pytest.MonkeyPatch) -> None:
+    returns = _returns(n=500)
+    frame = pd.DataFrame({f"s{i}": returns * (1 + i / 10) for i in range(6)})
+    budget = 3 * 8 * len(returns) * 8
+    expected = bootstrap.bootstrap_stats(frame, 40, seed=5)
+
+    sizes = []
+    path_stats = bootstrap._path_stats
+
+    def recording(values, logs, idx, freq):
+        sizes.append(idx.shape[0] * values.shape[1])
+        return path_stats(values, logs, idx, freq)
+
+    monkeypatch.setattr(bootstrap, "_path_stats", recording)
+    chunked = bootstrap.bootstrap_stats(frame, 40, seed=5, max_bytes=budget)
+    assert max(sizes) <= 3
+    pd.testing.assert_frame_equal(chunked, expected)
+
+
+def test_bootstrap_rejects_total_losses() -> None:
+    returns = _returns(n=100)
+    returns.iloc[10] = -1.0
+    with pytest.raises(ValueError):
+        bootstrap.bootstrap_stats(returns, 10, seed=0)
+
+
+def test_stationary_indices_follow_geometric_blocks() -> None:
+    idx = bootstrap.stationary_indices(500, 400, mean_block=10, rng=0)
+    assert idx.shape == (400, 500) and idx.min() >= 0 and idx.max() < 500
+    breaks = np.diff(idx, axis=1) % 500 != 1
+    assert breaks.mean() == pytest.approx(0.1, abs=0.01)
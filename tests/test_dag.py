@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from regime_pipeline.dag import DAG, Node
+
+
+def _graph(cache_dir: Path, calls: dict, *, scale: float = 1.0, fee: float = 0.0, data: float = 1.0) -> DAG:
+    barrier = threading.Barrier(2, timeout=5)
+
+    def record(name):
+        calls[name] = calls.get(name, 0) + 1
+
+    def load(*, value):
+        record("load")
+        return pd.Series([value, 2 * value])
+
+    def left(series, *, scale):
+        record("left")
+        barrier.wait()  # only passes if `right` runs at the same time
+        return series * scale
+
+    def right(series):
+        record("right")
+        barrier.wait()
+        return series + 1
+
+    def combine(a, b, *, fee):
+        record("combine")
+        return float((a + b).sum() - fee)
+
+    return DAG(
+        [
+            Node("load", load, params={"value": data}, cache=False),
+            Node("left", left, inputs=("load",), params={"scale": scale}),
+            Node("right", right, inputs=("load",)),
+            Node("combine", combine, inputs=("left", "right"), params={"fee": fee}),
+        ],
+        cache_dir=cache_dir,
+        max_workers=4,
+    )
+
+
+def test_dag_memoizes_per_node_and_runs_branches_concurrently(tmp_path: Path) -> None:
+    calls: dict = {}
+    assert _graph(tmp_path, calls).run()["combine"] == pytest.approx(8.0)
+    assert calls == {"load": 1, "left": 1, "right": 1, "combine": 1}
+
+    # unchanged params and data: only the uncached source runs
+    dag = _graph(tmp_path, calls)
+    assert dag.run()["combine"] == pytest.approx(8.0)
+    assert calls == {"load": 2, "left": 1, "right": 1, "combine": 1}
+    assert dag.summary().loc["combine", "status"] == "cached"
+
+    # a parameter of the last node re-runs only that node
+    assert _graph(tmp_path, calls, fee=1.0).run()["combine"] == pytest.approx(7.0)
+    assert calls == {"load": 3, "left": 1, "right": 1, "combine": 2}
+
+    # new source data invalidates everything downstream of it
+    assert _graph(tmp_path, calls, data=2.0).run()["combine"] == pytest.approx(14.0)
+    assert calls == {"load": 4, "left": 2, "right": 2, "combine": 3}
+
+
+def test_dag_rejects_cycles() -> None:
+    with pytest.raises(ValueError, match="Cycle"):
+        DAG([Node("a", lambda b: b, inputs=("b",)), Node("b", lambda a: a, inputs=("a",))])
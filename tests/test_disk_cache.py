@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from regime_pipeline.disk_cache import DiskCache
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path, max_bytes=10**6)
+    for i, key in enumerate("abc"):
+        cache.put(key, bytes(1000))
+        os.utime(tmp_path / f"{key}.pkl", ns=(i * 10**9, i * 10**9))
+    assert cache.get("a") is not None  # refreshes "a", so "b" is now the oldest
+
+    entry = (tmp_path / "a.pkl").stat().st_size
+    assert cache.prune(max_bytes=2 * entry) == 1
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.size_bytes == 2 * entry
+
+    cache.max_bytes = entry
+    cache.put("d", bytes(1000))
+    assert len(cache) == 1 and cache.get("d") == bytes(1000)
+    assert cache.get("missing", default=0) == 0
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from regime_pipeline import gaussian_hmm
+
+hmm = pytest.importorskip("hmmlearn.hmm")
+
+
+def _features(n: int = 900, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    calm = np.arange(n) % 120 < 80
+    ret = np.where(calm, rng.normal(0.001, 0.006, n), rng.normal(-0.002, 0.02, n))
+    d_vix = np.where(calm, rng.normal(-0.1, 0.5, n), rng.normal(0.3, 2.0, n))
+    return np.column_stack([ret, d_vix])
+
+
+@pytest.mark.parametrize("n_windows", [1, gaussian_hmm._SCAN_MAX_BATCH + 4])
+def test_batched_fit_matches_hmmlearn(n_windows: int) -> None:
+    values = _features()
+    ends = np.linspace(400, len(values), n_windows, dtype=int)
+    seeds = list(range(n_windows))
+    windows = gaussian_hmm.strided_windows(values, ends, 400)
+
+    res = gaussian_hmm.em_fit(windows, 2, n_iter=100, tol=1e-2, seeds=seeds)
+    states = gaussian_hmm.decode(windows, res)
+    for b, (end, seed) in enumerate(zip(ends, seeds)):
+        model = hmm.GaussianHMM(2, covariance_type="full", n_iter=100, tol=1e-2, random_state=seed)
+        model.fit(values[end - 400 : end])
+        assert res.n_iter[b] == model.monitor_.iter
+        assert res.converged[b] == model.monitor_.converged
+        for ours, theirs in zip(res.params(b), (model.startprob_, model.transmat_, model.means_, model.covars_)):
+            np.testing.assert_allclose(ours, theirs, rtol=1e-8, atol=1e-12)
+        np.testing.assert_array_equal(states[:, b], model.predict(values[end - 400 : end]))
+
+
+def test_iteration_cap_counts_as_converged() -> None:
+    values = _features()[:400]
+    res = gaussian_hmm.em_fit(values, 2, n_iter=2, tol=1e-12, seeds=[0])
+    model = hmm.GaussianHMM(2, covariance_type="full", n_iter=2, tol=1e-12, random_state=0).fit(values)
+    assert res.n_iter[0] == model.monitor_.iter == 2
+    assert res.converged[0] == model.monitor_.converged
+
+
+def test_scan_and_loop_kernels_agree(monkeypatch) -> None:
+    values = _features(seed=1)
+    windows = gaussian_hmm.strided_windows(values, [400, 650, 900], 400)
+    start = gaussian_hmm.init_params(windows, 3, [0, 1, 2])
+    logframe = gaussian_hmm.log_emissions(windows, start[2], start[3])
+
+    monkeypatch.setattr(gaussian_hmm, "_SCAN_MAX_BATCH", 16)
+    scan = gaussian_hmm.forward_backward(logframe, start[0], start[1])
+    scan_path = gaussian_hmm.viterbi(logframe, start[0], start[1])
+    monkeypatch.setattr(gaussian_hmm, "_SCAN_MAX_BATCH", 0)
+    loop = gaussian_hmm.forward_backward(logframe, start[0], start[1])
+    for ours, theirs in zip(scan, loop):
+        np.testing.assert_allclose(ours, theirs, rtol=1e-10)
+    np.testing.assert_array_equal(scan_path, gaussian_hmm.viterbi(logframe, start[0], start[1]))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import textwrap
+
+HEAVY = ["matplotlib", "statsmodels", "yfinance", "hmmlearn", "sklearn", "scipy"]
+
+# bounds on importing the whole package once numpy/pandas are loaded: its
+# wall time relative to that of importing numpy and pandas in the same
+# process (eager heavy imports take several times as long), and the number
+# of other modules it pulls in
+MAX_IMPORT_TIME_RATIO = 1.0
+MAX_EXTRA_MODULES = 100
+
+
+def _import_everything() -> dict:
+    script = textwrap.dedent(
+        """
+        import importlib, json, pkgutil, sys, time
+
+        started = time.perf_counter()
+        import numpy, pandas
+        baseline = time.perf_counter() - started
+
+        loaded = set(sys.modules)
+        started = time.perf_counter()
+        import regime_pipeline
+        for info in pkgutil.walk_packages(regime_pipeline.__path__, "regime_pipeline."):
+            importlib.import_module(info.name)
+        elapsed = time.perf_counter() - started
+        extra = [m for m in set(sys.modules) - loaded if m.split(".")[0] != "regime_pipeline"]
+        print(json.dumps({
+            "seconds": elapsed,
+            "baseline_seconds": baseline,
+            "extra_modules": len(extra),
+            "modules": sorted({m.split(".")[0] for m in sys.modules}),
+        }))
+        """
+    )
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_package_import_defers_heavy_dependencies() -> None:
+    result = _import_everything()
+    assert not set(HEAVY) & set(result["modules"])
+    assert result["extra_modules"] <= MAX_EXTRA_MODULES
+    assert result["seconds"] < MAX_IMPORT_TIME_RATIO * result["baseline_seconds"]
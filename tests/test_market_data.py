@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regime_pipeline import market_data
+from regime_pipeline.regime_detection import data as regime_data
+from regime_pipeline.sector_rotation import data as rotation_data
+from regime_pipeline.store import PriceStore
+
+
+class CountingProvider(market_data.SyntheticProvider):
+    def __init__(self) -> None:
+        super().__init__(seed=3)
+        self.calls: list[tuple[list[str], pd.Timestamp, pd.Timestamp]] = []
+
+    @property
+    def cache_key(self) -> str:
+        return f"counting:{id(self)}"
+
+    def fetch(self, tickers, start, end):
+        self.calls.append((sorted(tickers), start, end))
+        return super().fetch(tickers, start, end)
+
+
+def test_stages_share_one_loaded_panel(tmp_path: Path) -> None:
+    provider = CountingProvider()
+    cache = tmp_path / "prices"
+
+    part1 = regime_data.download_prices(
+        ["SPY", "BIL"], start="2015-01-01", end="2016-01-01", cache_path=cache, provider=provider
+    )
+    part2 = rotation_data.download_prices(
+        ["SPY", "XLK"], start="2015-06-01", end="2016-01-01", cache_path=cache, provider=provider
+    )
+
+    # SPY was already loaded by Part 1, so Part 2 only fetches XLK
+    assert provider.calls[-1][0] == ["XLK"]
+    assert len(provider.calls) == 2
+    pd.testing.assert_series_equal(part2["SPY"], part1["SPY"].loc["2015-06-01":], check_freq=False)
+
+    # a fresh process-level instance reads from the store without touching the provider
+    reloaded = market_data.MarketData(provider=provider, cache_path=cache)
+    reloaded.prices(["SPY", "BIL", "XLK"], start="2015-06-01", end="2016-01-01")
+    assert len(provider.calls) == 2
+
+
+def test_provider_from_config() -> None:
+    assert isinstance(market_data.provider_from_config(None), market_data.YFinanceProvider)
+    provider = market_data.provider_from_config({"name": "synthetic", "seed": 5})
+    assert isinstance(provider, market_data.SyntheticProvider)
+    first = provider.fetch(["AAA"], pd.Timestamp("2020-01-01"), pd.Timestamp("2020-03-01"))
+    tail = provider.fetch(["AAA"], pd.Timestamp("2020-02-01"), pd.Timestamp("2020-03-01"))
+    pd.testing.assert_frame_equal(first.loc["2020-02-01":], tail, check_freq=False)
+
+
+class MutableProvider(market_data.PriceProvider):
+    name = "mutable"
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+        self.calls: list[tuple[pd.Timestamp, pd.Timestamp]] = []
+
+    @property
+    def cache_key(self) -> str:
+        return f"mutable:{id(self)}"
+
+    def fetch(self, tickers, start, end):
+        self.calls.append((start, end))
+        window = self.frame.loc[(self.frame.index >= start) & (self.frame.index < end)]
+        return window.reindex(columns=list(tickers)).copy()
+
+
+def test_open_ended_load_refreshes_last_bar(tmp_path: Path) -> None:
+    today = pd.Timestamp.today().normalize()
+    dates = pd.date_range(end=today, periods=10)
+    provider = MutableProvider(pd.DataFrame({"AAA": np.arange(10.0) + 100}, index=dates))
+    cache = tmp_path / "prices"
+
+    first = market_data.MarketData(provider=provider, cache_path=cache).prices(["AAA"], start=dates[0])
+    assert first["AAA"].iloc[-1] == 109.0
+
+    # the provider revises today's intraday bar; a later run must pick it up
+    provider.frame.loc[today, "AAA"] = 111.0
+    second = market_data.MarketData(provider=provider, cache_path=cache).prices(["AAA"], start=dates[0])
+    assert second["AAA"].iloc[-1] == 111.0
+    assert provider.calls[-1][0] <= today
+    assert PriceStore(cache).read_series("AAA").iloc[-1] == 111.0
+    pd.testing.assert_series_equal(second["AAA"].iloc[:-1], first["AAA"].iloc[:-1])
+
+
+def test_split_after_stored_history_rescales_it(tmp_path: Path) -> None:
+    dates = pd.bdate_range("2020-01-01", periods=40)
+    prices = pd.Series(100.0 + np.arange(40.0), index=dates)
+    provider = MutableProvider(prices.to_frame("AAA"))
+    cache = tmp_path / "prices"
+    market = market_data.MarketData(provider=provider, cache_path=cache)
+    market.prices(["AAA"], start=dates[0], end=dates[20])
+
+    # a 2:1 split on dates[30] halves the adjusted closes of every earlier bar
+    provider.frame = (prices / 2).to_frame("AAA")
+    end = dates[-1] + pd.Timedelta(days=1)
+    loaded = market.prices(["AAA"], start=dates[0], end=end)
+    assert provider.calls[-1][0] < dates[20]
+    pd.testing.assert_series_equal(loaded["AAA"], (prices / 2).rename("AAA"), check_freq=False)
+
+    reloaded = market_data.MarketData(provider=provider, cache_path=cache).prices(["AAA"], start=dates[0], end=end)
+    pd.testing.assert_frame_equal(reloaded, loaded)
+
+
+def test_store_keeps_disjoint_loads_apart(tmp_path: Path) -> None:
+    provider = CountingProvider()
+    cache = tmp_path / "prices"
+    jan_2020 = (pd.Timestamp("2020-01-01"), pd.Timestamp("2020-02-01"))
+    jan_2021 = (pd.Timestamp("2021-01-01"), pd.Timestamp("2021-02-01"))
+    market_data.MarketData(provider=provider, cache_path=cache).prices(["AAA"], *jan_2020)
+    market_data.MarketData(provider=provider, cache_path=cache).prices(["AAA"], *jan_2021)
+
+    # the year between the two requests is neither downloaded nor claimed
+    assert provider.calls[-1] == (["AAA"], *jan_2021)
+    assert PriceStore(cache).coverage("AAA") == [jan_2020, jan_2021]
+
+    # a request spanning both fetches only the gap between them, plus overlap bars
+    spanning = market_data.MarketData(provider=provider, cache_path=cache).prices(
+        ["AAA"], "2020-01-15", "2021-01-15"
+    )
+    assert provider.calls[-1][1] < jan_2020[1] and provider.calls[-1][2] > jan_2021[0]
+    expected = provider.fetch(["AAA"], pd.Timestamp("2020-01-15"), pd.Timestamp("2021-01-15"))
+    pd.testing.assert_frame_equal(spanning, expected, check_freq=False)
+    assert PriceStore(cache).coverage("AAA") == [(jan_2020[0], jan_2021[1])]
+
+
+def test_memory_panel_keeps_disjoint_loads_apart() -> None:
+    provider = CountingProvider()
+    market = market_data.MarketData(provider=provider)
+    market.prices(["AAA"], "2020-01-01", "2020-02-01")
+    market.prices(["AAA"], "2021-01-01", "2021-02-01")
+
+    between = market.prices(["AAA"], "2020-06-01", "2020-07-01")
+    spanning = market.prices(["AAA"], "2020-01-15", "2021-01-15")
+    fresh = market_data.MarketData(provider=CountingProvider())
+    pd.testing.assert_frame_equal(between, fresh.prices(["AAA"], "2020-06-01", "2020-07-01"), check_freq=False)
+    pd.testing.assert_frame_equal(spanning, fresh.prices(["AAA"], "2020-01-15", "2021-01-15"), check_freq=False)
+    # only the two stretches not yet loaded were fetched for the spanning request
+    assert [call[1:] for call in provider.calls[3:]] == [
+        (pd.Timestamp("2020-02-01"), pd.Timestamp("2020-06-01")),
+        (pd.Timestamp("2020-07-01"), pd.Timestamp("2021-01-01")),
+    ]
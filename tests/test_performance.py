@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from regime_pipeline import performance
+from regime_pipeline.regime_detection import backtest as regime_backtest
+from regime_pipeline.sector_rotation import backtest
+
+
+def _reference(returns: pd.Series, freq: int = 252) -> dict:
+    equity = (1 + returns).cumprod()
+    peak = equity.cummax().clip(lower=1.0)
+    underwater = (equity < peak).to_numpy()
+    longest = run = 0
+    for flag in underwater:
+        run = run + 1 if flag else 0
+        longest = max(longest, run)
+    ann_ret = equity.iloc[-1] ** (freq / len(returns)) - 1
+    ann_vol = returns.std() * np.sqrt(freq)
+    max_dd = (equity / peak - 1).min()
+    downside = np.sqrt((returns.clip(upper=0.0) ** 2).mean() * freq)
+    return {
+        "ann_ret": ann_ret,
+        "ann_vol": ann_vol,
+        "sharpe": returns.mean() * freq / ann_vol,
+        "sortino": returns.mean() * freq / downside,
+        "max_dd": max_dd,
+        "max_dd_duration": longest,
+        "calmar": ann_ret / abs(max_dd),
+    }
+
+
+def test_strategy_stats_match_per_series_reference() -> None:
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2015-01-01", periods=800)
+    returns = pd.DataFrame(rng.normal(0.0003, 0.01, (800, 5)), index=index, columns=list("abcde"))
+    returns["e"] = -returns["e"].abs()  # never recovers: one drawdown spanning the sample
+    turnover = pd.DataFrame(rng.uniform(0, 0.2, (40, 5)), columns=returns.columns)
+
+    stats = performance.strategy_stats(returns, turnover, max_bytes=1)
+    for column in returns:
+        expected = _reference(returns[column])
+        for name, value in expected.items():
+            assert stats.loc[column, name] == pytest.approx(value, rel=1e-9), (column, name)
+        assert stats.loc[column, "turnover"] == pytest.approx(turnover[column].sum() * 252 / 800)
+    assert stats.loc["e", "max_dd_duration"] == 800
+
+
+def test_stage_helpers_share_the_definitions() -> None:
+    returns = pd.Series(np.random.default_rng(1).normal(0.0004, 0.01, 600), index=pd.bdate_range("2016-01-01", periods=600))
+    unified = performance.summary(returns)
+
+    assert backtest.perf_stats(returns) == pytest.approx(unified, nan_ok=True)
+    regime = regime_backtest.annualized_stats(returns)
+    assert regime["ann_return"] == pytest.approx(unified["ann_ret"])
+    assert regime["sharpe"] == pytest.approx(unified["sharpe"])
+    assert regime["max_dd"] == pytest.approx(unified["max_dd"])
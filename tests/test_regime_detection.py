@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from statsmodels.tsa.regime_switching.markov_regression import MarkovRegression
+
+from regime_pipeline.filtering import RegimeFilter, update_or_refit
+from regime_pipeline.regime_detection import cross_section, markov, model, multistart, pipeline, signals, walk_forward
+
+
+def _reference_hysteresis(bull_prob: pd.Series, buy: float, sell: float) -> pd.Series:
+    pos, state = pd.Series(index=bull_prob.index, dtype=float), 0.0
+    for t, p in bull_prob.items():
+        if p >= buy:
+            state = 1.0
+        elif p <= sell:
+            state = 0.0
+        pos.loc[t] = state
+    return pos
+
+
+def _random_probabilities(n: int = 500, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    values = np.abs(np.sin(np.cumsum(rng.normal(0, 0.2, n))))
+    probs = pd.Series(values, index=pd.bdate_range("2020-01-01", periods=n))
+    probs.iloc[10:15] = np.nan
+    return probs
+
+
+def test_hysteresis_signal_matches_loop() -> None:
+    probs = _random_probabilities()
+    expected = _reference_hysteresis(probs, buy=0.6, sell=0.4)
+    pd.testing.assert_series_equal(signals.hysteresis_signal(probs, buy=0.6, sell=0.4), expected)
+
+
+def test_hysteresis_grid_matches_single_runs() -> None:
+    probs = _random_probabilities(seed=1)
+    pairs = [(0.5, 0.5), (0.7, 0.3), (0.9, 0.2)]
+    grid = signals.hysteresis_grid(probs, pairs, windows=[1, 3])
+    assert grid.shape == (len(probs), len(pairs) * 2)
+
+    for buy, sell in pairs:
+        for k in (1, 3):
+            expected = signals.smooth_positions(_reference_hysteresis(probs, buy, sell), k=k)
+            np.testing.assert_allclose(grid[(buy, sell, k)].to_numpy(), expected.to_numpy())
+
+
+def _switching_returns(n: int = 600, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    calm = np.arange(n) % 200 < 140
+    values = np.where(calm, rng.normal(0.001, 0.007, n), rng.normal(-0.001, 0.02, n))
+    return pd.Series(values, index=pd.bdate_range("2018-01-01", periods=n))
+
+
+def test_filter_state_update_matches_full_filter(tmp_path: Path) -> None:
+    returns = _switching_returns()
+    res = model.fit_markov_model(returns.iloc[:-5])
+    state = model.filter_state(res, refit_every=5)
+    assert state.last_date == returns.index[-6]
+
+    restored = RegimeFilter.load(state.save(tmp_path / "filter.json"))
+    updated = restored.update(returns.iloc[-5:])
+
+    full = MarkovRegression(returns, k_regimes=2, trend="c", switching_variance=True).filter(res.params)
+    expected = np.asarray(full.filtered_marginal_probabilities)[-5:]
+    np.testing.assert_allclose(updated.to_numpy(), expected, atol=1e-10)
+    assert updated.index.equals(returns.index[-5:])
+    assert restored.due_for_refit
+
+    # observations already absorbed are skipped
+    assert restored.update(returns.iloc[-3:]).empty
+
+
+def test_update_or_refit_only_refits_when_due() -> None:
+    state = RegimeFilter(
+        transmat=[[0.95, 0.05], [0.1, 0.9]],
+        means=[0.001, -0.002],
+        covariances=[1e-4, 4e-4],
+        probabilities=[0.5, 0.5],
+        refit_every=3,
+    )
+    calls = {"count": 0}
+
+    def refit() -> RegimeFilter:
+        calls["count"] += 1
+        return state
+
+    update_or_refit(state, np.array([0.001, 0.002]), refit)
+    assert calls["count"] == 0
+    update_or_refit(state, np.array([-0.01]), refit)
+    assert calls["count"] == 1
+
+
+def test_native_engine_matches_statsmodels() -> None:
+    returns = _switching_returns()
+    reference = model.fit_markov_model(returns)
+    native = model.fit_markov_model(returns, engine="native")
+
+    assert native.converged
+    assert abs(native.llf - reference.llf) < 1e-6
+    np.testing.assert_allclose(native.params.to_numpy(), reference.params.to_numpy(), rtol=1e-3, atol=1e-8)
+    assert model.identify_bull_state(native) == model.identify_bull_state(reference)
+
+    probs_native = model.extract_probabilities(native)
+    probs_reference = model.extract_probabilities(reference)
+    assert probs_native.index.equals(returns.index)
+    np.testing.assert_allclose(probs_native.to_numpy(), probs_reference.to_numpy(), atol=1e-4)
+
+
+def test_native_panel_fit_matches_single_fits() -> None:
+    panel = pd.DataFrame({"A": _switching_returns(seed=1), "B": _switching_returns(seed=2)})
+    fits = markov.fit_markov_switching_panel(panel)
+    for name in panel.columns:
+        single = markov.fit_markov_switching(panel[name])
+        np.testing.assert_allclose(fits[name].params.to_numpy(), single.params.to_numpy(), rtol=1e-10)
+
+
+def test_run_regime_detection_caches_by_config_and_data(tmp_path: Path, monkeypatch) -> None:
+    cfg = {
+        "data": {
+            "tickers": ["SPY", "BIL"],
+            "start": "2017-01-01",
+            "end": "2019-01-01",
+            "cache_dir": str(tmp_path / "data"),
+            "provider": "synthetic",
+        },
+        "model": {"n_states": 2},
+        "signals": {"threshold": 0.5},
+    }
+    config_path = tmp_path / "regime.yaml"
+    config_path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+
+    fits = {"count": 0}
+    fit = model.fit_markov_model
+
+    def counting_fit(*args, **kwargs):
+        fits["count"] += 1
+        return fit(*args, **kwargs)
+
+    monkeypatch.setattr(model, "fit_markov_model", counting_fit)
+    out = tmp_path / "artifacts"
+
+    first = pipeline.run_regime_detection(config_path, output_dir=out)
+    second = pipeline.run_regime_detection(config_path, output_dir=out)
+    assert fits["count"] == 1
+    pd.testing.assert_series_equal(second.risk_flag(), first.risk_flag(), check_freq=False)
+    pd.testing.assert_frame_equal(second.backtest, first.backtest, check_freq=False)
+    assert second.stats == first.stats and second.bull_state == first.bull_state
+
+    cfg["signals"]["threshold"] = 0.7
+    config_path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    pipeline.run_regime_detection(config_path, output_dir=out)
+    assert fits["count"] == 2
+    assert len(list((out / "cache").iterdir())) == 2
+
+
+def test_walk_forward_probabilities_are_out_of_sample() -> None:
+    returns = _switching_returns(n=760, seed=2)
+    config = walk_forward.WalkForwardConfig(refit=126, min_train=504)
+
+    probs, diagnostics = walk_forward.walk_forward_probabilities(returns, config)
+    assert probs.index[0] == returns.index[504] and probs.index[-1] == returns.index[-1]
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0)
+    assert list(diagnostics["n_train"]) == [504, 630, 756]
+    assert (diagnostics["bull_mean"] > diagnostics["bear_mean"]).all()
+
+    # truncating the data must not change any earlier probability
+    prefix, _ = walk_forward.walk_forward_probabilities(returns.iloc[:700], config)
+    pd.testing.assert_frame_equal(prefix, probs.loc[: prefix.index[-1]], check_freq=False)
+
+    fit = pipeline.fit_regimes(returns, walk_forward={"enabled": True, "refit": 126, "min_train": 504})
+    assert fit["bull_state"] == 0
+    pd.testing.assert_frame_equal(fit["probabilities"], probs)
+
+
+def test_walk_forward_position_ignores_same_day_return() -> None:
+    returns = _switching_returns(n=760, seed=2)
+    wf = {"enabled": True, "refit": 126, "min_train": 504}
+    day = returns.index[700]
+    shocked = returns.copy()
+    shocked.loc[day] = -0.08
+
+    def run(series: pd.Series) -> tuple[pd.Series, pd.DataFrame]:
+        fit = pipeline.fit_regimes(series, walk_forward=wf)
+        signal = pipeline.regime_signal(fit["probabilities"], fit["bull_state"], threshold=0.6)
+        bt = pipeline.regime_backtest(
+            (1 + series.to_frame("SPY")).cumprod(), signal, bench="SPY", lag=pipeline.signal_lag(wf)
+        )
+        return signal, bt["backtest"]
+
+    signal, bt = run(returns)
+    shocked_signal, shocked_bt = run(shocked)
+    assert shocked_signal.loc[day] != signal.loc[day]
+    pd.testing.assert_series_equal(shocked_bt["position"].loc[:day], bt["position"].loc[:day])
+    assert pipeline.signal_lag(None) == 0
+
+
+def test_walk_forward_cold_refits_match_in_parallel() -> None:
+    returns = _switching_returns(n=640, seed=3)
+    serial = walk_forward.WalkForwardConfig(refit=63, min_train=504, warm_start=False)
+    parallel = walk_forward.WalkForwardConfig(refit=63, min_train=504, warm_start=False, n_jobs=2)
+
+    expected, _ = walk_forward.walk_forward_probabilities(returns, serial)
+    result, _ = walk_forward.walk_forward_probabilities(returns, parallel)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_multistart_keeps_best_start_and_abandons_laggards() -> None:
+    returns = _switching_returns(n=600, seed=4)
+    single = model.fit_markov_model(returns)
+
+    res, diagnostics = multistart.fit_markov_multistart(returns, n_starts=6, seed=1)
+    assert list(diagnostics.columns) == ["llf", "iterations", "seconds", "bull_mean", "status"]
+    assert (diagnostics["status"] == "selected").sum() == 1
+    assert res.llf >= single.llf - 1e-6
+    assert diagnostics["llf"].max() == pytest.approx(res.llf)
+
+    strict, strict_diag = multistart.fit_markov_multistart(returns, n_starts=6, seed=1, abandon_margin=0.0, n_jobs=2)
+    assert (strict_diag["status"] == "abandoned").any()
+    assert strict_diag["iterations"].sum() < diagnostics["iterations"].sum()
+    assert strict.llf == pytest.approx(res.llf, abs=1e-4)
+
+
+def test_multistart_diagnostics_reach_the_pipeline_outputs(tmp_path: Path) -> None:
+    cfg = {
+        "data": {
+            "tickers": ["SPY"],
+            "start": "2017-01-01",
+            "end": "2019-06-01",
+            "cache_dir": str(tmp_path / "data"),
+            "provider": "synthetic",
+        },
+        "model": {"n_states": 2, "n_starts": 3},
+        "signals": {"threshold": 0.5},
+    }
+    config_path = tmp_path / "regime.yaml"
+    config_path.write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    out = tmp_path / "artifacts"
+
+    result = pipeline.run_regime_detection(config_path, output_dir=out)
+    assert len(result.diagnostics) == 3 and (result.diagnostics["status"] == "selected").sum() == 1
+    written = pd.read_csv(out / "fit_diagnostics.csv", index_col=0)
+    assert list(written["status"]) == list(result.diagnostics["status"])
+
+    cached = pipeline.run_regime_detection(config_path, output_dir=out)
+    pd.testing.assert_frame_equal(cached.diagnostics, result.diagnostics)
+    single = pipeline.fit_regimes(result.returns["SPY"])
+    assert single["diagnostics"] is None
+
+
+def test_detect_universe_streams_per_asset_fits(tmp_path: Path) -> None:
+    panel = pd.DataFrame({"a": _switching_returns(seed=1), "b": _switching_returns(seed=2), "c": _switching_returns(seed=3)})
+    panel.iloc[:150, 1] = np.nan  # listed later
+    panel.iloc[:-100, 2] = np.nan  # too short to fit
+
+    assets = cross_section.detect_universe(panel, tmp_path, n_jobs=2, min_obs=252, flush_rows=100)
+    assert list(assets.index) == ["a", "b", "c"]
+    assert assets.loc["c", "error"].startswith("ValueError") and assets.loc["a", "error"] == ""
+
+    bull = cross_section.load_bull_probabilities(tmp_path, ["a", "b"])
+    for ticker in ["a", "b"]:
+        res = model.fit_markov_model(panel[ticker].dropna())
+        expected = model.extract_probabilities(res)[f"Regime_{model.identify_bull_state(res)}"]
+        np.testing.assert_allclose(bull[ticker].dropna().to_numpy(), expected.to_numpy(), atol=1e-10)
+        assert assets.loc[ticker, "llf"] == pytest.approx(res.llf)
+    assert bull["b"].first_valid_index() == panel.index[150]
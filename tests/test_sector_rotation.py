@@ -6,7 +6,9 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from regime_pipeline.sector_rotation import data, regimes_hmm, signals
+from regime_pipeline import market_data, report
+from regime_pipeline.sector_rotation import allocators, backtest, data, engine, moments, regimes_hmm, reporting, signals, sweep
+from regime_pipeline.store import PriceStore
 
 
 def test_download_prices_uses_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
@@ -22,20 +24,56 @@ def test_download_prices_uses_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPa
         call_counter["count"] += 1
         return fake_df
 
-    monkeypatch.setattr(data.yf, "download", fake_download)
+    monkeypatch.setattr(market_data.yf, "download", fake_download)
 
-    cache_file = tmp_path / "prices.csv"
-    prices = data.download_prices(tickers, start="2020-01-01", cache_path=cache_file)
+    cache_dir = tmp_path / "prices"
+    prices = data.download_prices(tickers, start="2020-01-01", cache_path=cache_dir)
     assert set(prices.columns) == set(tickers)
     assert call_counter["count"] == 1
-    assert cache_file.exists()
+    assert set(PriceStore(cache_dir).tickers()) == set(tickers)
 
     # second call should hit the cache and avoid another download
-    prices_cached = data.download_prices(tickers, start="2020-01-01", cache_path=cache_file)
+    prices_cached = data.download_prices(tickers, start="2020-01-01", cache_path=cache_dir)
     assert call_counter["count"] == 1
     pd.testing.assert_frame_equal(prices, prices_cached)
 
 
+def test_download_prices_fetches_only_gaps(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    dates = pd.bdate_range("2020-01-01", "2020-03-31")
+    master = pd.DataFrame(
+        {ticker: np.arange(len(dates), dtype=float) + offset for offset, ticker in enumerate(["AAA", "BBB", "CCC"])},
+        index=dates,
+    )
+    calls: list[tuple[list[str], pd.Timestamp, pd.Timestamp]] = []
+
+    def fake_download(tickers, start, end, **kwargs):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        calls.append((sorted(tickers), start, end))
+        window = master.loc[(master.index >= start) & (master.index < end), list(tickers)]
+        window.columns = pd.MultiIndex.from_product([["Adj Close"], window.columns])
+        return window
+
+    monkeypatch.setattr(market_data.yf, "download", fake_download)
+    cache_dir = tmp_path / "prices"
+
+    data.download_prices(["AAA", "BBB"], start="2020-01-01", end="2020-02-01", cache_path=cache_dir)
+    assert calls == [(["AAA", "BBB"], pd.Timestamp("2020-01-01"), pd.Timestamp("2020-02-01"))]
+
+    # a new ticker only downloads that ticker
+    data.download_prices(["AAA", "BBB", "CCC"], start="2020-01-01", end="2020-02-01", cache_path=cache_dir)
+    assert calls[-1] == (["CCC"], pd.Timestamp("2020-01-01"), pd.Timestamp("2020-02-01"))
+
+    # extending the window only fetches the missing tail, plus a few stored bars
+    # to check for restated history, once for all tickers
+    prices = data.download_prices(["AAA", "BBB", "CCC"], start="2020-01-01", end="2020-03-01", cache_path=cache_dir)
+    assert calls[-1] == (["AAA", "BBB", "CCC"], pd.Timestamp("2020-01-27"), pd.Timestamp("2020-03-01"))
+    assert len(calls) == 3
+
+    expected = master.loc[master.index < "2020-03-01"]
+    pd.testing.assert_frame_equal(prices, expected, check_freq=False)
+    assert PriceStore(cache_dir).coverage("CCC") == [(pd.Timestamp("2020-01-01"), pd.Timestamp("2020-03-01"))]
+
+
 def test_make_features_columns() -> None:
     dates = pd.date_range("2021-01-01", periods=10, freq="D")
     prices = pd.DataFrame(
@@ -62,3 +100,251 @@ def test_trailing_return_shape() -> None:
     momentum = signals.trailing_return(prices, months=12, skip_last=1)
     assert pd.infer_freq(momentum.index) == "M"
     assert set(momentum.columns) == {"XLY", "XLP"}
+
+
+def _synthetic_features(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    calm = np.arange(n) % 120 < 80
+    ret_spy = np.where(calm, rng.normal(0.001, 0.006, n), rng.normal(-0.002, 0.02, n))
+    d_vix = np.where(calm, rng.normal(-0.1, 0.5, n), rng.normal(0.3, 2.0, n))
+    index = pd.bdate_range("2015-01-01", periods=n)
+    return pd.DataFrame({"ret_spy": ret_spy, "d_vix": d_vix}, index=index)
+
+
+def test_fit_predict_hmm_warm_start_reports_diagnostics() -> None:
+    features = _synthetic_features()
+    risk, diagnostics = regimes_hmm.fit_predict_hmm(
+        features,
+        lookback=200,
+        warm_start=True,
+        random_state=0,
+        return_diagnostics=True,
+    )
+    assert list(risk.columns) == ["risk_on"]
+    assert risk.index.equals(features.index)
+    assert set(risk["risk_on"].unique()).issubset({0, 1})
+    assert {"n_iter", "converged", "seconds", "warm_start"}.issubset(diagnostics.columns)
+    assert not diagnostics["warm_start"].iloc[0]
+    assert diagnostics["warm_start"].iloc[1:].all()
+
+
+def test_fit_predict_hmm_parallel_matches_serial() -> None:
+    features = _synthetic_features(seed=1)
+    serial = regimes_hmm.fit_predict_hmm(features, lookback=200, random_state=7)
+    parallel = regimes_hmm.fit_predict_hmm(features, lookback=200, random_state=7, n_jobs=2, chunksize=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+    with pytest.raises(ValueError):
+        regimes_hmm.fit_predict_hmm(features, lookback=200, warm_start=True, n_jobs=2)
+
+
+def test_price_store_appends_and_slices(tmp_path: Path) -> None:
+    dates = pd.bdate_range("2021-01-01", periods=10)
+    frame = pd.DataFrame({"AAA": np.arange(10.0), "^VIX": np.arange(10.0) + 20}, index=dates)
+    store = PriceStore(tmp_path / "store")
+    store.write(frame.iloc[:6])
+    head_bytes = (tmp_path / "store" / "AAA.bin").read_bytes()
+
+    store.write(frame.iloc[4:])  # refetched overlap with unchanged values
+    assert (tmp_path / "store" / "AAA.bin").read_bytes().startswith(head_bytes)
+
+    reloaded = PriceStore(tmp_path / "store")
+    pd.testing.assert_frame_equal(reloaded.read(["AAA", "^VIX"]), frame, check_freq=False)
+    sliced = reloaded.read(["^VIX"], start=dates[2], end=dates[4])
+    assert list(sliced.index) == list(dates[2:5])
+    assert reloaded.manifest["AAA"]["rows"] == 10
+
+
+def test_top_k_equal_matches_nlargest_with_ties_and_gaps() -> None:
+    rng = np.random.default_rng(0)
+    scores = pd.DataFrame(
+        rng.integers(0, 5, size=(40, 6)).astype(float),
+        index=pd.bdate_range("2020-01-01", periods=40),
+        columns=list("ABCDEF"),
+    )
+    scores[scores > 3.5] = np.nan
+    scores.iloc[0] = np.nan
+    universe = ["F", "E", "D", "C", "B", "A", "Z"]
+
+    weights = allocators.top_k_equal(scores, universe, k=3)
+    assert list(weights.columns) == universe
+    assert (weights.iloc[0] == 0.0).all()
+    for dt, row in scores.iloc[1:].iterrows():
+        valid = row.reindex(universe).dropna()
+        expected = pd.Series(0.0, index=universe)
+        top = valid.nlargest(min(3, len(valid)))
+        expected.loc[top.index] = 1.0 / len(top)
+        pd.testing.assert_series_equal(weights.loc[dt], expected, check_names=False)
+
+
+def test_top_k_weights_rank_and_score_schemes() -> None:
+    scores = pd.DataFrame({"A": [0.3, -0.1], "B": [0.1, -0.2], "C": [0.2, np.nan], "D": [-0.5, -0.3]})
+    rank = allocators.top_k_weights(scores, list("ABCD"), k=3, scheme="rank")
+    np.testing.assert_allclose(rank.iloc[0].to_numpy(), [3 / 6, 1 / 6, 2 / 6, 0.0])
+
+    score = allocators.top_k_weights(scores, list("ABCD"), k=2, scheme="score")
+    np.testing.assert_allclose(score.iloc[0].to_numpy(), [0.6, 0.0, 0.4, 0.0])
+    # no positive scores among the selection falls back to equal weights
+    np.testing.assert_allclose(score.iloc[1].to_numpy(), [0.5, 0.5, 0.0, 0.0])
+
+
+def test_rolling_moments_match_window_statistics() -> None:
+    rng = np.random.default_rng(3)
+    index = pd.bdate_range("2020-01-01", periods=300)
+    prices = pd.DataFrame(
+        100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(300, 4)), axis=0)),
+        index=index,
+        columns=list("ABCD"),
+    )
+    prices.iloc[:120, 3] = np.nan
+    dates = index[[60, 100, 150, 151, 299]]
+
+    cube = moments.RollingMoments(prices).cube(dates, lookback=40)
+    returns = prices.pct_change(fill_method=None)
+    for dt in dates:
+        window = returns.loc[:dt].tail(40)
+        pd.testing.assert_frame_equal(cube.cov_at(dt, list("ABCD")), window.cov(), check_names=False, atol=1e-12)
+        pd.testing.assert_series_equal(cube.vol_at(dt, list("ABC")), window[list("ABC")].std(), check_names=False)
+
+        expected = allocators.hrp_weights(prices[list("ABC")].loc[:dt], lookback=40).iloc[0]
+        actual = allocators.hrp_from_moments(cube.cov_at(dt, list("ABC")), cube.corr_at(dt, list("ABC")))
+        pd.testing.assert_series_equal(actual, expected, check_names=False, atol=1e-12)
+
+
+def _reference_hrp(cov: np.ndarray, corr: np.ndarray) -> np.ndarray:
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    distance = np.sqrt(np.clip(1 - corr, 0, None) / 2)
+    order = list(leaves_list(linkage(squareform(distance, checks=False), method="single")))
+    weights = np.zeros(len(cov))
+
+    def bisect(items: list, scale: float) -> None:
+        if len(items) == 1:
+            weights[items[0]] = scale
+            return
+        left, right = items[: len(items) // 2], items[len(items) // 2 :]
+        left_var = cov[np.ix_(left, left)].mean()
+        right_var = cov[np.ix_(right, right)].mean()
+        bisect(left, scale * right_var / (left_var + right_var))
+        bisect(right, scale * left_var / (left_var + right_var))
+
+    bisect(order, 1.0)
+    return weights
+
+
+def test_hrp_weights_batch_matches_recursive_bisection() -> None:
+    rng = np.random.default_rng(4)
+    windows = [pd.DataFrame(rng.normal(0, 0.01, size=(80, 9)) @ rng.normal(size=(9, 9))) for _ in range(5)]
+    cov = np.stack([window.cov().to_numpy() for window in windows] + [np.full((9, 9), np.nan)])
+
+    batch = allocators.hrp_weights_batch(cov)
+    for pos, window in enumerate(windows):
+        expected = _reference_hrp(window.cov().to_numpy(), window.corr().to_numpy())
+        np.testing.assert_allclose(batch[pos], expected, atol=1e-12)
+    # unusable correlations fall back to equal weights
+    np.testing.assert_allclose(batch[-1], np.full(9, 1 / 9))
+
+
+def _reference_rotation(prices: pd.DataFrame, risk_on: pd.Series, sectors, defensives, cap: float) -> pd.DataFrame:
+    investable = sorted(set(sectors + defensives))
+    scores = signals.trailing_return(prices[sectors], months=12, skip_last=1)
+    abs_on = signals.absolute_momentum(prices["SPY"], months=12).reindex(scores.index, method="ffill").fillna(0)
+    regime = risk_on.reindex(prices.index).ffill().fillna(0.0).reindex(scores.index, method="ffill").fillna(0.0)
+    prev, records = pd.Series(0.0, index=investable), []
+    for dt in scores.index:
+        target = pd.Series(0.0, index=investable)
+        if regime.loc[dt] and abs_on.loc[dt]:
+            top = scores.loc[dt].reindex(sectors).dropna().nlargest(4)
+            target.update(allocators.inverse_vol_weights(prices.loc[:dt, top.index]).iloc[0])
+        else:
+            target.update(allocators.hrp_weights(prices.loc[:dt, defensives]).iloc[0])
+        target = target / target.sum()
+        prev = backtest.cap_turnover(prev, target, cap=cap)
+        prev = prev / prev.sum()
+        records.append(prev)
+    return pd.DataFrame(records, index=scores.index)
+
+
+def test_rotation_engine_matches_per_date_loop() -> None:
+    sectors, defensives = ["S1", "S2", "S3", "S4", "S5", "S6"], ["D1", "D2", "D3"]
+    prices = market_data.SyntheticProvider(seed=5, drift=0.0004, vol=0.012).fetch(
+        sectors + defensives + ["SPY"], pd.Timestamp("2015-01-01"), pd.Timestamp("2019-01-01")
+    )
+    risk_on = pd.Series((np.arange(len(prices)) // 90) % 3 != 0, index=prices.index).astype(int)
+
+    rotation = engine.RotationEngine(prices, risk_on, sectors, defensives)
+    result = rotation.run(engine.RotationParams(turnover_cap=0.25))
+    expected = _reference_rotation(prices, risk_on, sectors, defensives, cap=0.25)
+
+    pd.testing.assert_frame_equal(result.weights, expected, check_freq=False, atol=1e-12)
+    assert (result.weights[defensives].sum(axis=1) > 0.5).any()
+    assert (result.weights[sectors].sum(axis=1) > 0.5).any()
+
+
+def test_run_sweep_matches_individual_runs() -> None:
+    sectors, defensives = ["S1", "S2", "S3", "S4", "S5"], ["D1", "D2"]
+    prices = market_data.SyntheticProvider(seed=6, drift=0.0004, vol=0.012).fetch(
+        sectors + defensives + ["SPY"], pd.Timestamp("2015-01-01"), pd.Timestamp("2019-01-01")
+    )
+    risk_on = pd.Series((np.arange(len(prices)) // 70) % 2, index=prices.index)
+    rotation = engine.RotationEngine(prices, risk_on, sectors, defensives)
+    grid = {"top_k": [2, 3], "turnover_cap": [0.2, 1.0], "fee_bps": [0, 25], "target_annual_vol": [0.1, 0.15]}
+
+    results = sweep.run_sweep(rotation, grid)
+    assert len(results) == 16
+    for pos in (0, 5, 10, 15):
+        params = engine.RotationParams(**{name: results.loc[pos, name] for name in grid})
+        expected = rotation.run(params).stats
+        for key, value in expected.items():
+            assert results.loc[pos, key] == pytest.approx(value, rel=1e-9, abs=1e-12)
+
+
+def test_downsample_keeps_extremes_and_endpoints() -> None:
+    index = pd.bdate_range("1990-01-01", periods=9000)
+    series = pd.Series(np.random.default_rng(0).normal(size=9000).cumsum(), index=index)
+
+    shown = report.downsample(series, max_points=500)
+    assert len(shown) <= 502
+    assert shown.index.is_monotonic_increasing
+    assert shown.index[0] == index[0] and shown.index[-1] == index[-1]
+    assert shown.idxmax() == series.idxmax() and shown.idxmin() == series.idxmin()
+    pd.testing.assert_series_equal(report.downsample(series.iloc[:100], max_points=500), series.iloc[:100])
+
+
+def test_render_run_reports_writes_charts_in_workers(tmp_path: Path) -> None:
+    sectors, defensives = ["S1", "S2", "S3", "S4"], ["D1", "D2"]
+    prices = market_data.SyntheticProvider(seed=7).fetch(
+        sectors + defensives + ["SPY"], pd.Timestamp("2016-01-01"), pd.Timestamp("2019-01-01")
+    )
+    risk_on = pd.Series((np.arange(len(prices)) // 80) % 2, index=prices.index)
+    rotation = engine.RotationEngine(prices, risk_on, sectors, defensives)
+    runs = [engine.RotationParams(top_k=2), engine.RotationParams(top_k=3, turnover_cap=1.0)]
+
+    written = reporting.render_run_reports(rotation, runs, tmp_path, n_jobs=2)
+    assert sorted(written) == ["run_000", "run_001"]
+    for paths in written.values():
+        assert sorted(paths) == sorted(reporting.CHARTS)
+        for path in paths.values():
+            assert Path(path).stat().st_size > 0
+
+
+def test_fit_predict_hmm_memoizes_window_fits(tmp_path: Path) -> None:
+    features = _synthetic_features(seed=2)
+    for warm in (False, True):
+        cache_dir = tmp_path / f"warm_{warm}"
+        first, cold = regimes_hmm.fit_predict_hmm(
+            features, lookback=200, warm_start=warm, cache_dir=cache_dir, return_diagnostics=True
+        )
+        again, hits = regimes_hmm.fit_predict_hmm(
+            features, lookback=200, warm_start=warm, cache_dir=cache_dir, return_diagnostics=True
+        )
+        pd.testing.assert_frame_equal(first, again)
+        assert not cold["cached"].any() and hits["cached"].all()
+        pd.testing.assert_frame_equal(cold.drop(columns="cached"), hits.drop(columns="cached"))
+
+    # a different seed is a different fit
+    _, reseeded = regimes_hmm.fit_predict_hmm(
+        features, lookback=200, random_state=1, cache_dir=tmp_path / "warm_False", return_diagnostics=True
+    )
+    assert not reseeded["cached"].any()
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regime_pipeline.shared_panel import PanelHandle, SharedPanel
+
+
+def _column_sums(handle: PanelHandle) -> pd.Series:
+    frame = handle.frame()
+    assert not frame.to_numpy().flags.writeable
+    return frame.sum()
+
+
+def test_shared_panel_is_attached_by_workers_without_copies(tmp_path: Path) -> None:
+    prices = pd.DataFrame(
+        np.random.default_rng(0).normal(size=(500, 4)),
+        index=pd.bdate_range("2020-01-01", periods=500),
+        columns=["SPY", "IEF", "XLP", "XLU"],
+    )
+    with SharedPanel.from_frame(prices, directory=tmp_path) as panel:
+        # the handle carries labels and a path, never the values
+        assert len(pickle.dumps(panel.handle)) < prices.to_numpy().nbytes
+        assert np.shares_memory(panel.frame().to_numpy(), panel.array())
+        pd.testing.assert_frame_equal(panel.frame(), prices)
+
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            sums = list(pool.map(_column_sums, [panel.handle] * 2))
+        for result in sums:
+            pd.testing.assert_series_equal(result, prices.sum())
+
+    assert panel.closed
+    assert not list(tmp_path.iterdir())